@@ -1,5 +1,6 @@
 from .core import *  # noqa
 from .alias import *  # noqa
 from .containers import *  # noqa
+from .array import *  # noqa
 from .selection import *  # noqa
 from .version import *  # noqa
@@ -0,0 +1,93 @@
+# The functions in this module make it possible to wait for changes to
+# callback properties in asyncio code.
+
+import asyncio
+
+from .core import add_callback, remove_callback
+
+__all__ = ["wait_for_change", "changes"]
+
+
+async def wait_for_change(instance, prop, predicate=None, timeout=None):
+    """
+    Wait for a callback property to change and return its new value.
+
+    The property can be changed from any thread.
+
+    Parameters
+    ----------
+    instance
+        The instance with the callback property
+    prop : str
+        The name of the callback property
+    predicate : func, optional
+        If specified, changes are ignored unless ``predicate(value)`` is
+        `True` for the new value.
+    timeout : float, optional
+        If specified, the maximum time to wait in seconds, after which
+        `asyncio.TimeoutError` is raised.
+
+    Examples
+    --------
+
+    ::
+
+        value = await wait_for_change(state, 'x_min', predicate=lambda x: x > 0)
+    """
+
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def callback(value):
+        if not future.done() and (predicate is None or predicate(value)):
+            future.set_result(value)
+
+    add_callback(instance, prop, callback, executor=loop)
+    try:
+        return await asyncio.wait_for(future, timeout)
+    finally:
+        remove_callback(instance, prop, callback)
+
+
+async def changes(instance, prop, latest=False):
+    """
+    Iterate asynchronously over the new values of a callback property every
+    time it changes.
+
+    The property can be changed from any thread. The values are queued until
+    they are consumed, and the callback used to listen for changes is removed
+    when the iteration stops.
+
+    Parameters
+    ----------
+    instance
+        The instance with the callback property
+    prop : str
+        The name of the callback property
+    latest : bool, optional
+        If `True`, only the most recent value is kept if several changes
+        happen before the previous value was consumed.
+
+    Examples
+    --------
+
+    ::
+
+        async for value in changes(state, 'x_min'):
+            print(value)
+    """
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def callback(value):
+        if latest and not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(value)
+
+    add_callback(instance, prop, callback, executor=loop)
+    try:
+        while True:
+            yield await queue.get()
+    finally:
+        remove_callback(instance, prop, callback)
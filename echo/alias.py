@@ -37,6 +37,10 @@ class CallbackPropertyAlias:
     """
 
     def __init__(self, target, deprecated=False, warning=None):
+        from .core import _callback_attribute_created
+
+        _callback_attribute_created()
+
         self._target = target
         # Setting a custom warning message implies deprecated=True
         self._deprecated = deprecated or (warning is not None)
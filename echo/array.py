@@ -0,0 +1,413 @@
+from contextlib import contextmanager
+
+import numpy as np
+
+from .callback_container import CallbackContainer
+from .core import CallbackProperty, _entry_priority, _get_registry, _same_value
+
+__all__ = ["CallbackPropertyArray"]
+
+
+def _changed(old, new):
+    """
+    Return a boolean array indicating which items differ between two arrays,
+    treating NaN values as equal to each other.
+    """
+    if old.dtype.kind == "O":
+        return np.fromiter((not _same_value(a, b) for a, b in zip(old, new)), dtype=bool, count=len(old))
+    changed = old != new
+    if old.dtype.kind in "fc":
+        changed &= ~(np.isnan(old) & np.isnan(new))
+    return changed
+
+
+def _unique(indices, size):
+    """
+    Return the sorted unique values of an array of indices into an array of
+    length ``size``.
+    """
+    # When the indices cover a large part of the array, marking them in a
+    # boolean array is much faster than sorting them with np.unique.
+    if len(indices) > size // 16:
+        mask = np.zeros(size, dtype=bool)
+        mask[indices] = True
+        indices = np.flatnonzero(mask)
+    else:
+        indices = np.unique(indices)
+    indices.flags.writeable = False
+    return indices
+
+
+def _is_plain(prop):
+    return (
+        type(prop) is CallbackProperty
+        and getattr(prop._getter, "__func__", None) is CallbackProperty._default_getter
+        and getattr(prop._setter, "__func__", None) is CallbackProperty._default_setter
+    )
+
+
+def _column_dtype(default):
+    # Numerical values are stored in arrays of the corresponding type, and
+    # anything else (including None and strings, which Numpy would otherwise
+    # truncate to a fixed length) in object arrays.
+    value = np.asarray(default)
+    return value.dtype if value.ndim == 0 and value.dtype.kind in "biufc" else object
+
+
+class _Column:
+    """
+    A view onto the values of one callback property in a
+    :class:`CallbackPropertyArray`, which can be indexed like a Numpy array.
+    """
+
+    __slots__ = ("_array", "_name")
+
+    def __init__(self, array, name):
+        self._array = array
+        self._name = name
+
+    @property
+    def values(self):
+        """
+        A read-only Numpy array with the values of the property.
+        """
+        return self._array._views[self._name]
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+    def __setitem__(self, key, value):
+        self._array._set(self._name, key, value)
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is not None or copy:
+            return np.array(self.values, dtype=dtype, copy=True)
+        return self.values
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __repr__(self):
+        return f"<column '{self._name}' of {self._array!r}: {self.values!r}>"
+
+
+class _Row:
+    """
+    A lightweight view onto one row of a :class:`CallbackPropertyArray`, which
+    behaves like an instance of the state class for getting and setting the
+    callback properties.
+    """
+
+    __slots__ = ("_array", "_index")
+
+    def __init__(self, array, index):
+        object.__setattr__(self, "_array", array)
+        object.__setattr__(self, "_index", index)
+
+    def __getattr__(self, name):
+        return self._array._get(name, self._index)
+
+    def __setattr__(self, name, value):
+        self._array._set(name, self._index, value)
+
+    def __eq__(self, other):
+        return isinstance(other, _Row) and other._array is self._array and other._index == self._index
+
+    def __hash__(self):
+        return hash((id(self._array), self._index))
+
+    def __dir__(self):
+        return sorted(set(object.__dir__(self)) | set(self._array._data))
+
+    def __repr__(self):
+        return f"<row {self._index} of {self._array!r}>"
+
+
+class CallbackPropertyArray:
+    """
+    Columnar storage for the callback properties of many instances of the same
+    class.
+
+    Rather than creating one instance per item, which has a significant memory
+    and time overhead when there are many of them, the values of each callback
+    property are stored in a Numpy array. The values can be accessed and
+    changed in bulk using the attribute with the name of the property, which
+    can be indexed like a Numpy array, and ``array[index]`` gives a view of a
+    single row that behaves like an instance (or a list of them if ``index``
+    is a slice, a boolean mask, or an array of indices). Callbacks are added
+    to the array rather than to individual rows, and are called with the
+    indices of the rows that have changed.
+
+    Only plain :class:`~echo.CallbackProperty` properties without a custom
+    getter or setter can be stored. The type of each array is determined from
+    the default value of the property, with non-numerical values stored in
+    object arrays, unless specified with ``dtypes``. Validators are not
+    supported.
+
+    Parameters
+    ----------
+    state_class : type
+        The class whose callback properties should be stored.
+    size : int
+        The number of rows, each initialized to the default values of the
+        properties.
+    dtypes : dict, optional
+        The Numpy types to use for some of the properties, by name.
+
+    Examples
+    --------
+
+    ::
+
+        markers = CallbackPropertyArray(MarkerState, 10000)
+        markers.add_callback('alpha', lambda indices: print(indices))
+        markers.alpha[markers.size.values > 3] = 0.5
+        markers[0].alpha = 1
+    """
+
+    def __init__(self, state_class, size, dtypes=None):
+        if size < 0:
+            raise ValueError("size should be positive")
+
+        registry = _get_registry(state_class)
+        dtypes = dtypes or {}
+
+        self._state_class = state_class
+        self._aliases = {name: alias._target for name, alias in registry.aliases.items()}
+        self._data = {}
+        for name, prop in registry.properties.items():
+            if not _is_plain(prop):
+                raise TypeError(
+                    f"Property '{name}' can't be stored in an array, since only CallbackProperty "
+                    "properties without a custom getter or setter are supported"
+                )
+            data = np.empty(size, dtype=dtypes.get(name, _column_dtype(prop._default)))
+            data.fill(prop._default)
+            self._data[name] = data
+
+        unknown = set(dtypes) - set(self._data)
+        if unknown:
+            raise ValueError(f"Unknown properties in dtypes: {', '.join(sorted(unknown))}")
+
+        # Read-only views on the data, so that the values can't be changed
+        # without calling the callbacks.
+        self._views = {}
+        for name, data in self._data.items():
+            self._views[name] = view = data.view()
+            view.flags.writeable = False
+
+        self._positions = np.arange(size)
+        self._callbacks = {}
+        self._global_callbacks = CallbackContainer()
+        self._batch_depth = 0
+        self._batch_changes = None
+
+    @classmethod
+    def from_instances(cls, state_class, instances, dtypes=None):
+        """
+        Create an array with the values of the callback properties of
+        existing instances of ``state_class``.
+
+        Parameters
+        ----------
+        state_class : type
+            The class whose callback properties should be stored.
+        instances : iterable
+            The instances to copy the values from, one per row.
+        dtypes : dict, optional
+            The Numpy types to use for some of the properties, by name.
+        """
+        instances = list(instances)
+        array = cls(state_class, len(instances), dtypes=dtypes)
+        for name, data in array._data.items():
+            values = [getattr(instance, name) for instance in instances]
+            if data.dtype.kind == "O":
+                data[:] = np.fromiter(values, dtype=object, count=len(values))
+            else:
+                data[:] = values
+        return array
+
+    @property
+    def state_class(self):
+        """
+        The class whose callback properties are stored.
+        """
+        return self._state_class
+
+    def _resolve(self, name):
+        name = self._aliases.get(name, name)
+        if name not in self._data:
+            raise AttributeError(f"{self._state_class.__name__} has no callback property '{name}'")
+        return name
+
+    def __getattr__(self, name):
+        # Only called for attributes that are not found normally
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return _Column(self, self._resolve(name))
+
+    def __setattr__(self, name, value):
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            self._set(self._resolve(name), slice(None), value)
+
+    def __dir__(self):
+        return sorted(set(object.__dir__(self)) | set(self._data))
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __getitem__(self, index):
+        positions = self._positions[index]
+        if positions.ndim == 0:
+            return _Row(self, int(positions))
+        elif positions.ndim == 1:
+            return [_Row(self, int(position)) for position in positions]
+        else:
+            raise TypeError(f"Invalid index for {type(self).__name__}: {index!r}")
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield _Row(self, index)
+
+    def __repr__(self):
+        return f"<CallbackPropertyArray of {len(self)} {self._state_class.__name__}>"
+
+    def _get(self, name, index):
+        value = self._data[self._resolve(name)][index]
+        return value.item() if isinstance(value, np.generic) else value
+
+    def _set(self, name, key, value):
+        name = self._resolve(name)
+        data = self._data[name]
+        positions = np.atleast_1d(self._positions[key])
+        old = data[positions]
+        data[positions] = value
+        changed = _changed(old, data[positions])
+        if changed.any():
+            self._notify({name: _unique(positions[changed], len(data))})
+
+    def _notify(self, changes):
+        if self._batch_depth > 0:
+            for name, indices in changes.items():
+                self._batch_changes.setdefault(name, []).append(indices)
+            return
+
+        # As for transactions, the callbacks of all the properties that have
+        # changed are called in order of decreasing priority.
+        calls = []
+        for name, indices in changes.items():
+            if callbacks := self._callbacks.get(name, None):
+                calls.extend((indices, entry) for entry in callbacks.ordered())
+        calls.sort(key=_entry_priority, reverse=True)
+        for indices, entry in calls:
+            CallbackContainer.invoke(entry, indices)
+
+        self._global_callbacks.dispatch(**changes)
+
+    @contextmanager
+    def batch(self):
+        """
+        Context manager to make several changes to the array and only call
+        the callbacks once at the end.
+
+        On exit, the callbacks of each property that has changed are called
+        once with the indices of all the rows that have changed, and the
+        global callbacks are called once. Batches can be nested, in which case
+        callbacks are only called when exiting the outermost batch.
+
+        Examples
+        --------
+
+        ::
+
+            with markers.batch():
+                markers.alpha[:100] = 0.5
+                markers.size[50:150] = 3
+        """
+        if self._batch_depth == 0:
+            self._batch_changes = {}
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                changes, self._batch_changes = self._batch_changes, None
+                for name, indices in changes.items():
+                    changes[name] = _unique(np.concatenate(indices), len(self))
+                if changes:
+                    self._notify(changes)
+
+    def add_callback(self, name, callback, priority=0):
+        """
+        Add a callback that gets triggered when the values of a callback
+        property change in any of the rows.
+
+        The callback is called with a read-only array of the indices of the
+        rows that have changed.
+
+        Parameters
+        ----------
+        name : str
+            The name of the callback property.
+        callback : func
+            The callback function to add
+        priority : int, optional
+            This can optionally be used to force a certain order of execution
+            of callbacks (larger values indicate a higher priority).
+        """
+        name = self._resolve(name)
+        if name not in self._callbacks:
+            self._callbacks[name] = CallbackContainer()
+        self._callbacks[name].append(callback, priority=priority)
+
+    def remove_callback(self, name, callback):
+        """
+        Remove a previously-added callback
+
+        Parameters
+        ----------
+        name : str
+            The name of the callback property.
+        callback : func
+            The callback function to remove
+        """
+        callbacks = self._callbacks.get(self._resolve(name), None)
+        if callbacks is None or callback not in callbacks:
+            raise ValueError(f"Callback function not found: {callback}")
+        callbacks.remove(callback)
+
+    def add_global_callback(self, callback, priority=0):
+        """
+        Add a global callback function, which is a callback that gets triggered
+        when any callback properties change in any of the rows.
+
+        The callback is called with keyword arguments giving, for each
+        property that has changed, a read-only array of the indices of the
+        rows that have changed.
+
+        Parameters
+        ----------
+        callback : func
+            The callback function to add
+        priority : int, optional
+            This can optionally be used to force a certain order of execution
+            of callbacks (larger values indicate a higher priority).
+        """
+        self._global_callbacks.append(callback, priority=priority)
+
+    def remove_global_callback(self, callback):
+        """
+        Remove a global callback function.
+
+        Parameters
+        ----------
+        callback : func
+            The callback function to remove
+        """
+        self._global_callbacks.remove(callback)
@@ -1,8 +1,166 @@
+import inspect
+import threading
+import warnings
 import weakref
+from contextlib import nullcontext
 from functools import partial
+from operator import itemgetter
 
 __all__ = ["CallbackContainer"]
 
+# Used in place of a lock when thread safety is not needed
+_NO_LOCK = nullcontext()
+
+
+def _get_submit(executor):
+    """
+    Return a function that takes a function with no arguments and schedules
+    it to be called by ``executor``.
+    """
+    import asyncio
+
+    if isinstance(executor, asyncio.AbstractEventLoop):
+
+        def submit(func):
+            # Call the function straight away if we are already in the loop
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is executor:
+                func()
+            else:
+                executor.call_soon_threadsafe(func)
+
+        return submit
+
+    elif callable(getattr(executor, "submit", None)):
+        return executor.submit
+
+    else:
+        raise TypeError(f"executor should be an asyncio event loop or have a submit method, got {executor!r}")
+
+
+class _Delivery:
+    """
+    Callable stored in place of a callback that should be called by an
+    executor (see :meth:`CallbackContainer.append`).
+
+    If ``coalesce`` is `True`, calls that happen while a previous call is
+    still waiting to be run by the executor are merged into it, so that the
+    callback is only called with the most recent arguments.
+    """
+
+    __slots__ = ("entry", "submit", "coalesce", "_lock", "_pending")
+
+    def __init__(self, entry, executor, coalesce=False):
+        self.entry = entry
+        self.submit = _get_submit(executor)
+        self.coalesce = coalesce
+        self._lock = threading.Lock()
+        self._pending = None
+
+    def __call__(self, *args, **kwargs):
+        if self.coalesce:
+            with self._lock:
+                scheduled = self._pending is not None
+                self._pending = args, kwargs
+            if not scheduled:
+                self.submit(self._run_pending)
+        else:
+            self.submit(partial(CallbackContainer.invoke, self.entry, *args, **kwargs))
+
+    def _run_pending(self):
+        with self._lock:
+            args, kwargs = self._pending
+            self._pending = None
+        CallbackContainer.invoke(self.entry, *args, **kwargs)
+
+
+class _AsyncCall:
+    """
+    Callable stored in place of a coroutine function callback, which runs the
+    callback as a task on the event loop running in the current thread (see
+    :meth:`CallbackContainer.append`).
+
+    At most ``concurrency`` tasks run the callback at the same time, if
+    specified, and if ``cancel_previous`` is `True`, tasks that are still
+    running are cancelled when the callback is called again. Exceptions
+    raised by the callback are passed to the exception handler of the loop,
+    and a warning is emitted if there is no running loop.
+    """
+
+    __slots__ = ("entry", "concurrency", "cancel_previous", "_tasks", "_semaphore")
+
+    def __init__(self, entry, concurrency=None, cancel_previous=False):
+        if concurrency is not None and concurrency < 1:
+            raise ValueError("concurrency should be at least 1")
+        self.entry = entry
+        self.concurrency = concurrency
+        self.cancel_previous = cancel_previous
+        self._tasks = set()
+        self._semaphore = None
+
+    def __call__(self, *args, **kwargs):
+        import asyncio
+
+        # If there is no loop to run the callback on, the problem is reported
+        # without raising an exception, which would prevent the remaining
+        # callbacks from being called and affect the code changing the
+        # property.
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            warnings.warn(
+                f"Async callback {_target(self.entry)[0]!r} was not called since async callbacks can only be "
+                "called from a running event loop, unless the loop is passed as executor when adding the callback",
+                RuntimeWarning,
+                stacklevel=2,
+            )
+            return
+
+        if self.cancel_previous:
+            for task in self._tasks:
+                task.cancel()
+
+        task = loop.create_task(self._run(loop, args, kwargs))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, loop, args, kwargs):
+        import asyncio
+
+        if self.concurrency is not None and self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            if self._semaphore is None:
+                await self._call(args, kwargs)
+            else:
+                async with self._semaphore:
+                    await self._call(args, kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            loop.call_exception_handler(
+                {
+                    "message": f"Exception in async callback {_target(self.entry)[0]!r}",
+                    "exception": exc,
+                }
+            )
+
+    async def _call(self, args, kwargs):
+        coroutine = CallbackContainer.invoke(self.entry, *args, **kwargs)
+        if coroutine is not None:
+            await coroutine
+
+
+def _target(entry):
+    # Return the entry for the callback itself for entries that are called
+    # through an executor or are coroutine functions.
+    while isinstance(entry[0], (_Delivery, _AsyncCall)):
+        entry = entry[0].entry
+    return entry
+
 
 class CallbackContainer:
     """
@@ -12,15 +170,46 @@ class CallbackContainer:
     reference is created which results in a memory leak. Instead, we need to use
     a weak reference which results in the callback being removed if the instance
     is destroyed. This container class takes care of this automatically.
+
+    Parameters
+    ----------
+    thread_safe : bool, optional
+        If `True`, adding and removing callbacks is protected by a lock so
+        that this can be done from several threads at the same time.
+        Callbacks are always called without holding the lock.
     """
 
-    def __init__(self):
-        self.callbacks = []
+    def __init__(self, thread_safe=False):
+        self._lock = threading.RLock() if thread_safe else _NO_LOCK
+        # Entries are stored in insertion order in a dictionary keyed by
+        # (ident, priority), where ident identifies the function, and for
+        # methods the instance (see _ident). We also keep track of the
+        # priorities for each ident so that lookups do not need to scan
+        # all the entries.
+        self._entries = {}
+        self._index = {}
+        self._ordered = None
+
+    @property
+    def callbacks(self):
+        """
+        A list of the stored entries, in the order in which they were added.
+        """
+        return list(self._entries.values())
 
     def clear(self):
-        self.callbacks.clear()
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+            self._ordered = None
+
+    def _ident(self, value):
+        if self.is_bound_method(value):
+            return (id(value.__func__), id(value.__self__))
+        else:
+            return id(value)
 
-    def _wrap(self, value, priority=0):
+    def _wrap(self, value, priority=0, executor=None, coalesce=False, concurrency=None, cancel_previous=False):
         """
         Given a function/method, this will automatically wrap a method using
         weakref to avoid circular references.
@@ -29,44 +218,83 @@ class CallbackContainer:
         if not callable(value):
             raise TypeError("Only callable values can be stored in CallbackContainer")
 
-        elif self.is_bound_method(value):
+        is_async = inspect.iscoroutinefunction(value)
+
+        if self.is_bound_method(value):
             # We are dealing with a bound method. Method references aren't
             # persistent, so instead we store a reference to the function
             # and instance.
 
-            value = (weakref.ref(value.__func__), weakref.ref(value.__self__, self._auto_remove), priority)
+            value = (
+                weakref.ref(value.__func__),
+                weakref.ref(value.__self__, partial(self._auto_remove, self._ident(value))),
+                priority,
+            )
 
         else:
             value = (value, priority)
 
+        if is_async:
+            import asyncio
+
+            if executor is not None and not isinstance(executor, asyncio.AbstractEventLoop):
+                raise TypeError("async callbacks can only use an asyncio event loop as executor")
+            value = (_AsyncCall(value, concurrency=concurrency, cancel_previous=cancel_previous), priority)
+
+        if executor is not None:
+            value = (_Delivery(value, executor, coalesce=coalesce), priority)
+
         return value
 
-    def _auto_remove(self, method_instance):
+    def _auto_remove(self, ident, method_instance):
         # Called when weakref detects that the instance on which a method was
         # defined has been garbage collected.
-        for value in self.callbacks[:]:
-            if isinstance(value, tuple) and value[1] is method_instance:
-                self.callbacks.remove(value)
+        with self._lock:
+            for priority in self._index.get(ident, ())[:]:
+                if _target(self._entries[ident, priority])[1] is method_instance:
+                    self._discard(ident, priority)
+
+    def _discard(self, ident, priority=None):
+        # Remove the entry with the given ident and priority, or all entries
+        # for the ident if priority is None
+        priorities = self._index[ident]
+        for p in priorities[:] if priority is None else (priority,):
+            del self._entries[ident, p]
+            priorities.remove(p)
+        if not priorities:
+            del self._index[ident]
+        self._ordered = None
+
+    def _priorities(self, value):
+        # Return the ident for value and the priorities with which it is stored
+        ident = self._ident(value)
+        priorities = self._index.get(ident)
+        if not priorities:
+            return ident, ()
+        # Object ids can be re-used once objects have been garbage collected,
+        # so we need to check that the stored entry really refers to value.
+        # For methods, the function (not tracked by _auto_remove) might have
+        # been garbage collected and its id re-used.
+        callback = _target(self._entries[ident, priorities[0]])
+        if len(callback) == 3:
+            if value.__func__ is callback[0]() and value.__self__ is callback[1]():
+                return ident, priorities
+        elif value is callback[0]:
+            return ident, priorities
+        self._discard(ident)
+        return ident, ()
 
     def __contains__(self, value):
         return self._contains(value)
 
     def _contains(self, value, priority=None):
         # Check if an entry matches the value and the priority, if not None
-        if self.is_bound_method(value):
-            for callback in self.callbacks[:]:
-                if len(callback) == 3 and value.__func__ is callback[0]() and value.__self__ is callback[1]():
-                    if priority is None or priority == callback[2]:
-                        return True
-            else:
-                return False
+        with self._lock:
+            priorities = self._priorities(value)[1]
+        if priority is None:
+            return len(priorities) > 0
         else:
-            for callback in self.callbacks[:]:
-                if len(callback) == 2 and value is callback[0]:
-                    if priority is None or priority == callback[1]:
-                        return True
-            else:
-                return False
+            return priority in priorities
 
     def iterator(self, sort=True, priority=False):
         """
@@ -84,9 +312,10 @@ class CallbackContainer:
             If `False` (the default), only the callback is yielded.
         """
         if sort:
-            iterator = sorted(self.callbacks, key=lambda x: x[-1], reverse=True)
+            iterator = self.ordered()
         else:
-            iterator = self.callbacks
+            with self._lock:
+                iterator = tuple(self._entries.values())
 
         for callback in iterator:
             if len(callback) == 3:
@@ -108,24 +337,116 @@ class CallbackContainer:
     def __iter__(self):
         yield from self.iterator()
 
+    def ordered(self):
+        """
+        Returns a tuple of the stored entries sorted by decreasing priority,
+        with entries of equal priority kept in the order they were added.
+
+        The result is cached until callbacks are added or removed, and is
+        never modified in-place, so it is safe to iterate over it while
+        callbacks are being added or removed. Entries should be called with
+        :meth:`invoke`.
+        """
+        ordered = self._ordered
+        if ordered is None:
+            with self._lock:
+                ordered = self._ordered
+                if ordered is None:
+                    ordered = self._ordered = tuple(sorted(self._entries.values(), key=itemgetter(-1), reverse=True))
+        return ordered
+
+    @staticmethod
+    def invoke(callback, *args, **kwargs):
+        """
+        Call an entry returned by :meth:`ordered` with the given arguments,
+        skipping methods on instances that have been garbage collected, and
+        return the result.
+        """
+        if len(callback) == 3:
+            func = callback[0]()
+            inst = callback[1]()
+            if func is None or inst is None:
+                return
+            return func(inst, *args, **kwargs)
+        else:
+            return callback[0](*args, **kwargs)
+
+    def dispatch(self, *args, **kwargs):
+        """
+        Call all callbacks in order of decreasing priority with the given
+        arguments.
+        """
+        for callback in self.ordered():
+            if len(callback) == 3:
+                func = callback[0]()
+                inst = callback[1]()
+                if func is None or inst is None:
+                    continue
+                func(inst, *args, **kwargs)
+            else:
+                callback[0](*args, **kwargs)
+
     def __len__(self):
-        return len(self.callbacks)
+        return len(self._entries)
 
     @staticmethod
     def is_bound_method(func):
         return hasattr(func, "__func__") and getattr(func, "__self__", None) is not None
 
-    def append(self, value, priority=0):
+    def append(self, value, priority=0, executor=None, coalesce=False, concurrency=None, cancel_previous=False):
+        """
+        Add a callback to the container.
+
+        Parameters
+        ----------
+        value : callable
+            The callback to add.
+        priority : int, optional
+            Callbacks with larger priorities are called first.
+        executor : optional
+            If specified, the callback is not called directly but is instead
+            called by this executor. This can either be an `asyncio` event
+            loop, in which case the callback is called in the thread running
+            the loop (straight away if already in that thread), or any object
+            with a ``submit(func)`` method such as a
+            `concurrent.futures.Executor` or
+            :class:`echo.qt.MainThreadExecutor`.
+        coalesce : bool, optional
+            If `True` and an executor is given, calls made while a previous
+            call is still waiting to be run by the executor are merged into
+            it, so that the callback is only called once with the most
+            recent arguments.
+        concurrency : int, optional
+            For coroutine functions, the maximum number of calls that can run
+            at the same time. By default, this is not limited.
+        cancel_previous : bool, optional
+            For coroutine functions, whether to cancel calls that are still
+            running when the callback is called again.
+
+        Notes
+        -----
+        Coroutine functions are run as tasks on the event loop running in
+        the thread in which they are called, or on ``executor`` if it is an
+        event loop. Exceptions raised by them are passed to the exception
+        handler of the loop rather than propagated.
+        """
         # If we already have the same callback with the same priority, we can ignore
-        if not self._contains(value, priority=priority):
-            self.callbacks.append(self._wrap(value, priority=priority))
+        with self._lock:
+            ident, priorities = self._priorities(value)
+            if priority not in priorities:
+                self._entries[ident, priority] = self._wrap(
+                    value,
+                    priority=priority,
+                    executor=executor,
+                    coalesce=coalesce,
+                    concurrency=concurrency,
+                    cancel_previous=cancel_previous,
+                )
+                self._index.setdefault(ident, []).append(priority)
+                self._ordered = None
 
     def remove(self, value):
-        if self.is_bound_method(value):
-            for callback in self.callbacks[:]:
-                if len(callback) == 3 and value.__func__ is callback[0]() and value.__self__ is callback[1]():
-                    self.callbacks.remove(callback)
-        else:
-            for callback in self.callbacks[:]:
-                if len(callback) == 2 and value is callback[0]:
-                    self.callbacks.remove(callback)
+        with self._lock:
+            ident, priorities = self._priorities(value)
+            if priorities:
+                self._discard(ident)
@@ -1,36 +1,196 @@
 import weakref
+from contextlib import contextmanager
+from operator import itemgetter
 
 from . import CallbackProperty, HasCallbackProperties
 from .callback_container import CallbackContainer
+from .core import _same_value
 
-__all__ = ["CallbackList", "CallbackDict", "ListCallbackProperty", "DictCallbackProperty"]
+__all__ = ["CallbackList", "CallbackDict", "ListCallbackProperty", "DictCallbackProperty", "ContainerChange"]
+
+
+class ContainerChange:
+    """
+    A description of a single change to a `CallbackList` or `CallbackDict`.
+
+    Changes are passed to callbacks added with ``detailed=True``. The
+    following kinds of changes are possible for lists:
+
+    * ``'insert'``: the items in ``new`` were inserted at ``index``
+    * ``'remove'``: the items in ``old`` were removed from ``index``
+    * ``'replace'``: the items in ``old`` starting at ``index`` were replaced
+      by the items in ``new`` (which may be a different number of items)
+    * ``'reorder'``: the items were reordered (e.g. sorted or reversed)
+
+    and for dictionaries:
+
+    * ``'set'``: the value for ``key`` was set to ``new``, replacing ``old``
+      if the key was already present (``old`` is `None` otherwise)
+    * ``'delete'``: ``key`` was removed, and its value was ``old``
+
+    In addition, ``'clear'`` indicates that all items (given by ``old``) were
+    removed, and ``'reset'`` that the contents may have changed in an
+    arbitrary way (for example if :meth:`~CallbackList.notify_all` was called
+    directly), in which case receivers should read the whole container again.
+
+    If the change happened inside a nested container, ``path`` gives the
+    sequence of indices and/or keys leading from the container to which the
+    callback was added to the nested container that changed. Changes to
+    callback properties of states inside containers are reported as
+    ``'set'`` changes with ``key`` set to the name of the property.
+
+    Note that ``old`` and ``new`` are the items themselves rather than
+    copies, so if a nested container is added and then modified in the same
+    batch, the container in ``new`` already includes the later changes.
+
+    Parameters
+    ----------
+    kind : str
+        The kind of change, as described above.
+    index : int, optional
+        For lists, the index at which the change happened.
+    key : object, optional
+        For dictionaries, the key that changed.
+    old : object, optional
+        The removed or replaced item(s).
+    new : object, optional
+        The added or new item(s).
+    path : tuple, optional
+        The path to the nested container that changed.
+    """
+
+    __slots__ = ("kind", "index", "key", "old", "new", "path")
+
+    def __init__(self, kind, index=None, key=None, old=None, new=None, path=()):
+        self.kind = kind
+        self.index = index
+        self.key = key
+        self.old = old
+        self.new = new
+        self.path = path
+
+    def _astuple(self):
+        return (self.kind, self.index, self.key, self.old, self.new, self.path)
+
+    def __eq__(self, other):
+        if not isinstance(other, ContainerChange):
+            return NotImplemented
+        return self._astuple() == other._astuple()
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ", ".join(
+            f"{name}={getattr(self, name)!r}" for name in self.__slots__[1:] if getattr(self, name) not in (None, ())
+        )
+        return f"<ContainerChange {self.kind}{': ' if fields else ''}{fields}>"
+
+    def _prefixed(self, prefix):
+        return ContainerChange(self.kind, self.index, self.key, self.old, self.new, (prefix,) + self.path)
+
+
+_MISSING = object()
+
+
+def _same_contents(old, new):
+    """
+    Return whether a list or dictionary has the same contents as a copy made
+    earlier. Items are compared by identity first, so in most cases this does
+    not need to call __eq__ on the items, and items that can't be compared
+    (such as Numpy arrays) are considered to have changed.
+    """
+    if len(old) != len(new):
+        return False
+    if isinstance(old, dict):
+        return all(_same_value(value, new.get(key, _MISSING)) for key, value in old.items())
+    return all(_same_value(value1, value2) for value1, value2 in zip(old, new))
+
+
+class _NestedLink:
+    """
+    Propagate changes of a nested container or state to the container that
+    holds it. Both are only referenced weakly, to avoid circular references.
+    """
+
+    __slots__ = ("parent", "child", "count", "__weakref__")
+
+    def __init__(self, parent, child):
+        self.parent = weakref.ref(parent)
+        self.child = weakref.ref(child)
+        self.count = 1
+
+    def state_changed(self, **kwargs):
+        parent, child = self.parent(), self.child()
+        if parent is not None and child is not None:
+            changes = [ContainerChange("set", key=name, new=new) for name, new in kwargs.items()]
+            parent._notify_nested(child, changes, kwargs)
+
+    def container_changed(self, changes):
+        parent, child = self.parent(), self.child()
+        if parent is not None and child is not None:
+            parent._notify_nested(child, changes, {})
 
 
 class ContainerMixin:
     def _setup_container(self):
         self._callbacks = CallbackContainer()
+        self._detailed_callbacks = CallbackContainer()
         self._item_validators = CallbackContainer()
+        self._links = {}
+        self._batch_depth = 0
+        self._batch_snapshot = None
+        self._batch_pending = False
+        self._batch_forced = False
+        self._batch_changes = None
 
     def _prepare_add(self, value):
         for validator in self._item_validators:
             value = validator(value)
         if isinstance(value, list):
-            value = CallbackList(self.notify_all, value)
+            value = CallbackList(None, value)
         elif isinstance(value, dict):
-            value = CallbackDict(self.notify_all, value)
-        if isinstance(value, HasCallbackProperties):
-            value.add_global_callback(self.notify_all)
-        elif isinstance(value, CallbackList | CallbackDict):
-            value.callback = self.notify_all
+            value = CallbackDict(None, value)
+        if isinstance(value, HasCallbackProperties | ContainerMixin):
+            self._link(value)
         return value
 
     def _cleanup_remove(self, value):
+        if isinstance(value, HasCallbackProperties | ContainerMixin):
+            self._unlink(value)
+
+    def _link(self, value):
+        # Set up a callback so that changes to a nested container or state are
+        # propagated to this container. We keep track of how many times each
+        # value is present so that we only remove the callback once the value
+        # is no longer present. The callback is a method of a _NestedLink
+        # object that only this container references, and callback containers
+        # only keep weak references to methods, so the callback goes away
+        # with this container.
+
+        link = self._links.get(id(value))
+        if link is not None:
+            link.count += 1
+            return
+
+        link = self._links[id(value)] = _NestedLink(self, value)
         if isinstance(value, HasCallbackProperties):
-            value.remove_global_callback(self.notify_all)
-        elif isinstance(value, CallbackList | CallbackDict):
-            value.remove_callback(self.notify_all)
-
-    def add_callback(self, func, priority=0, validator=False):
+            value.add_global_callback(link.state_changed)
+        else:
+            value.add_callback(link.container_changed, detailed=True)
+
+    def _unlink(self, value):
+        link = self._links.get(id(value))
+        if link is None:
+            return
+        link.count -= 1
+        if link.count == 0:
+            del self._links[id(value)]
+            if isinstance(value, HasCallbackProperties):
+                value.remove_global_callback(link.state_changed)
+            else:
+                value.remove_callback(link.container_changed)
+
+    def add_callback(self, func, priority=0, validator=False, detailed=False):
         """
         Add a callback to the container.
 
@@ -49,10 +209,20 @@ class ContainerMixin:
             callback that gets called with the item being added to the
             container *before* the container is modified. The validator can
             return the value as-is, modify it, or emit warnings or an exception.
+        detailed : bool, optional
+            If `True`, the callback is called with a list of
+            `ContainerChange` objects describing what changed, rather than
+            without arguments. This can be used to update any representation
+            of the container incrementally.
         """
 
+        if validator and detailed:
+            raise ValueError("validator and detailed cannot both be True")
+
         if validator:
             self._item_validators.append(func, priority=priority)
+        elif detailed:
+            self._detailed_callbacks.append(func, priority=priority)
         else:
             self._callbacks.append(func, priority=priority)
 
@@ -60,13 +230,95 @@ class ContainerMixin:
         """
         Remove a callback from the container.
         """
-        for cb in (self._callbacks, self._item_validators):
+        for cb in (self._callbacks, self._detailed_callbacks, self._item_validators):
             if func in cb:
                 cb.remove(func)
 
     def notify_all(self, *args, **kwargs):
-        for callback in self._callbacks:
-            callback(*args, **kwargs)
+        # Since we don't know what changed, detailed callbacks are told that
+        # the contents should be read again
+        self._notify(None, *args, **kwargs)
+
+    def _notify(self, changes, *args, **kwargs):
+        # Notify callbacks of the given list of changes (or None if unknown)
+        if self._batch_depth > 0:
+            self._batch_pending = True
+            if changes is None:
+                self._batch_changes = None
+            elif self._batch_changes is not None:
+                self._batch_changes.extend(changes)
+            return
+        if self._detailed_callbacks:
+            if changes is None:
+                changes = [ContainerChange("reset")]
+            if changes:
+                self._detailed_callbacks.dispatch(changes)
+        self._callbacks.dispatch(*args, **kwargs)
+
+    def _changed(self, kind, **kwargs):
+        # Notify callbacks of a single change. The change is only recorded if
+        # there are any detailed callbacks.
+        self._notify([ContainerChange(kind, **kwargs)] if self._detailed_callbacks else None)
+
+    def _notify_nested(self, child, changes, kwargs):
+        # Called when a nested container or state changes - in this case the
+        # contents of this container have changed even if the items themselves
+        # are the same objects as at the start of a batch, so if we are in a
+        # batch we make sure that callbacks are called at the end.
+        if self._batch_depth > 0:
+            self._batch_forced = True
+        # Finding the position of the nested value requires a linear search,
+        # so we only do this if the changes are needed.
+        if self._detailed_callbacks:
+            if isinstance(self, CallbackDict):
+                position = next((key for key, value in self.items() if value is child), None)
+            else:
+                position = next((index for index, value in enumerate(self) if value is child), None)
+            if position is None:  # pragma: no cover
+                changes = None
+            else:
+                changes = [change._prefixed(position) for change in changes]
+        else:
+            changes = None
+        self._notify(changes, **kwargs)
+
+    @contextmanager
+    def batch(self):
+        """
+        Context manager to make several changes to the container and only
+        notify callbacks once at the end.
+
+        Inside the context block, callbacks are not called when the container
+        is modified. On exit, callbacks are called once if the contents of the
+        container (including any nested containers or states) have changed.
+        Batches can be nested, in which case callbacks are only called when
+        exiting the outermost batch. Callbacks added with ``detailed=True``
+        are called with all the changes made inside the batch.
+
+        Examples
+        --------
+
+        ::
+
+            with state.items.batch():
+                for i in range(1000):
+                    state.items.append(i)
+        """
+        if self._batch_depth == 0:
+            self._batch_snapshot = self.copy()
+            self._batch_pending = False
+            self._batch_forced = False
+            self._batch_changes = []
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                snapshot, self._batch_snapshot = self._batch_snapshot, None
+                changes, self._batch_changes = self._batch_changes, None
+                if self._batch_forced or (self._batch_pending and not _same_contents(snapshot, self)):
+                    self._notify(changes)
 
 
 class CallbackList(list, ContainerMixin):
@@ -74,50 +326,66 @@ class CallbackList(list, ContainerMixin):
     A list that calls a callback function when it is modified.
 
     The first argument should be the callback function (which takes no
-    arguments), and subsequent arguments are as for `list`.
+    arguments), or `None`, and subsequent arguments are as for `list`.
     """
 
     def __init__(self, callback, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._setup_container()
-        self.add_callback(callback)
+        if callback is not None:
+            self.add_callback(callback)
         for index, value in enumerate(self):
             super().__setitem__(index, self._prepare_add(value))
 
     def __repr__(self):
         return f"<CallbackList with {len(self)} elements>"
 
+    def _normalize_index(self, index):
+        # Convert negative indices to positive ones, clipping to the range
+        # valid for insertion
+        if index < 0:
+            return max(index + len(self), 0)
+        else:
+            return min(index, len(self))
+
     def append(self, value):
         super().append(self._prepare_add(value))
-        self.notify_all()
+        self._changed("insert", index=len(self) - 1, new=[self[-1]])
 
     def extend(self, iterable):
+        index = len(self)
         iterable = [self._prepare_add(value) for value in iterable]
         super().extend(iterable)
-        self.notify_all()
+        self._changed("insert", index=index, new=iterable)
 
     def insert(self, index, value):
-        super().insert(index, self._prepare_add(value))
-        self.notify_all()
+        index = self._normalize_index(index)
+        value = self._prepare_add(value)
+        super().insert(index, value)
+        self._changed("insert", index=index, new=[value])
 
     def pop(self, index=-1):
         result = super().pop(index)
+        if index < 0:
+            index += len(self) + 1
         self._cleanup_remove(result)
-        self.notify_all()
+        self._changed("remove", index=index, old=[result])
         return result
 
     def remove(self, value):
-        super().remove(value)
-        self._cleanup_remove(value)
-        self.notify_all()
+        index = self.index(value)
+        result = self[index]
+        super().__delitem__(index)
+        self._cleanup_remove(result)
+        self._changed("remove", index=index, old=[result])
 
     def reverse(self):
         super().reverse()
-        self.notify_all()
+        self._changed("reorder")
 
     def sort(self, key=None, reverse=False):
         super().sort(key=key, reverse=reverse)
-        self.notify_all()
+        self._changed("reorder")
 
     def __setitem__(self, slc, new_value):
         old_values = self[slc]
@@ -128,18 +396,62 @@ class CallbackList(list, ContainerMixin):
             self._cleanup_remove(old_value)
 
         if isinstance(slc, slice):
+            start, _, step = slc.indices(len(self))
             new_value = [self._prepare_add(value) for value in new_value]
         else:
+            start, step = self._normalize_index(slc), 1
             new_value = self._prepare_add(new_value)
 
         super().__setitem__(slc, new_value)
-        self.notify_all()
+
+        if not isinstance(slc, slice):
+            self._changed("replace", index=start, old=old_values, new=[new_value])
+            return
+        elif not self._detailed_callbacks:
+            changes = None
+        elif step == 1:
+            changes = [ContainerChange("replace", index=start, old=old_values, new=new_value)]
+        else:
+            indices = range(len(self))[slc]
+            changes = [
+                ContainerChange("replace", index=index, old=[old], new=[new])
+                for index, old, new in zip(indices, old_values, new_value, strict=True)
+            ]
+
+        self._notify(changes)
+
+    def __delitem__(self, slc):
+        old_values = self[slc]
+        if isinstance(slc, slice):
+            indices = range(len(self))[slc]
+        else:
+            old_values = [old_values]
+            indices = [self._normalize_index(slc)]
+
+        super().__delitem__(slc)
+
+        for old_value in old_values:
+            self._cleanup_remove(old_value)
+
+        if not self._detailed_callbacks:
+            changes = None
+        elif isinstance(slc, slice) and indices.step == 1:
+            changes = [ContainerChange("remove", index=indices.start, old=old_values)] if old_values else []
+        else:
+            # Remove items from the end so that the indices remain valid
+            changes = [
+                ContainerChange("remove", index=index, old=[old])
+                for index, old in sorted(zip(indices, old_values, strict=True), key=itemgetter(0), reverse=True)
+            ]
+
+        self._notify(changes)
 
     def clear(self):
-        for item in self:
+        old_values = list(self)
+        for item in old_values:
             self._cleanup_remove(item)
         super().clear()
-        self.notify_all()
+        self._changed("clear", old=old_values)
 
 
 class CallbackDict(dict, ContainerMixin):
@@ -147,47 +459,69 @@ class CallbackDict(dict, ContainerMixin):
     A dictionary that calls a callback function when it is modified.
 
     The first argument should be the callback function (which takes no
-    arguments), and subsequent arguments are passed to `dict`.
+    arguments), or `None`, and subsequent arguments are passed to `dict`.
     """
 
     def __init__(self, callback, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._setup_container()
-        self.add_callback(callback)
+        if callback is not None:
+            self.add_callback(callback)
         for key, value in self.items():
             super().__setitem__(key, self._prepare_add(value))
 
     def clear(self):
-        for value in self.values():
+        old_values = dict(self)
+        for value in old_values.values():
             self._cleanup_remove(value)
         super().clear()
-        self.notify_all()
+        self._changed("clear", old=old_values)
 
     def popitem(self):
         result = super().popitem()
-        self._cleanup_remove(result)
-        self.notify_all()
+        self._cleanup_remove(result[1])
+        self._changed("delete", key=result[0], old=result[1])
         return result
 
     def update(self, *args, **kwargs):
         values = {}
         values.update(*args, **kwargs)
+        # As for _changed, the changes are only recorded if there are any
+        # detailed callbacks.
+        changes = [] if self._detailed_callbacks else None
         for key, value in values.items():
+            old = self.get(key)
+            if key in self:
+                self._cleanup_remove(old)
             values[key] = self._prepare_add(value)
+            if changes is not None:
+                changes.append(ContainerChange("set", key=key, old=old, new=values[key]))
         super().update(values)
-        self.notify_all()
-
-    def pop(self, *args, **kwargs):
-        result = super().pop(*args, **kwargs)
-        self._cleanup_remove(result)
-        self.notify_all()
+        self._notify(changes)
+
+    def pop(self, key, *args):
+        present = key in self
+        result = super().pop(key, *args)
+        if present:
+            self._cleanup_remove(result)
+            self._changed("delete", key=key, old=result)
+        else:
+            self._notify([])
         return result
 
     def __setitem__(self, key, value):
+        old = self.get(key)
         if key in self:
-            self._cleanup_remove(self[key])
-        super().__setitem__(key, self._prepare_add(value))
-        self.notify_all()
+            self._cleanup_remove(old)
+        value = self._prepare_add(value)
+        super().__setitem__(key, value)
+        self._changed("set", key=key, old=old, new=value)
+
+    def __delitem__(self, key):
+        old = self[key]
+        super().__delitem__(key)
+        self._cleanup_remove(old)
+        self._changed("delete", key=key, old=old)
 
     def __repr__(self):
         return f"<CallbackDict with {len(self)} elements>"
@@ -227,6 +561,23 @@ class ListCallbackProperty(CallbackProperty):
 
         super()._default_setter(instance, wrapped_list)
 
+    def _get_full_info(self, instance):
+        # Changes to the contents are tracked by the version (see
+        # _has_changed), so there is no need to copy the list.
+        return self.__get__(instance), None
+
+    def _has_changed(self, old, new):
+        return old[0] != new[0]
+
+    def notify(self, instance, old, new):
+        # If the list is being modified in a batch, we defer the notification
+        # (e.g. from delay_callback) to the end of the batch.
+        container = self._values.get(instance, None)
+        if isinstance(container, CallbackList) and container._batch_depth > 0:
+            container._batch_forced = True
+        else:
+            super().notify(instance, old, new)
+
 
 class DictCallbackProperty(CallbackProperty):
     """
@@ -254,3 +605,20 @@ class DictCallbackProperty(CallbackProperty):
         dcb.function = callback
 
         super()._default_setter(instance, wrapped_dict)
+
+    def _get_full_info(self, instance):
+        # Changes to the contents are tracked by the version (see
+        # _has_changed), so there is no need to copy the dictionary.
+        return self.__get__(instance), None
+
+    def _has_changed(self, old, new):
+        return old[0] != new[0]
+
+    def notify(self, instance, old, new):
+        # If the dictionary is being modified in a batch, we defer the
+        # notification (e.g. from delay_callback) to the end of the batch.
+        container = self._values.get(instance, None)
+        if isinstance(container, CallbackDict) and container._batch_depth > 0:
+            container._batch_forced = True
+        else:
+            super().notify(instance, old, new)
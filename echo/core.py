@@ -1,10 +1,17 @@
+import inspect
+import threading
 import weakref
+from collections import deque
 from contextlib import ExitStack, contextmanager
-from itertools import chain
+from contextvars import ContextVar
+from functools import partial
+from heapq import merge
+from itertools import count
+from operator import is_
 from weakref import WeakKeyDictionary
 
 from .alias import CallbackPropertyAlias
-from .callback_container import CallbackContainer
+from .callback_container import _NO_LOCK, CallbackContainer
 
 __all__ = [
     "CallbackProperty",
@@ -15,8 +22,100 @@ __all__ = [
     "ignore_callback",
     "HasCallbackProperties",
     "keep_in_sync",
+    "ComputedCallbackProperty",
+    "computed",
+    "transaction",
 ]
 
+# Flags used to keep track of whether a property has any callbacks or
+# validators for a given instance, or whether its callbacks are disabled
+# (see CallbackProperty._update_flags)
+_HAS_CALLBACKS = 1
+_HAS_VALIDATORS = 2
+_IS_DISABLED = 4
+
+# Source of the version numbers of properties (see CallbackProperty.notify).
+# Each change gets a new number rather than incrementing a per-instance
+# counter, since drawing from a shared counter is atomic so does not require
+# a lock when properties are changed from several threads.
+_versions = count(1)
+
+# Number of callback properties and aliases that have been created, used by
+# the registries of classes to detect that one may have been added to a class
+# in place of another attribute (see _CallbackPropertyRegistry.is_current).
+_n_callback_attributes = 0
+
+
+def _callback_attribute_created():
+    global _n_callback_attributes
+    _n_callback_attributes += 1
+
+
+# While computed properties are being evaluated, this maps the identifier of
+# each thread doing so to a stack of lists, one for each evaluation in
+# progress, in which the callback properties that are read are recorded (see
+# ComputedCallbackProperty). This is empty the rest of the time, so that
+# CallbackProperty.__get__ only needs to check whether it is empty.
+_frames = {}
+
+# Priority of the callbacks used to update computed and linked properties
+# when the properties they depend on change, which should happen before any
+# other callbacks are called in case these read those properties.
+_INTERNAL_PRIORITY = float("inf")
+
+# The transaction in progress in the current thread or asyncio task, if any
+# (see transaction). The transactions in progress in all threads are also kept
+# in a set, so that setting properties only needs to check whether the set is
+# empty when no transaction is in progress.
+_current_transaction = ContextVar("echo_transaction", default=None)
+_active_transactions = set()
+
+
+def _entry_priority(item):
+    return item[1][-1]
+
+
+class _InstanceStorage:
+    """
+    A mapping-like view onto a single entry of the ``__dict__`` of instances.
+
+    This provides the subset of the `~weakref.WeakKeyDictionary` API used by
+    :class:`CallbackProperty` to keep per-instance state, so that it can be
+    used as a drop-in replacement when the state should be stored on the
+    instances themselves.
+    """
+
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __contains__(self, instance):
+        return self.key in instance.__dict__
+
+    def __getitem__(self, instance):
+        try:
+            return instance.__dict__[self.key]
+        except KeyError:
+            raise KeyError(instance) from None
+
+    def __setitem__(self, instance, value):
+        instance.__dict__[self.key] = value
+
+    def get(self, instance, default=None):
+        return instance.__dict__.get(self.key, default)
+
+    def setdefault(self, instance, default=None):
+        return instance.__dict__.setdefault(self.key, default)
+
+    def pop(self, instance, *args):
+        try:
+            return instance.__dict__.pop(self.key)
+        except KeyError:
+            if args:
+                return args[0]
+            raise KeyError(instance) from None
+
 
 class CallbackProperty:
     """
@@ -44,6 +143,7 @@ class CallbackProperty:
         """
         :param default: The initial value for the property
         """
+        _callback_attribute_created()
         self._default = default
         self._validators = WeakKeyDictionary()
         self._2arg_validators = WeakKeyDictionary()
@@ -51,6 +151,15 @@ class CallbackProperty:
         self._2arg_callbacks = WeakKeyDictionary()
         self._disabled = WeakKeyDictionary()
         self._values = WeakKeyDictionary()
+        self._flags = WeakKeyDictionary()
+        self._merged = WeakKeyDictionary()
+        self._versions = WeakKeyDictionary()
+        self._delays = WeakKeyDictionary()
+        self._dependents = WeakKeyDictionary()
+
+        # Lock used to protect the bookkeeping of callbacks and delays if
+        # thread safety is enabled (see _use_thread_safety)
+        self._lock = _NO_LOCK
 
         if getter is None:
             getter = self._default_getter
@@ -61,33 +170,110 @@ class CallbackProperty:
         self._getter = getter
         self._setter = setter
 
+        # Key of the value in the instance __dict__ if instance storage is
+        # enabled and the default getter is used (see _use_instance_storage)
+        self._instance_key = None
+
         if docstring is not None:
             self.__doc__ = docstring
 
+    def _use_instance_storage(self, name):
+        """
+        Store the per-instance state of this property in the ``__dict__`` of
+        the instances rather than in weak-keyed dictionaries on the property.
+
+        The value is stored under ``name`` (the name of the property), and any
+        other state (callbacks, validators, etc.) under ``name:<table>``.
+        """
+        for attr, table in list(vars(self).items()):
+            if isinstance(table, WeakKeyDictionary):
+                if len(table) > 0:
+                    raise ValueError(f"Cannot change the storage of property '{name}' since it is already in use")
+                setattr(self, attr, _InstanceStorage(name if attr == "_values" else f"{name}:{attr.lstrip('_')}"))
+        if getattr(self._getter, "__func__", None) is CallbackProperty._default_getter:
+            self._instance_key = name
+
+    def _use_thread_safety(self):
+        """
+        Protect the callbacks and delays of this property with a lock, so that
+        callbacks can be added, removed, and delayed from several threads.
+
+        The lock is never held while callbacks are called, and setting the
+        property does not need to acquire it.
+        """
+        if self._lock is _NO_LOCK:
+            self._lock = threading.RLock()
+
+    def _new_container(self):
+        return CallbackContainer(thread_safe=self._lock is not _NO_LOCK)
+
+    def _get_dependents(self, instance):
+        # Return the computed properties that depend on this property (see
+        # ComputedCallbackProperty), adding a callback to keep them up to date
+        # the first time this is called for a given instance.
+        dependents = self._dependents.get(instance, None)
+        if dependents is None:
+            dependents = self._dependents[instance] = _Dependents()
+            self.add_callback(instance, dependents.changed, priority=_INTERNAL_PRIORITY)
+        return dependents
+
     def _default_getter(self, instance, owner=None):
         return self._values.get(instance, self._default)
 
     def _default_setter(self, instance, value):
         self._values.__setitem__(instance, value)
 
+    def _restore(self, instance, value):
+        # Restore a value previously returned by the getter, when rolling back
+        # changes. If the value is the one stored by the property, it is put
+        # back as is rather than through the setter, since e.g. lists and
+        # dictionaries would otherwise be wrapped again.
+        if getattr(self._getter, "__self__", None) is self and getattr(self._setter, "__self__", None) is self:
+            CallbackProperty._default_setter(self, instance, value)
+        else:
+            self._setter(instance, value)
+
     def __get__(self, instance, owner=None):
         if instance is None:
             return self
+        if _frames:
+            _record_dependency(self, instance)
+        if self._instance_key is not None:
+            return instance.__dict__.get(self._instance_key, self._default)
         return self._getter(instance)
 
     def __set__(self, instance, value):
+        flags = self._flags.get(instance, 0)
+
+        # Inside a transaction, changes always need to be recorded, since
+        # global callbacks and rollbacks depend on them.
+        active = _current_transaction.get() if _active_transactions else None
+
+        # If nothing is listening to or validating this property, and the
+        # callbacks aren't disabled (e.g. by delay_callback, which relies on
+        # the version being updated by notify), there is no need to look up
+        # and compare the old and new values.
+        if not flags and active is None:
+            self._setter(instance, value)
+            return
+
         try:
             old = self.__get__(instance)
         except AttributeError:  # pragma: no cover
             old = None
 
-        value = self._validate(instance, old, value)
+        if flags & _HAS_VALIDATORS:
+            value = self._validate(instance, old, value)
+
+        if active is not None:
+            active.record(self, instance)
 
         self._setter(instance, value)
 
-        new = self.__get__(instance)
-        if old != new:
-            self.notify(instance, old, new)
+        if flags & (_HAS_CALLBACKS | _IS_DISABLED) or active is not None:
+            new = self.__get__(instance)
+            if old != new:
+                self.notify(instance, old, new)
 
     def setter(self, func):
         """
@@ -114,6 +300,32 @@ class CallbackProperty:
             value = tuple(value)
         return value, None
 
+    def _get_version(self, instance):
+        # The version changes every time the callbacks are notified of a
+        # change (whether or not they are enabled), which can be used to check
+        # whether a property may have changed without comparing values. Note
+        # that changes made while there are no callbacks and the callbacks
+        # are not disabled are not counted.
+        return self._versions.get(instance, 0)
+
+    def _has_changed(self, old, new):
+        """
+        Given ``(version, full_info)`` tuples from two different times, return
+        whether the property has changed in between.
+        """
+        # If the version hasn't changed, the value can only have changed if
+        # it is a list that was modified in-place, or if a custom getter
+        # returns a value that was changed without going through the
+        # property. Otherwise we compare the values to check that they didn't
+        # just change and change back.
+        if (
+            old[0] == new[0]
+            and not isinstance(old[1][0], tuple)
+            and getattr(self._getter, "__func__", None) is CallbackProperty._default_getter
+        ):
+            return False
+        return old[1] != new[1]
+
     def notify(self, instance, old, new):
         """
         Call all callback functions with the current value
@@ -132,19 +344,58 @@ class CallbackProperty:
         new
             The new value of the property
         """
+        # Inside a transaction, the callbacks are called when the transaction
+        # is committed instead, unless they are disabled, in which case
+        # whatever disabled them (e.g. delay_callback) is responsible for them.
+        if _active_transactions and self.enabled(instance):
+            active = _current_transaction.get()
+            if active is not None:
+                active.record(self, instance, old)
+                self._versions[instance] = next(_versions)
+                return
+
+        self._versions[instance] = next(_versions)
+
         if not self.enabled(instance):
             return
-        iterators = []
-        if container := self._callbacks.get(instance, None):
-            iterators.append((cb, priority, 1) for cb, priority in container.iterator(priority=True, sort=False))
-        if container := self._2arg_callbacks.get(instance, None):
-            iterators.append((cb, priority, 2) for cb, priority in container.iterator(priority=True, sort=False))
-
-        for callback, _priority, args in sorted(chain(*iterators), key=lambda x: x[1], reverse=True):
-            if args == 1:
-                callback(new)
+
+        callbacks = self._callbacks.get(instance, None)
+        callbacks_2arg = self._2arg_callbacks.get(instance, None)
+
+        # In most cases only one kind of callback is present, in which case
+        # the callbacks can be called directly in order of priority.
+        if not callbacks_2arg:
+            if callbacks:
+                callbacks.dispatch(new)
+            return
+        elif not callbacks:
+            callbacks_2arg.dispatch(old, new)
+            return
+
+        # Otherwise we need to merge the two sets of callbacks, which are
+        # already sorted by priority. For equal priorities, merge() yields
+        # items from the first iterable first, so single-argument callbacks
+        # are called first. The merged order is cached until either set of
+        # callbacks changes.
+        ordered, ordered_2arg = callbacks.ordered(), callbacks_2arg.ordered()
+        cached = self._merged.get(instance, None)
+        if cached is None or cached[0] is not ordered or cached[1] is not ordered_2arg:
+            merged = tuple(
+                merge(
+                    ((False, cb) for cb in ordered),
+                    ((True, cb) for cb in ordered_2arg),
+                    key=_entry_priority,
+                    reverse=True,
+                )
+            )
+            self._merged[instance] = cached = (ordered, ordered_2arg, merged)
+
+        invoke = CallbackContainer.invoke
+        for echo_old, callback in cached[2]:
+            if echo_old:
+                invoke(callback, old, new)
             else:
-                callback(old, new)
+                invoke(callback, new)
 
     def _validate(self, instance, old, new):
         """
@@ -176,18 +427,33 @@ class CallbackProperty:
         """
         Disable callbacks for a specific instance
         """
-        self._disabled[instance] = True
+        with self._lock:
+            self._disabled[instance] = True
+            self._update_flags(instance)
 
     def enable(self, instance):
         """
         Enable previously-disabled callbacks for a specific instance
         """
-        self._disabled[instance] = False
+        with self._lock:
+            self._disabled[instance] = False
+            self._update_flags(instance)
 
     def enabled(self, instance):
         return not self._disabled.get(instance, False)
 
-    def add_callback(self, instance, func, echo_old=False, priority=0, validator=False):
+    def add_callback(
+        self,
+        instance,
+        func,
+        echo_old=False,
+        priority=0,
+        validator=False,
+        executor=None,
+        coalesce=False,
+        concurrency=None,
+        cancel_previous=False,
+    ):
         """
         Add a callback to a specific instance that manages this property
 
@@ -210,18 +476,75 @@ class CallbackProperty:
             validator can return a modified value (for example it can be used
             to change the types of values or change properties in-place) or it
             can also raise an exception.
+        executor : optional
+            If specified, the callback is called by this executor rather than
+            directly in the thread in which the property is set. This can be
+            an `asyncio` event loop, in which case the callback is called in
+            the thread running the loop, or any object with a ``submit(func)``
+            method, such as a `concurrent.futures.Executor` or
+            :class:`echo.qt.MainThreadExecutor` to call the callback in the Qt
+            main thread.
+        coalesce : bool, optional
+            If `True` and an executor is given, changes made while the callback
+            is still waiting to be called by the executor only result in a
+            single call with the most recent value.
+        concurrency : int, optional
+            If the callback is a coroutine function (defined with ``async
+            def``), the maximum number of calls to it that can run at the same
+            time. By default, this is not limited.
+        cancel_previous : bool, optional
+            If the callback is a coroutine function, whether to cancel calls
+            that are still running when the property changes again.
+
+        Notes
+        -----
+        Coroutine functions are run as tasks on the event loop running in the
+        thread in which the property is set, or on ``executor`` if it is an
+        event loop. Exceptions raised by them are passed to the exception
+        handler of the loop rather than to the code that set the property.
         """
 
         if validator:
-            if echo_old:
-                self._2arg_validators.setdefault(instance, CallbackContainer()).append(func, priority=priority)
-            else:
-                self._validators.setdefault(instance, CallbackContainer()).append(func, priority=priority)
+            if executor is not None:
+                raise ValueError("validators cannot be called by an executor")
+            if inspect.iscoroutinefunction(func):
+                raise ValueError("validators cannot be async functions")
+            table = self._2arg_validators if echo_old else self._validators
         else:
-            if echo_old:
-                self._2arg_callbacks.setdefault(instance, CallbackContainer()).append(func, priority=priority)
-            else:
-                self._callbacks.setdefault(instance, CallbackContainer()).append(func, priority=priority)
+            table = self._2arg_callbacks if echo_old else self._callbacks
+
+        with self._lock:
+            container = table.get(instance, None)
+            if container is None:
+                container = table[instance] = self._new_container()
+            container.append(
+                func,
+                priority=priority,
+                executor=executor,
+                coalesce=coalesce,
+                concurrency=concurrency,
+                cancel_previous=cancel_previous,
+            )
+            self._update_flags(instance)
+            self._merged.pop(instance, None)
+
+    def _update_flags(self, instance):
+        # Keep track of whether there are any callbacks or validators for the
+        # instance, so that __set__ can skip the work needed to call them
+        # if there are none. Note that the flags may overestimate what is
+        # present if callbacks are removed because their instance has been
+        # garbage collected, which is harmless.
+        flags = 0
+        if self._callbacks.get(instance, None) or self._2arg_callbacks.get(instance, None):
+            flags |= _HAS_CALLBACKS
+        if self._validators.get(instance, None) or self._2arg_validators.get(instance, None):
+            flags |= _HAS_VALIDATORS
+        if self._disabled.get(instance, False):
+            flags |= _IS_DISABLED
+        if flags:
+            self._flags[instance] = flags
+        else:
+            self._flags.pop(instance, None)
 
     @property
     def _all_callbacks(self):
@@ -238,43 +561,180 @@ class CallbackProperty:
         func : func
             The callback function to remove
         """
-        for cb in self._all_callbacks:
-            if instance not in cb:
-                continue
-            if func in cb[instance]:
-                cb[instance].remove(func)
-                return
-        else:
-            raise ValueError(f"Callback function not found: {func}")
+        with self._lock:
+            for cb in self._all_callbacks:
+                if instance not in cb:
+                    continue
+                if func in cb[instance]:
+                    cb[instance].remove(func)
+                    self._update_flags(instance)
+                    self._merged.pop(instance, None)
+                    return
+        raise ValueError(f"Callback function not found: {func}")
 
     def clear_callbacks(self, instance):
         """
         Remove all callbacks on this property.
         """
-        for cb in self._all_callbacks:
-            if instance in cb:
-                cb[instance].clear()
-        if instance in self._disabled:
-            self._disabled.pop(instance)
+        with self._lock:
+            for cb in self._all_callbacks:
+                if instance in cb:
+                    cb[instance].clear()
+            if instance in self._disabled:
+                self._disabled.pop(instance)
+            self._flags.pop(instance, None)
+            # Computed properties that depend on this one rely on a callback
+            # to find out about changes, which should be kept.
+            dependents = self._dependents.pop(instance, None)
+            if dependents is not None and dependents.nodes:
+                self._get_dependents(instance).nodes.update(dependents.nodes)
+
+
+def _is_callback_attribute(value):
+    return isinstance(value, CallbackProperty | CallbackPropertyAlias)
+
+
+class _CallbackPropertyRegistry:
+    """
+    Lookup table of the callback properties and aliases available on a class
+    (including inherited ones), sorted by name as :func:`dir` would be.
+
+    The registry records the size of the namespace of each class in the MRO,
+    and the callback properties and aliases defined on each of them, when it
+    is built, so that attributes being added, removed, or replaced on the
+    class or any of its bases after the fact can be cheaply detected and the
+    registry rebuilt (see :meth:`is_current`).
+    """
+
+    __slots__ = ("owner", "properties", "names", "aliases", "alias_targets", "containers", "_created", "_snapshot")
+
+    def __init__(self, owner):
+        from .containers import DictCallbackProperty, ListCallbackProperty
+
+        self.owner = owner
+
+        attributes = {}
+        for cls in reversed(owner.__mro__):
+            attributes.update(vars(cls))
+
+        self._created = _n_callback_attributes
+        snapshot = []
+        # object can't be modified, so there is no need to keep track of it
+        for cls in owner.__mro__[:-1]:
+            namespace = vars(cls)
+            names = tuple(name for name, value in namespace.items() if _is_callback_attribute(value))
+            snapshot.append((namespace, len(namespace), names, tuple(map(namespace.get, names))))
+        self._snapshot = tuple(snapshot)
+
+        self.properties = {}
+        self.aliases = {}
+        for name in sorted(attributes):
+            value = attributes[name]
+            if isinstance(value, CallbackProperty):
+                self.properties[name] = value
+            elif isinstance(value, CallbackPropertyAlias):
+                self.aliases[name] = value
+
+        # Reverse index mapping properties to their names, used when calling
+        # the global callbacks at the end of a transaction.
+        self.names = {}
+        for name, prop in self.properties.items():
+            self.names.setdefault(prop, name)
+
+        # Reverse index mapping the name of a property to the names of the
+        # aliases that point to it, used when notifying global callbacks.
+        self.alias_targets = {}
+        for name, alias in self.aliases.items():
+            self.alias_targets.setdefault(alias._target, []).append(name)
+
+        self.containers = {
+            name: prop
+            for name, prop in self.properties.items()
+            if isinstance(prop, ListCallbackProperty | DictCallbackProperty)
+        }
+
+    def is_current(self):
+        """
+        Return whether the callback properties and aliases of the class are
+        still the ones the registry was built from.
+        """
+        # A callback property or alias can only replace another attribute
+        # without changing the size of the namespace if it was created since
+        # the registry was built, and otherwise it is enough to check that the
+        # callback properties and aliases are still there, which is much
+        # cheaper than looking through all the attributes.
+        if self._created != _n_callback_attributes:
+            return False
+        for namespace, size, names, values in self._snapshot:
+            if len(namespace) != size or not all(map(is_, map(namespace.get, names), values)):
+                return False
+        return True
+
+
+def _get_registry(cls):
+    """
+    Return the up-to-date :class:`_CallbackPropertyRegistry` for ``cls``.
+    """
+    registry = vars(cls).get("_callback_registry", None)
+    if registry is None or not registry.is_current():
+        # Make sure the attribute exists before building the registry, since
+        # adding it would otherwise change the size of the class namespace.
+        if "_callback_registry" not in vars(cls):
+            cls._callback_registry = None
+        registry = cls._callback_registry = _CallbackPropertyRegistry(cls)
+    return registry
 
 
 class HasCallbackProperties:
     """
     A class that adds functionality to subclasses that use callback properties.
+
+    By default, the values of callback properties (as well as any callbacks
+    attached to them) are stored on the :class:`CallbackProperty` objects,
+    keyed by instance. Subclasses can instead opt in to storing this state on
+    the instances themselves, which makes accessing and setting properties
+    faster::
+
+        class State(HasCallbackProperties, instance_storage=True):
+            x_min = CallbackProperty(0)
+
+    This applies to the callback properties defined on the class itself and
+    is inherited by subclasses. The values of the properties are then stored
+    in the instance ``__dict__`` under the name of the property, so are also
+    included in e.g. `vars`.
+
+    Similarly, subclasses can opt in to making it safe to add, remove, and
+    delay callbacks, and to set properties, from several threads at the same
+    time by passing ``thread_safe=True``. Callbacks are called in the thread
+    in which the property is set.
     """
 
-    def __init__(self):
-        from .containers import DictCallbackProperty, ListCallbackProperty
+    _instance_storage = False
+    _thread_safe = False
+
+    def __init_subclass__(cls, instance_storage=None, thread_safe=None, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if instance_storage is not None:
+            cls._instance_storage = instance_storage
+        if thread_safe is not None:
+            cls._thread_safe = thread_safe
+        for name, prop in vars(cls).items():
+            if isinstance(prop, CallbackProperty):
+                if cls._instance_storage:
+                    prop._use_instance_storage(name)
+                if cls._thread_safe:
+                    prop._use_thread_safety()
+        _get_registry(cls)
 
-        self._global_callbacks = CallbackContainer()
+    def __init__(self):
+        self._global_callbacks = CallbackContainer(thread_safe=self._thread_safe)
         self._ignored_properties = set()
         self._delayed_properties = {}
         self._delay_global_calls = {}
         self._callback_wrappers = {}
         self._notify_context_managers = []
-        for prop_name, prop in self.iter_callback_properties():
-            if isinstance(prop, ListCallbackProperty | DictCallbackProperty):
-                prop.add_callback(self, self._notify_global_listordict)
+        for prop in _get_registry(type(self)).containers.values():
+            prop.add_callback(self, self._notify_global_listordict)
 
     def _ignore_global_callbacks(self, properties):
         # This is to allow ignore_callbacks to work for global callbacks
@@ -287,67 +747,141 @@ class HasCallbackProperties:
 
     def _delay_global_callbacks(self, properties):
         # This is to allow delay_callback to still have an effect in delaying
-        # global callbacks. We set _delayed_properties to a dictionary of the
-        # values at the point at which the callbacks are delayed.
+        # global callbacks. We add the properties being delayed to
+        # _delayed_properties so that global callbacks for them are skipped.
         self._delayed_properties.update(properties)
 
+    def _undelay_global_callbacks(self, properties):
+        # Called when properties are no longer delayed, before any callbacks
+        # are called with _process_delayed_global_callbacks.
+        for prop in properties:
+            self._delayed_properties.pop(prop)
+
     def _process_delayed_global_callbacks(self, properties):
         # Once this is called, the global callbacks are called once each with
         # a dictionary of the current values of properties that have been
-        # resumed.
+        # resumed and have changed. The properties are given as a dictionary
+        # mapping names to (changed, value) tuples.
         kwargs = {}
-        for prop, new_value in properties.items():
-            old_value = self._delayed_properties.pop(prop)
-            if old_value != new_value:
-                kwargs[prop] = new_value[0]
+        for prop, (changed, new_value) in properties.items():
+            if changed:
+                kwargs[prop] = new_value
         self._notify_global(**kwargs)
 
     def _notify_global_listordict(self, *args):
-        from .containers import DictCallbackProperty, ListCallbackProperty
-
         properties = {}
-        for prop_name, prop in self.iter_callback_properties():
-            if isinstance(prop, ListCallbackProperty | DictCallbackProperty):
-                callback_listordict = getattr(self, prop_name)
-                if callback_listordict is args[0]:
-                    properties[prop_name] = callback_listordict
-                    break
+        for prop_name in _get_registry(type(self)).containers:
+            callback_listordict = getattr(self, prop_name)
+            if callback_listordict is args[0]:
+                properties[prop_name] = callback_listordict
+                break
         self._notify_global(**properties)
 
     def _get_aliases_for(self, name):
         """
         Return a list of alias names that point to the given property name.
         """
-        return [
-            attr_name
-            for attr_name in dir(type(self))
-            if self.is_alias(attr_name) and getattr(type(self), attr_name)._target == name
-        ]
+        return list(_get_registry(type(self)).alias_targets.get(name, ()))
 
     def _notify_global(self, **kwargs):
-        # Add aliases for any properties being notified (for backward compatibility)
-        kwargs.update(
-            {alias: value for prop_name, value in kwargs.items() for alias in self._get_aliases_for(prop_name)}
-        )
-
-        for prop in set(self._delayed_properties) | set(self._ignored_properties):
-            if prop in kwargs:
-                kwargs.pop(prop)
+        # Inside a transaction, the global callbacks are called once with all
+        # the properties that have changed when the transaction is committed.
+        if _active_transactions and _current_transaction.get() is not None:
+            return
+
+        # Add aliases for any properties being notified (for backward
+        # compatibility). Most classes don't define any aliases, in which
+        # case there is nothing to do.
+        if alias_targets := _get_registry(type(self)).alias_targets:
+            kwargs.update(
+                {alias: value for prop_name, value in kwargs.items() for alias in alias_targets.get(prop_name, ())}
+            )
+
+        if self._delayed_properties or self._ignored_properties:
+            for prop in set(self._delayed_properties) | set(self._ignored_properties):
+                if prop in kwargs:
+                    kwargs.pop(prop)
         if len(kwargs) > 0:
-            for callback in self._global_callbacks:
-                callback(**kwargs)
+            self._global_callbacks.dispatch(**kwargs)
 
     def __setattr__(self, attribute, value):
         # Trigger global callbacks for callback properties, but not aliases
         # (aliases will trigger via the target property they redirect to)
-        is_callback = self.is_callback_property(attribute) and not self.is_alias(attribute)
+        is_callback = isinstance(getattr(type(self), attribute, None), CallbackProperty)
         if is_callback:
             previous_value = getattr(self, attribute, None)
         super().__setattr__(attribute, value)
         if is_callback and value != previous_value:
             self._notify_global(**{attribute: value})
 
-    def add_callback(self, name, callback, echo_old=False, priority=0, validator=False):
+    def update(self, **kwargs):
+        """
+        Set several callback properties at once.
+
+        The properties are set inside a :func:`transaction`, so the callbacks
+        of each property that changes are called once in order of priority,
+        followed by a single call to the global callbacks with all the
+        properties that have changed. If any of the values can't be set, for
+        example because a validator raises an exception, the values that were
+        already set are restored and the exception is raised without calling
+        any callbacks.
+
+        Parameters
+        ----------
+        **kwargs
+            The new values of the properties, by name
+
+        Examples
+        --------
+
+        ::
+
+            state.update(x_min=0, x_max=10, log=True)
+        """
+        _set_properties([(self, name, value) for name, value in kwargs.items()])
+
+    @classmethod
+    def bulk_set(cls, instances, name, values):
+        """
+        Set the same callback property on several instances at once.
+
+        This behaves like :meth:`update`, but for one property on many
+        instances, all of which are changed in a single :func:`transaction`.
+
+        Parameters
+        ----------
+        instances : iterable
+            The instances to change
+        name : str
+            The name of the callback property
+        values : iterable
+            The new values of the property, one for each instance
+
+        Examples
+        --------
+
+        ::
+
+            ViewerState.bulk_set(states, 'x_min', [0, 1, 2])
+        """
+        instances = list(instances)
+        values = list(values)
+        if len(instances) != len(values):
+            raise ValueError(f"Got {len(values)} values for {len(instances)} instances")
+        _set_properties([(instance, name, value) for instance, value in zip(instances, values)])
+
+    def add_callback(
+        self,
+        name,
+        callback,
+        echo_old=False,
+        priority=0,
+        validator=False,
+        executor=None,
+        coalesce=False,
+        concurrency=None,
+        cancel_previous=False,
+    ):
         """
         Add a callback that gets triggered when a callback property of the
         class changes.
@@ -370,13 +904,38 @@ class HasCallbackProperties:
             callback that gets called *before* the property is set. The
             validator can return a modified value (for example it can be used
             to change the types of values or change properties in-place) or it
-            can also raise an exception."""
+            can also raise an exception.
+        executor : optional
+            If specified, the callback is called by this executor rather than
+            directly in the thread in which the property is set (see
+            :meth:`CallbackProperty.add_callback`).
+        coalesce : bool, optional
+            If `True` and an executor is given, changes made while the callback
+            is still waiting to be called by the executor only result in a
+            single call with the most recent value.
+        concurrency : int, optional
+            If the callback is a coroutine function, the maximum number of
+            calls to it that can run at the same time (see
+            :meth:`CallbackProperty.add_callback`).
+        cancel_previous : bool, optional
+            If the callback is a coroutine function, whether to cancel calls
+            that are still running when the property changes again."""
         if self.is_callback_property(name):
             prop = getattr(type(self), name)
             if self.is_alias(name):
                 prop._warn()
                 prop = prop._target_property
-            prop.add_callback(self, callback, echo_old=echo_old, priority=priority, validator=validator)
+            prop.add_callback(
+                self,
+                callback,
+                echo_old=echo_old,
+                priority=priority,
+                validator=validator,
+                executor=executor,
+                coalesce=coalesce,
+                concurrency=concurrency,
+                cancel_previous=cancel_previous,
+            )
         else:
             raise TypeError(f"attribute '{name}' is not a callback property")
 
@@ -404,7 +963,7 @@ class HasCallbackProperties:
         else:
             raise TypeError(f"attribute '{name}' is not a callback property")
 
-    def add_global_callback(self, callback):
+    def add_global_callback(self, callback, executor=None, coalesce=False):
         """
         Add a global callback function, which is a callback that gets triggered
         when any callback properties on the class change.
@@ -413,8 +972,26 @@ class HasCallbackProperties:
         ----------
         callback : func
             The callback function to add
+        executor : optional
+            If specified, the callback is called by this executor rather than
+            directly in the thread in which the properties are set (see
+            :meth:`CallbackProperty.add_callback`).
+        coalesce : bool, optional
+            If `True` and an executor is given, changes made while the callback
+            is still waiting to be called by the executor only result in a
+            single call with the most recent values.
         """
-        self._global_callbacks.append(callback)
+        self._global_callbacks.append(callback, executor=executor, coalesce=coalesce)
+        # Compute the values of any computed properties so that we find out
+        # about changes to the properties they depend on. Computed properties
+        # that can't be evaluated yet (e.g. because the properties they depend
+        # on still have their default values) are only evaluated when read.
+        for prop in _get_registry(type(self)).properties.values():
+            if isinstance(prop, ComputedCallbackProperty):
+                try:
+                    prop._evaluate(self)
+                except Exception:
+                    pass
 
     def remove_global_callback(self, callback):
         """
@@ -460,10 +1037,7 @@ class HasCallbackProperties:
         Note: This does not include CallbackPropertyAlias instances, only
         actual CallbackProperty instances.
         """
-        for name in dir(self):
-            prop = getattr(type(self), name, None)
-            if isinstance(prop, CallbackProperty):
-                yield name, prop
+        yield from _get_registry(type(self)).properties.items()
 
     def callback_properties(self):
         """
@@ -503,7 +1077,18 @@ def _resolve_callback_property(instance, prop):
     return prop, p
 
 
-def add_callback(instance, prop, callback, echo_old=False, priority=0, validator=False):
+def add_callback(
+    instance,
+    prop,
+    callback,
+    echo_old=False,
+    priority=0,
+    validator=False,
+    executor=None,
+    coalesce=False,
+    concurrency=None,
+    cancel_previous=False,
+):
     """
     Attach a callback function to a property in an instance
 
@@ -528,6 +1113,21 @@ def add_callback(instance, prop, callback, echo_old=False, priority=0, validator
             validator can return a modified value (for example it can be used
             to change the types of values or change properties in-place) or it
             can also raise an exception.
+    executor : optional
+        If specified, the callback is called by this executor rather than
+        directly in the thread in which the property is set (see
+        :meth:`CallbackProperty.add_callback`).
+    coalesce : bool, optional
+        If `True` and an executor is given, changes made while the callback is
+        still waiting to be called by the executor only result in a single call
+        with the most recent value.
+    concurrency : int, optional
+        If the callback is a coroutine function, the maximum number of calls to
+        it that can run at the same time (see
+        :meth:`CallbackProperty.add_callback`).
+    cancel_previous : bool, optional
+        If the callback is a coroutine function, whether to cancel calls that
+        are still running when the property changes again.
 
     Examples
     --------
@@ -547,7 +1147,17 @@ def add_callback(instance, prop, callback, echo_old=False, priority=0, validator
     prop, p = _resolve_callback_property(instance, prop)
     if not isinstance(p, CallbackProperty):
         raise TypeError(f"{prop} is not a CallbackProperty")
-    p.add_callback(instance, callback, echo_old=echo_old, priority=priority, validator=validator)
+    p.add_callback(
+        instance,
+        callback,
+        echo_old=echo_old,
+        priority=priority,
+        validator=validator,
+        executor=executor,
+        coalesce=coalesce,
+        concurrency=concurrency,
+        cancel_previous=cancel_previous,
+    )
 
 
 def remove_callback(instance, prop, callback):
@@ -596,6 +1206,272 @@ def callback_property(getter):
     return cb
 
 
+def _record_dependency(prop, instance):
+    # Called when a callback property is read, to record it as a dependency of
+    # the computed property being evaluated in the current thread, if any,
+    # along with its current version.
+    stack = _frames.get(threading.get_ident())
+    if stack:
+        stack[-1].append((prop, instance, prop._get_version(instance)))
+
+
+class _Dependents:
+    """
+    The computed properties that depend on a callback property of a specific
+    instance.
+
+    For computed properties, this is stored on the node of the property (see
+    _ComputedNode), while for other callback properties, this is stored in
+    ``CallbackProperty._dependents`` and :meth:`changed` is added as a callback.
+    """
+
+    __slots__ = ("nodes", "__weakref__")
+
+    def __init__(self):
+        self.nodes = set()
+
+    def changed(self, *args):
+        # Find all the computed properties that depend on the property, either
+        # directly or indirectly, and only once all of them are found, update
+        # the ones that are being observed. Since reading a computed property
+        # first checks whether the properties it depends on have changed, the
+        # order in which they are updated doesn't matter and each of them is
+        # only updated once.
+        observed = []
+        seen = set()
+        stack = list(self.nodes)
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            instance = node.instance()
+            if instance is None:
+                continue
+            if node.prop._is_observed(instance):
+                observed.append((node, instance))
+            stack.extend(node.dependents.nodes)
+        for node, instance in observed:
+            node.prop._refresh(instance)
+
+
+class _ComputedNode:
+    """
+    The state of a computed property for a specific instance.
+    """
+
+    __slots__ = ("prop", "instance", "value", "dependencies", "dependents", "evaluating", "seen")
+
+    def __init__(self, prop, instance):
+        self.prop = prop
+        self.instance = weakref.ref(instance)
+        self.value = None
+        # A tuple of (property, instance weakref, version) for each property
+        # read when the value was last computed, or None if it hasn't been
+        # computed yet.
+        self.dependencies = None
+        self.dependents = _Dependents()
+        self.evaluating = False
+        # The (version, value) last seen by the callbacks (see _refresh)
+        self.seen = None
+
+    def is_current(self):
+        if self.dependencies is None:
+            return False
+        for prop, ref, version in self.dependencies:
+            instance = ref()
+            if instance is None:
+                return False
+            if isinstance(prop, ComputedCallbackProperty):
+                # Bring the value up to date first, which changes the version
+                # if the value changes.
+                prop._evaluate(instance)
+            elif prop._dependents.get(instance) is None:
+                return False
+            if prop._get_version(instance) != version:
+                return False
+        return True
+
+    def update_dependencies(self, dependencies):
+        # Remove duplicates, keeping the first version read for each property
+        unique = {}
+        for prop, instance, version in dependencies:
+            unique.setdefault((prop, id(instance)), (prop, instance, version))
+
+        old = {(prop, id(ref())): (prop, ref) for prop, ref, _ in self.dependencies or ()}
+
+        for key, (prop, ref) in old.items():
+            instance = ref()
+            if key not in unique and instance is not None:
+                prop._get_dependents(instance).nodes.discard(self)
+
+        # The dependents are looked up again even for properties that were
+        # already dependencies, since they are discarded if the callbacks of
+        # the property are cleared.
+        for prop, instance, _ in unique.values():
+            prop._get_dependents(instance).nodes.add(self)
+
+        self.dependencies = tuple((prop, weakref.ref(instance), version) for prop, instance, version in unique.values())
+
+
+class ComputedCallbackProperty(CallbackProperty):
+    """
+    A read-only callback property whose value is computed from other callback
+    properties.
+
+    The callback properties that are read by the function computing the value
+    are recorded, and the value is cached until any of them change. The value
+    is only recomputed when it is read, unless callbacks have been added to
+    the computed property, in which case it is recomputed as soon as any of
+    the properties it depends on change, and the callbacks are called if the
+    value is different.
+
+    Parameters
+    ----------
+    func : func
+        The function computing the value, which is called with the instance
+        as the only argument.
+    docstring : str, optional
+        The docstring for the property, which defaults to the docstring of
+        ``func``.
+
+    Examples
+    --------
+
+    ::
+
+        class State(HasCallbackProperties):
+
+            x_min = CallbackProperty(1)
+
+            @computed
+            def x_log_min(self):
+                return math.log10(self.x_min)
+    """
+
+    def __init__(self, func, docstring=None):
+        super().__init__(docstring=func.__doc__ if docstring is None else docstring)
+        self._func = func
+        self._name = func.__name__
+        self._nodes = WeakKeyDictionary()
+
+    def __set_name__(self, owner, name):
+        self._name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = self._evaluate(instance)
+        if _frames:
+            _record_dependency(self, instance)
+        return value
+
+    def __set__(self, instance, value):
+        raise AttributeError(f"computed property '{self._name}' cannot be set")
+
+    def _get_node(self, instance):
+        node = self._nodes.get(instance, None)
+        if node is None:
+            node = self._nodes[instance] = _ComputedNode(self, instance)
+        return node
+
+    def _get_dependents(self, instance):
+        return self._get_node(instance).dependents
+
+    def _evaluate(self, instance):
+        """
+        Return the value of the property, computing it if needed.
+        """
+        node = self._get_node(instance)
+
+        if node.is_current():
+            return node.value
+
+        if node.evaluating:
+            raise RuntimeError(f"computed property '{self._name}' depends on itself")
+
+        ident = threading.get_ident()
+        frame = []
+        _frames.setdefault(ident, []).append(frame)
+        node.evaluating = True
+        try:
+            value = self._func(instance)
+        finally:
+            node.evaluating = False
+            stack = _frames[ident]
+            stack.pop()
+            if not stack:
+                del _frames[ident]
+
+        first = node.dependencies is None
+        node.update_dependencies(frame)
+
+        # The version is used by computed properties that depend on this one
+        # to find out whether the value has changed.
+        if first or node.value is not value and node.value != value:
+            self._versions[instance] = next(_versions)
+        node.value = value
+
+        # Keep track of the value that the callbacks would have seen if they
+        # were called, so that _refresh can check whether it has changed.
+        if node.seen is None or not self._is_observed(instance):
+            node.seen = self._get_version(instance), value
+
+        return value
+
+    def _is_observed(self, instance):
+        if self._flags.get(instance, 0) & (_HAS_CALLBACKS | _IS_DISABLED):
+            return True
+        return isinstance(instance, HasCallbackProperties) and len(instance._global_callbacks) > 0
+
+    def _refresh(self, instance):
+        """
+        Recompute the value after a change to one of the properties this
+        depends on, and call the callbacks if it has changed.
+        """
+        node = self._get_node(instance)
+        value = self._evaluate(instance)
+        version = self._get_version(instance)
+        old_version, old = node.seen
+        if version == old_version or old is value or old == value:
+            node.seen = version, value
+            return
+        self.notify(instance, old, value)
+        node.seen = self._get_version(instance), value
+        if isinstance(instance, HasCallbackProperties):
+            instance._notify_global(**{self._name: value})
+
+    def add_callback(self, instance, func, *args, **kwargs):
+        super().add_callback(instance, func, *args, **kwargs)
+        # Compute the value so that we find out about changes to the
+        # properties it depends on.
+        self._evaluate(instance)
+
+    def clear_callbacks(self, instance):
+        super().clear_callbacks(instance)
+        self._nodes.pop(instance, None)
+
+
+def computed(func):
+    """
+    Decorator to create a :class:`ComputedCallbackProperty` from a method.
+
+    Examples
+    --------
+
+    ::
+
+        class State(HasCallbackProperties):
+
+            x_min = CallbackProperty(1)
+
+            @computed
+            def x_log_min(self):
+                return math.log10(self.x_min)
+    """
+    return ComputedCallbackProperty(func)
+
+
 class delay_callback:
     """
     Delay any callback functions from one or more callback properties
@@ -622,12 +1498,14 @@ class delay_callback:
         print('done')  # callbacks triggered at this point, if needed
     """
 
-    # Class-level registry of properties and how many times the callbacks have
-    # been delayed. The idea is that when nesting calls to delay_callback, the
-    # delay count is increased, and every time __exit__ is called, the count is
-    # decreased, and once the count reaches zero, the callback is triggered.
-    delay_count = {}
-    old_values = {}
+    # For each property and instance, we keep track of how many times the
+    # callbacks have been delayed, along with the state of the property before
+    # the first delay, in a [count, old] list in CallbackProperty._delays. The
+    # idea is that when nesting calls to delay_callback, the delay count is
+    # increased, and every time __exit__ is called, the count is decreased,
+    # and once the count reaches zero, the callback is triggered. If thread
+    # safety is enabled, the count is protected by the lock of the property,
+    # so the same property can be delayed from several threads.
 
     def __init__(self, instance, *props):
         self.instance = instance
@@ -635,26 +1513,27 @@ class delay_callback:
         self.props = tuple(_resolve_callback_property(instance, p)[0] for p in props)
 
     def __enter__(self):
-        delay_props = {}
+        has_global = isinstance(self.instance, HasCallbackProperties)
 
         for prop in self.props:
             p = getattr(type(self.instance), prop)
             if not isinstance(p, CallbackProperty):
                 raise TypeError(f"{prop} is not a CallbackProperty")
 
-            if (self.instance, prop) not in self.delay_count:
-                self.delay_count[self.instance, prop] = 1
-                self.old_values[self.instance, prop] = p._get_full_info(self.instance)
-                delay_props[prop] = p._get_full_info(self.instance)
-            else:
-                self.delay_count[self.instance, prop] += 1
-
-            p.disable(self.instance)
+            with p._lock:
+                delay = p._delays.get(self.instance)
+                if delay is None:
+                    p._delays[self.instance] = [1, (p._get_version(self.instance), p._get_full_info(self.instance))]
+                    if has_global:
+                        self.instance._delay_global_callbacks({prop: None})
+                else:
+                    delay[0] += 1
 
-        if isinstance(self.instance, HasCallbackProperties):
-            self.instance._delay_global_callbacks(delay_props)
+                p.disable(self.instance)
 
     def __exit__(self, *args):
+        has_global = isinstance(self.instance, HasCallbackProperties)
+
         resume_props = {}
 
         notifications = []
@@ -664,18 +1543,24 @@ class delay_callback:
             if not isinstance(p, CallbackProperty):  # pragma: no cover
                 raise TypeError(f"{prop} is not a CallbackProperty")
 
-            if self.delay_count[self.instance, prop] > 1:
-                self.delay_count[self.instance, prop] -= 1
-            else:
-                self.delay_count.pop((self.instance, prop))
-                old = self.old_values.pop((self.instance, prop))
+            with p._lock:
+                delay = p._delays[self.instance]
+                if delay[0] > 1:
+                    delay[0] -= 1
+                    continue
+                old = p._delays.pop(self.instance)[1]
                 p.enable(self.instance)
-                new = p._get_full_info(self.instance)
-                if old != new:
-                    notifications.append((p, (self.instance, old[0], new[0])))
-                resume_props[prop] = new
+                if has_global:
+                    self.instance._undelay_global_callbacks((prop,))
 
-        if isinstance(self.instance, HasCallbackProperties):
+            new = p._get_version(self.instance), p._get_full_info(self.instance)
+            if p._has_changed(old, new):
+                notifications.append((p, (self.instance, old[1][0], new[1][0])))
+                resume_props[prop] = True, new[1][0]
+            else:
+                resume_props[prop] = False, None
+
+        if has_global:
             self.instance._process_delayed_global_callbacks(resume_props)
 
         if cms := getattr(self.instance, "_notify_context_managers", None):
@@ -740,44 +1625,422 @@ def ignore_callback(instance, *props):
         instance._unignore_global_callbacks(props)
 
 
+def _is_container_callback(entry):
+    # The callbacks that HasCallbackProperties adds to list and dict
+    # properties to call the global callbacks
+    return len(entry) == 3 and entry[0]() is HasCallbackProperties._notify_global_listordict
+
+
+# Marks properties whose value can't be rolled back by a transaction
+_NO_VALUE = object()
+
+
+class _Transaction:
+    """
+    The state of the properties changed during a :func:`transaction`.
+    """
+
+    __slots__ = ("rollback", "records")
+
+    def __init__(self, rollback):
+        self.rollback = rollback
+        # Maps (property, instance id) to [property, instance, (version,
+        # full_info), value] lists, in the order in which the properties were
+        # first changed. The state is None until the property changes while
+        # its callbacks are enabled, and the value is only recorded if it can
+        # be rolled back.
+        self.records = {}
+
+    def record(self, prop, instance, old=_NO_VALUE):
+        """
+        Record the state of a property before it first changes. This is
+        called by :meth:`CallbackProperty.__set__` before a value is assigned,
+        and otherwise by :meth:`CallbackProperty.notify` with the old value.
+        """
+        key = prop, id(instance)
+        record = self.records.get(key, None)
+        if record is None:
+            record = self.records[key] = [prop, instance, None, _NO_VALUE]
+            if old is _NO_VALUE and self.rollback:
+                record[3] = prop.__get__(instance)
+        elif record[2] is not None:
+            return
+
+        # Changes made while the callbacks are disabled are not notified
+        # when the transaction is committed, e.g. inside ignore_callback.
+        if not prop.enabled(instance):
+            return
+        if old is _NO_VALUE:
+            full_info = prop._get_full_info(instance)
+        else:
+            full_info = (tuple(old) if isinstance(old, list) else old), None
+        record[2] = prop._get_version(instance), full_info
+
+    def undo(self):
+        for prop, instance, _, value in reversed(self.records.values()):
+            if value is not _NO_VALUE:
+                prop._restore(instance, value)
+                # Make sure that computed properties don't keep values that
+                # were computed during the transaction.
+                prop._versions[instance] = next(_versions)
+
+    def commit(self):
+        changed = []
+        for prop, instance, old, _ in self.records.values():
+            # Properties that are still disabled are taken care of by
+            # whatever disabled them, e.g. an enclosing delay_callback.
+            if old is None or not prop.enabled(instance):
+                continue
+            new = prop._get_version(instance), prop._get_full_info(instance)
+            if prop._has_changed(old, new):
+                changed.append((prop, instance, old[1][0], new[1][0]))
+
+        if not changed:
+            return
+
+        # Gather the callbacks of all the properties that have changed, which
+        # are then called in order of decreasing priority. Since the sort is
+        # stable, callbacks with the same priority are called in the order in
+        # which the properties were first changed.
+        calls = []
+        # Instances are indexed by id since they may not be hashable
+        global_kwargs = {}
+        context_managers = []
+        for prop, instance, old, new in changed:
+            if callbacks := prop._callbacks.get(instance, None):
+                calls.extend(((new,), entry) for entry in callbacks.ordered() if not _is_container_callback(entry))
+            if callbacks_2arg := prop._2arg_callbacks.get(instance, None):
+                calls.extend(((old, new), entry) for entry in callbacks_2arg.ordered())
+            if isinstance(instance, HasCallbackProperties):
+                item = global_kwargs.get(id(instance), None)
+                if item is None:
+                    item = global_kwargs[id(instance)] = instance, _get_registry(type(instance)).names, {}
+                    context_managers.extend(instance._notify_context_managers)
+                item[2][item[1][prop]] = new
+        calls.sort(key=_entry_priority, reverse=True)
+
+        invoke = CallbackContainer.invoke
+        if context_managers:
+            with ExitStack() as stack:
+                for cm_factory in context_managers:
+                    stack.enter_context(cm_factory())
+                for args, entry in calls:
+                    invoke(entry, *args)
+        else:
+            for args, entry in calls:
+                invoke(entry, *args)
+
+        for instance, _, kwargs in global_kwargs.values():
+            instance._notify_global(**kwargs)
+
+
+@contextmanager
+def transaction(rollback=False):
+    """
+    Defer all callbacks until the end of a block of changes
+
+    This is a context manager. Within the context block, changes to any
+    callback properties, on any number of instances, don't trigger any
+    callbacks. On exit, the callbacks of each property that has changed are
+    called once, in order of decreasing priority across all the properties,
+    after which the global callbacks of each :class:`HasCallbackProperties`
+    instance are called once with all the properties of that instance that
+    have changed.
+
+    Transactions only apply to the thread or asyncio task in which they are
+    started, and nested transactions are part of the outermost one.
+
+    Parameters
+    ----------
+    rollback : bool, optional
+        If `True` and an exception is raised inside the block, the values
+        assigned to properties are restored and no callbacks are called. Note
+        that in-place changes to lists and dictionaries are not undone.
+
+    Examples
+    --------
+
+    ::
+
+        with transaction():
+            state1.x_min = 0
+            state2.x_min = 0
+            state1.x_max = 10
+        print('done')  # callbacks triggered at this point, if needed
+    """
+    if _current_transaction.get() is not None:
+        yield
+        return
+
+    active = _Transaction(rollback)
+    token = _current_transaction.set(active)
+    _active_transactions.add(active)
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        _current_transaction.reset(token)
+        _active_transactions.discard(active)
+        if rollback and failed:
+            active.undo()
+        else:
+            active.commit()
+
+
+def _set_properties(assignments):
+    """
+    Set callback properties given as (instance, name, value) tuples in a
+    single transaction, restoring the previous values if any of them fails.
+    """
+    # Resolve all the names before changing anything
+    resolved = []
+    for instance, name, value in assignments:
+        name, prop = _resolve_callback_property(instance, name)
+        if not isinstance(prop, CallbackProperty):
+            raise TypeError(f"{name} is not a CallbackProperty")
+        resolved.append((instance, prop, value))
+
+    # The previous values are kept here rather than using the rollback option
+    # of the transaction, so that they are also restored inside an enclosing
+    # transaction.
+    previous = []
+    with transaction():
+        records = _current_transaction.get().records
+        try:
+            for instance, prop, value in resolved:
+                recorded = (prop, id(instance)) in records
+                previous.append((instance, prop, prop.__get__(instance), prop._versions.get(instance), recorded))
+                prop.__set__(instance, value)
+        except BaseException:
+            for instance, prop, value, version, recorded in reversed(previous):
+                prop._restore(instance, value)
+                # Restoring the version rather than using a new one means
+                # that the property doesn't appear to have changed, while
+                # values computed from the rejected value are not used.
+                if version is None:
+                    prop._versions.pop(instance, None)
+                else:
+                    prop._versions[instance] = version
+                # Changes made earlier in an enclosing transaction should
+                # still be notified.
+                if not recorded:
+                    records.pop((prop, id(instance)), None)
+            raise
+
+
+def _same_value(value1, value2):
+    # Compare values, treating values that can't be compared (such as Numpy
+    # arrays with several elements) as different unless they are the same.
+    if value1 is value2:
+        return True
+    try:
+        return bool(value1 == value2)
+    except ValueError:
+        return False
+
+
+def _describe_link(node):
+    instance = node.instance()
+    return f"{type(instance).__name__}.{node.prop}"
+
+
+def _describe_path(parents, node):
+    # Describe the path through which a node was reached by _propagate
+    path = []
+    while node is not None:
+        path.append(node)
+        node = parents[node]
+    return " -> ".join(_describe_link(node) for node in reversed(path))
+
+
+class _LinkNode:
+    """
+    The links from a callback property of a specific instance to other
+    callback properties (see keep_in_sync).
+    """
+
+    __slots__ = ("instance", "prop", "links", "__weakref__")
+
+    def __init__(self, instance, prop):
+        self.instance = weakref.ref(instance)
+        self.prop = prop
+        # A list of (node, function, owner) tuples, where function converts
+        # the value of this property to the value of the linked property, or
+        # is None if the values should be the same, and owner is a weak
+        # reference to the keep_in_sync object that created the link, so that
+        # the link goes away along with it.
+        self.links = []
+
+    def changed(self, *args):
+        _propagate(self)
+
+
+# The link nodes for each instance, keyed by property name
+_link_nodes = WeakKeyDictionary()
+
+# Maximum number of times that propagating changes through linked properties
+# can cause further propagations, after which we consider that the linked
+# properties keep changing each other.
+_MAX_PROPAGATION_DEPTH = 100
+
+_propagation = threading.local()
+
+
+def _get_link_node(instance, prop):
+    nodes = _link_nodes.setdefault(instance, {})
+    node = nodes.get(prop)
+    if node is None:
+        node = nodes[prop] = _LinkNode(instance, prop)
+        add_callback(instance, prop, node.changed, priority=_INTERNAL_PRIORITY)
+    return node
+
+
+def _discard_link_node(node):
+    instance = node.instance()
+    if instance is None or node.links:
+        return
+    nodes = _link_nodes.get(instance, {})
+    if nodes.get(node.prop) is node:
+        del nodes[node.prop]
+        remove_callback(instance, node.prop, node.changed)
+
+
+def _drop_links(node_refs, owner):
+    # Called when a keep_in_sync object is garbage collected
+    for node_ref in node_refs:
+        node = node_ref()
+        if node is not None:
+            node.links = [link for link in node.links if link[2] is not owner]
+            _discard_link_node(node)
+
+
+def _propagate(source):
+    """
+    Propagate the value of a callback property to all the properties linked
+    to it, directly or indirectly.
+    """
+
+    instance = source.instance()
+    if instance is None:
+        return
+
+    # Find the new values of all the linked properties before changing any of
+    # them, in breadth-first order, so that each property is only changed
+    # once. If a property can be reached in different ways that don't agree
+    # on its value, the links form an inconsistent cycle.
+    values = {source: getattr(instance, source.prop)}
+    parents = {source: None}
+    queue = deque([source])
+    while queue:
+        node = queue.popleft()
+        for target, function, owner in node.links:
+            if target.instance() is None or owner() is None:
+                continue
+            value = values[node] if function is None else function(values[node])
+            if target in values:
+                if not _same_value(values[target], value):
+                    raise RuntimeError(
+                        "Linked properties form a cycle with inconsistent values: "
+                        f"{_describe_path(parents, node)} -> {_describe_link(target)} gives {value!r} but "
+                        f"{_describe_path(parents, target)} gives {values[target]!r}"
+                    )
+                continue
+            values[target] = value
+            parents[target] = node
+            queue.append(target)
+
+    updates = {}
+    for node, value in values.items():
+        target = node.instance()
+        if node is not source and target is not None and not _same_value(getattr(target, node.prop), value):
+            updates.setdefault(id(target), (target, {}))[1][node.prop] = value
+
+    if not updates:
+        return
+
+    # Callbacks (including the ones that propagate further changes, for
+    # example if a validator changes a value) are delayed until all the
+    # properties have been changed, so that each callback is only called
+    # once and sees consistent values.
+    depth = getattr(_propagation, "depth", 0)
+    if depth >= _MAX_PROPAGATION_DEPTH:
+        raise RuntimeError(f"Linked properties keep changing each other, starting from {_describe_link(source)}")
+    _propagation.depth = depth + 1
+    try:
+        with ExitStack() as stack:
+            for target, changes in updates.values():
+                stack.enter_context(delay_callback(target, *changes))
+            for target, changes in updates.values():
+                for prop, value in changes.items():
+                    setattr(target, prop, value)
+    finally:
+        _propagation.depth = depth
+
+
 class keep_in_sync:
-    def __init__(self, instance1, prop1, instance2, prop2):
+    """
+    Keep two callback properties in sync.
+
+    When either property changes, the other one is changed to match it, along
+    with any other properties linked to either of them. All the changes are
+    made before any of the callbacks are called, so that each callback is only
+    called once and all the linked properties have consistent values by then.
+
+    Parameters
+    ----------
+    instance1, instance2
+        The instances with the callback properties
+    prop1, prop2 : str
+        The names of the callback properties
+    forward, backward : func, optional
+        If specified, functions converting the value of ``prop1`` to the value
+        of ``prop2`` and vice versa. By default, the values are the same.
+
+    Notes
+    -----
+    If the properties linked to a property can be reached in several ways that
+    don't agree on the values of the properties, or if changes to linked
+    properties keep changing each other (for example because of validators),
+    a `RuntimeError` is raised when the property is changed.
+    """
+
+    def __init__(self, instance1, prop1, instance2, prop2, forward=None, backward=None):
         self.instance1 = weakref.ref(instance1, self.disable_syncing)
-        self.prop1 = prop1
+        self.prop1 = _resolve_callback_property(instance1, prop1)[0]
 
         self.instance2 = weakref.ref(instance2, self.disable_syncing)
-        self.prop2 = prop2
+        self.prop2 = _resolve_callback_property(instance2, prop2)[0]
 
-        self._syncing = False
+        self.forward = forward
+        self.backward = backward
 
         self.enabled = False
 
         self.enable_syncing()
 
-    def prop1_from_prop2(self, value):
-        if not self._syncing:
-            self._syncing = True
-            setattr(self.instance1(), self.prop1, getattr(self.instance2(), self.prop2))
-            self._syncing = False
-
-    def prop2_from_prop1(self, value):
-        if not self._syncing:
-            self._syncing = True
-            setattr(self.instance2(), self.prop2, getattr(self.instance1(), self.prop1))
-            self._syncing = False
-
     def enable_syncing(self, *args):
         if self.enabled:
             return
-        add_callback(self.instance1(), self.prop1, self.prop2_from_prop1)
-        add_callback(self.instance2(), self.prop2, self.prop1_from_prop2)
+        node1 = _get_link_node(self.instance1(), self.prop1)
+        node2 = _get_link_node(self.instance2(), self.prop2)
+        # The links only keep a weak reference to this object, so that
+        # syncing stops if it is garbage collected.
+        self._owner = weakref.ref(self, partial(_drop_links, (weakref.ref(node1), weakref.ref(node2))))
+        node1.links.append((node2, self.forward, self._owner))
+        node2.links.append((node1, self.backward, self._owner))
         self.enabled = True
 
     def disable_syncing(self, *args):
         if not self.enabled:
             return
-        if self.instance1() is not None:
-            remove_callback(self.instance1(), self.prop1, self.prop2_from_prop1)
-        if self.instance2() is not None:
-            remove_callback(self.instance2(), self.prop2, self.prop1_from_prop2)
+        for instance, prop in ((self.instance1(), self.prop1), (self.instance2(), self.prop2)):
+            if instance is None:
+                continue
+            node = _link_nodes.get(instance, {}).get(prop)
+            if node is not None:
+                node.links = [link for link in node.links if link[2] is not self._owner]
+                _discard_link_node(node)
         self.enabled = False
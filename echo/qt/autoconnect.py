@@ -1,4 +1,5 @@
 from .connect import (
+    BaseConnection,
     connect_button,
     connect_checkable_button,
     connect_combo_data,
@@ -7,6 +8,7 @@ from .connect import (
     connect_datetime,
     connect_float_text,
     connect_list_selection,
+    connect_list_view_selection,
     connect_text,
     connect_value,
 )
@@ -23,10 +25,11 @@ HANDLERS["combotext"] = connect_combo_text
 HANDLERS["button"] = connect_button
 HANDLERS["combosel"] = connect_combo_selection
 HANDLERS["listsel"] = connect_list_selection
+HANDLERS["listviewsel"] = connect_list_view_selection
 HANDLERS["datetime"] = connect_datetime
 
 
-def autoconnect_callbacks_to_qt(instance, widget, connect_kwargs={}):
+def autoconnect_callbacks_to_qt(instance, widget, connect_kwargs={}, deferred=False):
     """
     Given a class instance with callback properties and a Qt widget/window,
     connect callback properties to Qt widgets automatically.
@@ -89,6 +92,13 @@ def autoconnect_callbacks_to_qt(instance, widget, connect_kwargs={}):
     connect functions, as described above. These include for example
     ``value_range``, ``log``, and ``fmt``.
 
+    If ``deferred`` is `True`, the built-in connections are created in
+    deferred mode, which means that when a callback property changes several
+    times in quick succession, the Qt widget is only updated once, with the
+    latest value, on the next iteration of the Qt event loop. This can be
+    overridden for individual properties by passing ``deferred`` in
+    ``connect_kwargs``.
+
     This function is especially useful when defining ui files, since widget
     objectNames can be easily set during the editing process.
     """
@@ -116,9 +126,12 @@ def autoconnect_callbacks_to_qt(instance, widget, connect_kwargs={}):
                 kwargs = {}
             if hasattr(instance, wname):
                 if wtype in HANDLERS:
+                    handler = HANDLERS[wtype]
+                    if deferred and isinstance(handler, type) and issubclass(handler, BaseConnection):
+                        kwargs = {"deferred": True, **kwargs}
                     child = getattr(widget, original_name)
                     # NOTE: we need to use original_name here since we need a
                     # unique key, and some wname values might be duplicate.
-                    returned_handlers[original_name] = HANDLERS[wtype](instance, wname, child, **kwargs)
+                    returned_handlers[original_name] = handler(instance, wname, child, **kwargs)
 
     return returned_handlers
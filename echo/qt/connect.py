@@ -3,10 +3,23 @@
 
 import math
 from datetime import datetime
+from difflib import SequenceMatcher
+from functools import partial
 
 import numpy as np
 from qtpy import QtGui, QtWidgets
-from qtpy.QtCore import QDateTime, Qt
+from qtpy.QtCore import (
+    QAbstractListModel,
+    QCoreApplication,
+    QDateTime,
+    QItemSelectionModel,
+    QModelIndex,
+    QObject,
+    Qt,
+    QThread,
+    QTimer,
+    Signal,
+)
 
 from ..core import add_callback, remove_callback
 from ..selection import ChoiceSeparator, SelectionCallbackProperty
@@ -20,8 +33,10 @@ __all__ = [
     "connect_value",
     "connect_combo_selection",
     "connect_list_selection",
+    "connect_list_view_selection",
     "connect_datetime",
     "BaseConnection",
+    "MainThreadExecutor",
 ]
 
 
@@ -30,11 +45,127 @@ class UserDataWrapper:
         self.data = data
 
 
+class _DeferredUpdates:
+    """
+    Collect the latest value of properties connected to widgets in deferred
+    mode, and update all the widgets at once on the next iteration of the Qt
+    event loop.
+
+    A single zero-interval QTimer is shared by all deferred connections. If
+    there is no Qt application, the widgets are updated straight away.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._timer = None
+
+    def schedule(self, connection, value):
+        self._pending[connection] = value
+        if QCoreApplication.instance() is None:
+            self.flush()
+            return
+        if self._timer is None:
+            self._timer = QTimer()
+            self._timer.setSingleShot(True)
+            self._timer.setInterval(0)
+            self._timer.timeout.connect(self.flush)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def discard(self, connection):
+        self._pending.pop(connection, None)
+
+    def flush(self):
+        # Widgets updated here can change other properties, which schedule
+        # further updates for the next iteration rather than this one.
+        pending, self._pending = self._pending, {}
+        for connection, value in pending.items():
+            connection.update_widget(value)
+
+
+_deferred_updates = _DeferredUpdates()
+
+
+def _in_main_thread():
+    app = QCoreApplication.instance()
+    return app is None or QThread.currentThread() == app.thread()
+
+
+class MainThreadExecutor(QObject):
+    """
+    An executor that calls functions in the Qt main thread.
+
+    This can be passed as ``executor`` to :func:`~echo.add_callback` so that
+    callbacks that update widgets are called in the main thread even if the
+    property is set from another thread. Functions submitted from the main
+    thread are called straight away, while functions submitted from other
+    threads are queued and called by the Qt event loop.
+    """
+
+    _call = Signal(object)
+
+    def __init__(self):
+        super().__init__()
+        app = QCoreApplication.instance()
+        if app is not None:
+            self.moveToThread(app.thread())
+        self._call.connect(self._run, Qt.QueuedConnection)
+
+    def _run(self, func):
+        func()
+
+    def submit(self, func, *args, **kwargs):
+        if _in_main_thread():
+            func(*args, **kwargs)
+        else:
+            self._call.emit(partial(func, *args, **kwargs))
+
+
+_main_thread_executor = None
+
+
+def _get_main_thread_executor():
+    global _main_thread_executor
+    if _main_thread_executor is None:
+        _main_thread_executor = MainThreadExecutor()
+    return _main_thread_executor
+
+
 class BaseConnection:
-    def __init__(self, instance, prop, widget):
+    def __init__(self, instance, prop, widget, deferred=False):
         self._instance = instance
         self._prop = prop
         self._widget = widget
+        self._deferred = deferred
+        self._queued = False
+
+    def _on_prop_change(self, value):
+        # Called when the callback property changes. Widgets can only be
+        # updated in the main thread, so if the property was changed in
+        # another thread we queue an update, which uses the value of the
+        # property at the time the update happens so that further changes
+        # don't need to queue more updates. In deferred mode, only the
+        # latest value is kept and the widget is updated later.
+        if not _in_main_thread():
+            if not self._queued:
+                self._queued = True
+                _get_main_thread_executor().submit(self._on_queued_change)
+        elif self._deferred:
+            _deferred_updates.schedule(self, value)
+        else:
+            self.update_widget(value)
+
+    def _on_queued_change(self):
+        # The flag is reset before getting the value, so that any change made
+        # after this in another thread queues a new update.
+        if self._queued:
+            self._queued = False
+            self._on_prop_change(getattr(self._instance, self._prop))
+
+    def _discard_pending(self):
+        self._queued = False
+        if self._deferred:
+            _deferred_updates.discard(self)
 
 
 class connect_checkable_button(BaseConnection):
@@ -50,10 +181,14 @@ class connect_checkable_button(BaseConnection):
     widget : QtWidget
         The Qt widget to connect. This should implement the ``setChecked``
         method and the ``toggled`` signal.
+    deferred : bool, optional
+        If `True`, changes to the callback property are collected and the
+        widget is only updated with the latest value once per iteration of
+        the Qt event loop.
     """
 
-    def __init__(self, instance, prop, widget):
-        super().__init__(instance, prop, widget)
+    def __init__(self, instance, prop, widget, deferred=False):
+        super().__init__(instance, prop, widget, deferred=deferred)
         self.connect()
 
     def update_widget(self, value):
@@ -63,12 +198,13 @@ class connect_checkable_button(BaseConnection):
         setattr(self._instance, self._prop, value)
 
     def connect(self):
-        add_callback(self._instance, self._prop, self.update_widget)
+        add_callback(self._instance, self._prop, self._on_prop_change)
         self._widget.toggled.connect(self.update_prop)
         self._widget.setChecked(getattr(self._instance, self._prop) or False)
 
     def disconnect(self):
-        remove_callback(self._instance, self._prop, self.update_widget)
+        remove_callback(self._instance, self._prop, self._on_prop_change)
+        self._discard_pending()
         self._widget.toggled.disconnect(self.update_prop)
 
 
@@ -85,10 +221,14 @@ class connect_text(BaseConnection):
     widget : QtWidget
         The Qt widget to connect. This should implement the ``setText`` and
         ``text`` methods as well optionally the ``editingFinished`` signal.
+    deferred : bool, optional
+        If `True`, changes to the callback property are collected and the
+        widget is only updated with the latest value once per iteration of
+        the Qt event loop.
     """
 
-    def __init__(self, instance, prop, widget):
-        super().__init__(instance, prop, widget)
+    def __init__(self, instance, prop, widget, deferred=False):
+        super().__init__(instance, prop, widget, deferred=deferred)
         self.connect()
 
     def update_prop(self):
@@ -105,7 +245,7 @@ class connect_text(BaseConnection):
             self._widget.setText(value)
 
     def connect(self):
-        add_callback(self._instance, self._prop, self.update_widget)
+        add_callback(self._instance, self._prop, self._on_prop_change)
         try:
             self._widget.editingFinished.connect(self.update_prop)
         except AttributeError:
@@ -113,7 +253,8 @@ class connect_text(BaseConnection):
         self.update_widget(getattr(self._instance, self._prop))
 
     def disconnect(self):
-        remove_callback(self._instance, self._prop, self.update_widget)
+        remove_callback(self._instance, self._prop, self._on_prop_change)
+        self._discard_pending()
         try:
             self._widget.editingFinished.disconnect(self.update_prop)
         except AttributeError:
@@ -132,14 +273,18 @@ class connect_combo_data(BaseConnection):
         The name of the callback property
     widget : QComboBox
         The combo box to connect.
+    deferred : bool, optional
+        If `True`, changes to the callback property are collected and the
+        widget is only updated with the latest value once per iteration of
+        the Qt event loop.
 
     See Also
     --------
     connect_combo_text: connect a callback property with a QComboBox widget based on the text.
     """
 
-    def __init__(self, instance, prop, widget):
-        super().__init__(instance, prop, widget)
+    def __init__(self, instance, prop, widget, deferred=False):
+        super().__init__(instance, prop, widget, deferred=deferred)
         self.connect()
 
     def update_widget(self, value):
@@ -163,12 +308,13 @@ class connect_combo_data(BaseConnection):
                 setattr(self._instance, self._prop, data_wrapper.data)
 
     def connect(self):
-        add_callback(self._instance, self._prop, self.update_widget)
+        add_callback(self._instance, self._prop, self._on_prop_change)
         self._widget.currentIndexChanged.connect(self.update_prop)
         self.update_widget(getattr(self._instance, self._prop))
 
     def disconnect(self):
-        remove_callback(self._instance, self._prop, self.update_widget)
+        remove_callback(self._instance, self._prop, self._on_prop_change)
+        self._discard_pending()
         self._widget.currentIndexChanged.disconnect(self.update_prop)
 
 
@@ -184,14 +330,18 @@ class connect_combo_text(BaseConnection):
         The name of the callback property
     widget : QComboBox
         The combo box to connect.
+    deferred : bool, optional
+        If `True`, changes to the callback property are collected and the
+        widget is only updated with the latest value once per iteration of
+        the Qt event loop.
 
     See Also
     --------
     connect_combo_data: connect a callback property with a QComboBox widget based on the userData.
     """
 
-    def __init__(self, instance, prop, widget):
-        super().__init__(instance, prop, widget)
+    def __init__(self, instance, prop, widget, deferred=False):
+        super().__init__(instance, prop, widget, deferred=deferred)
         self.connect()
 
     def update_widget(self, value):
@@ -211,12 +361,13 @@ class connect_combo_text(BaseConnection):
             setattr(self._instance, self._prop, self._widget.itemText(idx))
 
     def connect(self):
-        add_callback(self._instance, self._prop, self.update_widget)
+        add_callback(self._instance, self._prop, self._on_prop_change)
         self._widget.currentIndexChanged.connect(self.update_prop)
         self.update_widget(getattr(self._instance, self._prop))
 
     def disconnect(self):
-        remove_callback(self._instance, self._prop, self.update_widget)
+        remove_callback(self._instance, self._prop, self._on_prop_change)
+        self._discard_pending()
         self._widget.currentIndexChanged.disconnect(self.update_prop)
 
 
@@ -236,10 +387,14 @@ class connect_float_text(BaseConnection):
     fmt : str or func
         This should be either a format string (in the ``{}`` notation), or a
         function that takes a number and returns a string.
+    deferred : bool, optional
+        If `True`, changes to the callback property are collected and the
+        widget is only updated with the latest value once per iteration of
+        the Qt event loop.
     """
 
-    def __init__(self, instance, prop, widget, fmt="{:g}"):
-        super().__init__(instance, prop, widget)
+    def __init__(self, instance, prop, widget, fmt="{:g}", deferred=False):
+        super().__init__(instance, prop, widget, deferred=deferred)
 
         if callable(fmt):
             format_func = fmt
@@ -272,7 +427,7 @@ class connect_float_text(BaseConnection):
         self._widget.setText(self._format_func(value))
 
     def connect(self):
-        add_callback(self._instance, self._prop, self.update_widget)
+        add_callback(self._instance, self._prop, self._on_prop_change)
         try:
             self._widget.editingFinished.connect(self.update_prop)
         except AttributeError:
@@ -280,7 +435,8 @@ class connect_float_text(BaseConnection):
         self.update_widget(getattr(self._instance, self._prop))
 
     def disconnect(self):
-        remove_callback(self._instance, self._prop, self.update_widget)
+        remove_callback(self._instance, self._prop, self._on_prop_change)
+        self._discard_pending()
         try:
             self._widget.editingFinished.disconnect(self.update_prop)
         except AttributeError:
@@ -306,10 +462,14 @@ class connect_value(BaseConnection):
     log : bool, optional
         Whether the Qt widget value should be mapped to the log of the callback
         property.
+    deferred : bool, optional
+        If `True`, changes to the callback property are collected and the
+        widget is only updated with the latest value once per iteration of
+        the Qt event loop.
     """
 
-    def __init__(self, instance, prop, widget, value_range=None, log=False):
-        super().__init__(instance, prop, widget)
+    def __init__(self, instance, prop, widget, value_range=None, log=False, deferred=False):
+        super().__init__(instance, prop, widget, deferred=deferred)
 
         if log:
             if value_range is None:
@@ -350,12 +510,13 @@ class connect_value(BaseConnection):
             self._widget.setValue(value)
 
     def connect(self):
-        add_callback(self._instance, self._prop, self.update_widget)
+        add_callback(self._instance, self._prop, self._on_prop_change)
         self._widget.valueChanged.connect(self.update_prop)
         self.update_widget(getattr(self._instance, self._prop))
 
     def disconnect(self):
-        remove_callback(self._instance, self._prop, self.update_widget)
+        remove_callback(self._instance, self._prop, self._on_prop_change)
+        self._discard_pending()
         self._widget.valueChanged.disconnect(self.update_prop)
 
 
@@ -373,8 +534,8 @@ class connect_button(BaseConnection):
         The Qt widget to connect. This should implement the ``clicked`` method
     """
 
-    def __init__(self, instance, prop, widget):
-        super().__init__(instance, prop, widget)
+    def __init__(self, instance, prop, widget, deferred=False):
+        super().__init__(instance, prop, widget, deferred=deferred)
         self.connect()
 
     def connect(self):
@@ -404,6 +565,34 @@ def _find_combo_data(widget, value):
         raise ValueError(f"{value} not found in combo box")
 
 
+def _same_choice(old, new):
+    """
+    Returns whether a choice shown in a widget can be kept for a new choice.
+    """
+    if old is new:
+        return True
+    if type(old) is not type(new):
+        return False
+    try:
+        return bool(old == new)
+    except ValueError:
+        # e.g. Numpy arrays
+        return False
+
+
+def _choice_key(choice, label):
+    """
+    Returns a hashable key for a choice and its label, used to find the
+    differences between two sets of choices.
+    """
+    try:
+        hash(choice)
+    except TypeError:
+        return type(choice), id(choice), label
+    else:
+        return type(choice), choice, label
+
+
 def _find_combo_text(widget, value):
     """
     Returns the index in a combo box where text == value
@@ -418,7 +607,7 @@ def _find_combo_text(widget, value):
 
 
 class connect_combo_selection(BaseConnection):
-    def __init__(self, instance, prop, widget):
+    def __init__(self, instance, prop, widget, deferred=False):
         prop_obj = getattr(type(instance), prop)
         # Handle aliases - resolve to target property for type checking
         if hasattr(prop_obj, "_target_property") and prop_obj._target_property is not None:
@@ -427,57 +616,121 @@ class connect_combo_selection(BaseConnection):
         if not isinstance(prop_obj, SelectionCallbackProperty):
             raise TypeError("connect_combo_selection requires a SelectionCallbackProperty")
 
-        super().__init__(instance, prop, widget)
+        super().__init__(instance, prop, widget, deferred=deferred)
         self.connect()
 
     def update_widget(self, value):
-        # Update choices in the combo box
-
-        combo_data = [self._widget.itemData(idx) for idx in range(self._widget.count())]
-        combo_text = [self._widget.itemText(idx) for idx in range(self._widget.count())]
-
-        choices = getattr(type(self._instance), self._prop).get_choices(self._instance)
-        choice_labels = getattr(type(self._instance), self._prop).get_choice_labels(self._instance)
-
-        if combo_data == choices and combo_text == choice_labels:
-            choices_updated = False
-        else:
-            self._widget.blockSignals(True)
-            self._widget.clear()
-
-            if len(choices) == 0:
-                return
-
-            combo_model = self._widget.model()
-
-            for index, (label, choice) in enumerate(zip(choice_labels, choices)):
-                self._widget.addItem(label, userData=UserDataWrapper(choice))
-
-                # We interpret None data as being disabled rows (used for headers)
-                if isinstance(choice, ChoiceSeparator):
-                    item = combo_model.item(index)
-                    palette = self._widget.palette()
-                    item.setFlags(item.flags() & ~(Qt.ItemIsSelectable | Qt.ItemIsEnabled))
-                    item.setData(palette.color(QtGui.QPalette.Disabled, QtGui.QPalette.Text))
+        prop = getattr(type(self._instance), self._prop)
+        choices = prop.get_choices(self._instance)
 
-            choices_updated = True
+        idx = prop.get_choice_index(self._instance, value)
+        if idx == -1 and value is not None:
+            raise ValueError(f"{value} not found in combo box")
 
-        # Update current selection
+        self._widget.blockSignals(True)
         try:
-            idx = _find_combo_data(self._widget, value)
-        except ValueError:
-            if value is None:
-                idx = -1
+            version = prop.get_choices_version(self._instance)
+            if version == self._choices_version:
+                choices_updated = False
             else:
-                raise
-
-        if idx == self._widget.currentIndex() and not choices_updated:
-            return
+                choices_updated = self._update_items(choices, prop.get_choice_labels(self._instance))
+                self._choices_version = version
+            if idx == self._widget.currentIndex() and not choices_updated:
+                return
+            self._widget.setCurrentIndex(idx)
+        finally:
+            self._widget.blockSignals(False)
 
-        self._widget.setCurrentIndex(idx)
-        self._widget.blockSignals(False)
         self._widget.currentIndexChanged.emit(idx)
 
+    def _update_items(self, choices, labels):
+        """
+        Update the items in the combo box to match the given choices and
+        labels, and return whether any items were changed.
+
+        Rather than repopulating the combo box, the differences with the
+        previously set choices are found with :class:`difflib.SequenceMatcher`
+        and only the items that differ are inserted, removed, or updated. The
+        previously set choices and labels are cached so that the combo box
+        does not need to be queried.
+        """
+
+        old_choices, old_labels = self._choices, self._labels
+        n_old, n_new = len(old_choices), len(choices)
+
+        start = 0
+        n_common = min(n_old, n_new)
+        while (
+            start < n_common and old_labels[start] == labels[start] and _same_choice(old_choices[start], choices[start])
+        ):
+            start += 1
+
+        if start == n_old == n_new:
+            return False
+
+        end_old, end_new = n_old, n_new
+        while (
+            end_old > start
+            and end_new > start
+            and old_labels[end_old - 1] == labels[end_new - 1]
+            and _same_choice(old_choices[end_old - 1], choices[end_new - 1])
+        ):
+            end_old -= 1
+            end_new -= 1
+
+        if n_new == 0:
+            self._widget.clear()
+        else:
+            old_keys = [
+                _choice_key(c, label) for c, label in zip(old_choices[start:end_old], old_labels[start:end_old])
+            ]
+            new_keys = [_choice_key(c, label) for c, label in zip(choices[start:end_new], labels[start:end_new])]
+            matcher = SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+            # Apply the edits from the end so that the indices of the items
+            # that have not been processed yet remain valid.
+            for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+                if tag != "equal":
+                    self._replace_items(
+                        start + i1, start + i2, choices[start + j1 : start + j2], labels[start + j1 : start + j2]
+                    )
+
+        self._choices, self._labels = list(choices), list(labels)
+
+        return True
+
+    def _replace_items(self, first, last, choices, labels):
+        # Replace the items from first to last (exclusive) with the given
+        # choices, updating existing items in place where possible.
+        n_replace = min(last - first, len(choices))
+        for offset in range(n_replace):
+            index = first + offset
+            old_choice = self._choices[index]
+            if self._labels[index] != labels[offset]:
+                self._widget.setItemText(index, labels[offset])
+            if not _same_choice(old_choice, choices[offset]):
+                self._widget.setItemData(index, UserDataWrapper(choices[offset]))
+                if isinstance(old_choice, ChoiceSeparator) or isinstance(choices[offset], ChoiceSeparator):
+                    self._style_item(index, choices[offset])
+        for offset in range(n_replace, len(choices)):
+            index = first + offset
+            self._widget.insertItem(index, labels[offset], userData=UserDataWrapper(choices[offset]))
+            if isinstance(choices[offset], ChoiceSeparator):
+                self._style_item(index, choices[offset])
+        for index in range(last - 1, first + n_replace - 1, -1):
+            self._widget.removeItem(index)
+
+    def _style_item(self, index, choice):
+        # We interpret ChoiceSeparator data as being disabled rows (used for headers)
+        item = self._widget.model().item(index)
+        flags = Qt.ItemIsSelectable | Qt.ItemIsEnabled
+        if isinstance(choice, ChoiceSeparator):
+            palette = self._widget.palette()
+            item.setFlags(item.flags() & ~flags)
+            item.setData(palette.color(QtGui.QPalette.Disabled, QtGui.QPalette.Text))
+        else:
+            item.setFlags(item.flags() | flags)
+            item.setData(None)
+
     def update_prop(self, idx):
         if idx == -1:
             setattr(self._instance, self._prop, None)
@@ -489,17 +742,25 @@ class connect_combo_selection(BaseConnection):
                 setattr(self._instance, self._prop, data_wrapper.data)
 
     def connect(self):
-        add_callback(self._instance, self._prop, self.update_widget)
+        add_callback(self._instance, self._prop, self._on_prop_change)
         self._widget.currentIndexChanged.connect(self.update_prop)
+        self._choices = []
+        self._labels = []
+        self._choices_version = None
+        for idx in range(self._widget.count()):
+            data = self._widget.itemData(idx)
+            self._choices.append(data.data if isinstance(data, UserDataWrapper) else data)
+            self._labels.append(self._widget.itemText(idx))
         self.update_widget(getattr(self._instance, self._prop))
 
     def disconnect(self):
-        remove_callback(self._instance, self._prop, self.update_widget)
+        remove_callback(self._instance, self._prop, self._on_prop_change)
+        self._discard_pending()
         self._widget.currentIndexChanged.disconnect(self.update_prop)
 
 
 class connect_list_selection(BaseConnection):
-    def __init__(self, instance, prop, widget):
+    def __init__(self, instance, prop, widget, deferred=False):
         """
         Connect a SelectionCallbackProperty with a QListWidget that supports
         single-item selection.
@@ -513,7 +774,7 @@ class connect_list_selection(BaseConnection):
         if not isinstance(prop_obj, SelectionCallbackProperty):
             raise TypeError("connect_list_selection requires a SelectionCallbackProperty")
 
-        super().__init__(instance, prop, widget)
+        super().__init__(instance, prop, widget, deferred=deferred)
         self.connect()
 
     def update_widget(self, value, force=False):
@@ -522,14 +783,10 @@ class connect_list_selection(BaseConnection):
         list_data = [item.data(Qt.UserRole) for item in items]
         list_data = [d.data if d is not None else d for d in list_data]
 
-        choices = getattr(type(self._instance), self._prop).get_choices(self._instance)
-        choice_labels = getattr(type(self._instance), self._prop).get_choice_labels(self._instance)
-
-        for idx in range(len(choices)):
-            if choices[idx] is value or (choices[idx] == value) is True:
-                break
-        else:
-            idx = -1
+        prop = getattr(type(self._instance), self._prop)
+        choices = prop.get_choices(self._instance)
+        choice_labels = prop.get_choice_labels(self._instance)
+        idx = prop.get_choice_index(self._instance, value)
 
         self._widget.blockSignals(True)
 
@@ -580,15 +837,203 @@ class connect_list_selection(BaseConnection):
                 setattr(self._instance, self._prop, data_wrapper.data)
 
     def connect(self):
-        add_callback(self._instance, self._prop, self.update_widget)
+        add_callback(self._instance, self._prop, self._on_prop_change)
         self._widget.itemSelectionChanged.connect(self.update_prop)
         self.update_widget(getattr(self._instance, self._prop))
 
     def disconnect(self):
-        remove_callback(self._instance, self._prop, self.update_widget)
+        remove_callback(self._instance, self._prop, self._on_prop_change)
+        self._discard_pending()
         self._widget.itemSelectionChanged.disconnect(self.update_prop)
 
 
+class _ChoiceListModel(QAbstractListModel):
+    """
+    A list model exposing the choices of a SelectionCallbackProperty.
+
+    The labels are only computed when requested by a view, and the row for a
+    given value is found using the index of the choices kept by the property
+    rather than by searching through all the choices.
+    """
+
+    def __init__(self, instance, prop, parent=None):
+        super().__init__(parent)
+        self._instance = instance
+        self._prop = prop
+        self._choices = []
+        self._version = None
+        self._display = None
+        self._labels = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._choices)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.DisplayRole:
+            if row not in self._labels:
+                self._labels[row] = self._prop.get_choice_label(self._instance, self._choices[row])
+            return self._labels[row]
+        elif role == Qt.UserRole:
+            return UserDataWrapper(self._choices[row])
+        return None
+
+    def flags(self, index):
+        # We interpret ChoiceSeparator data as being disabled rows (used for headers)
+        if not index.isValid() or isinstance(self._choices[index.row()], ChoiceSeparator):
+            return Qt.NoItemFlags
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled
+
+    def choice(self, row):
+        return self._choices[row]
+
+    def find(self, value):
+        """
+        Return the row of the given value, or -1 if it is not one of the choices.
+        """
+        return self._prop.get_choice_index(self._instance, value)
+
+    def refresh(self):
+        """
+        Update the model to match the current choices of the property.
+
+        Only the rows that differ from the previous choices are signalled as
+        inserted, removed, or changed.
+        """
+
+        version = self._prop.get_choices_version(self._instance)
+        if version == self._version:
+            return
+        self._version = version
+
+        choices = list(self._prop.get_choices(self._instance) or ())
+        display = self._prop.get_display_func(self._instance)
+
+        old = self._choices
+        n_old, n_new = len(old), len(choices)
+
+        start = 0
+        n_common = min(n_old, n_new)
+        while start < n_common and old[start] is choices[start]:
+            start += 1
+
+        display_changed = display is not self._display
+        self._display = display
+
+        if start == n_old == n_new:
+            if display_changed and n_new > 0:
+                self._labels.clear()
+                self.dataChanged.emit(self.index(0), self.index(n_new - 1))
+            return
+
+        end_old, end_new = n_old, n_new
+        while end_old > start and end_new > start and old[end_old - 1] is choices[end_new - 1]:
+            end_old -= 1
+            end_new -= 1
+
+        n_replace = min(end_old, end_new) - start
+
+        if end_old > end_new:
+            self.beginRemoveRows(QModelIndex(), start + n_replace, end_old - 1)
+            self._set_choices(choices)
+            self.endRemoveRows()
+        elif end_new > end_old:
+            self.beginInsertRows(QModelIndex(), start + n_replace, end_new - 1)
+            self._set_choices(choices)
+            self.endInsertRows()
+        else:
+            self._set_choices(choices)
+
+        if display_changed and n_new > 0:
+            self.dataChanged.emit(self.index(0), self.index(n_new - 1))
+        elif n_replace > 0:
+            self.dataChanged.emit(self.index(start), self.index(start + n_replace - 1))
+
+    def _set_choices(self, choices):
+        self._choices = choices
+        self._labels.clear()
+
+
+class connect_list_view_selection(BaseConnection):
+    """
+    Connect a SelectionCallbackProperty with a QListView.
+
+    Unlike :class:`connect_list_selection`, which creates an item for each
+    choice, the list view is given a model that reads the choices from the
+    property and only computes labels for the rows being shown, which makes
+    this suitable for very large numbers of choices. The list view is set
+    to single-item selection.
+
+    Parameters
+    ----------
+    instance : object
+        The class instance that the callback property is attached to
+    prop : str
+        The name of the callback property
+    widget : QListView
+        The list view to connect.
+    deferred : bool, optional
+        If `True`, changes to the callback property are collected and the
+        widget is only updated with the latest value once per iteration of
+        the Qt event loop.
+    """
+
+    def __init__(self, instance, prop, widget, deferred=False):
+        prop_obj = getattr(type(instance), prop)
+        # Handle aliases - resolve to target property for type checking
+        if hasattr(prop_obj, "_target_property") and prop_obj._target_property is not None:
+            prop_obj = prop_obj._target_property
+
+        if not isinstance(prop_obj, SelectionCallbackProperty):
+            raise TypeError("connect_list_view_selection requires a SelectionCallbackProperty")
+
+        super().__init__(instance, prop, widget, deferred=deferred)
+        self._model = _ChoiceListModel(instance, prop_obj, parent=widget)
+        self._updating = False
+        self._widget.setModel(self._model)
+        self._widget.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
+        self.connect()
+
+    def update_widget(self, value):
+        self._updating = True
+        try:
+            self._model.refresh()
+            row = self._model.find(value) if value is not None else -1
+            selection_model = self._widget.selectionModel()
+            selected = selection_model.selectedRows()
+            if row == (selected[0].row() if selected else -1):
+                return
+            if row == -1:
+                selection_model.clearSelection()
+            else:
+                selection_model.setCurrentIndex(self._model.index(row), QItemSelectionModel.ClearAndSelect)
+        finally:
+            self._updating = False
+
+    def update_prop(self, *args):
+        if self._updating:
+            return
+        selected = self._widget.selectionModel().selectedRows()
+        if len(selected) == 0:
+            setattr(self._instance, self._prop, None)
+        else:
+            setattr(self._instance, self._prop, self._model.choice(selected[0].row()))
+
+    def connect(self):
+        add_callback(self._instance, self._prop, self._on_prop_change)
+        self._widget.selectionModel().selectionChanged.connect(self.update_prop)
+        self.update_widget(getattr(self._instance, self._prop))
+
+    def disconnect(self):
+        remove_callback(self._instance, self._prop, self._on_prop_change)
+        self._discard_pending()
+        self._widget.selectionModel().selectionChanged.disconnect(self.update_prop)
+
+
 class connect_datetime(BaseConnection):
     """
     Connect a CallbackProperty to a QDateTimeEdit.
@@ -596,8 +1041,8 @@ class connect_datetime(BaseConnection):
     will work for those more specific widgets as well.
     """
 
-    def __init__(self, instance, prop, widget):
-        super().__init__(instance, prop, widget)
+    def __init__(self, instance, prop, widget, deferred=False):
+        super().__init__(instance, prop, widget, deferred=deferred)
         self.connect()
 
     def update_prop(self):
@@ -624,14 +1069,15 @@ class connect_datetime(BaseConnection):
         self._widget.setDateTime(qdatetime)
 
     def connect(self):
-        add_callback(self._instance, self._prop, self.update_widget)
+        add_callback(self._instance, self._prop, self._on_prop_change)
         self._widget.dateTimeChanged.connect(self.update_prop)
         self._widget.dateChanged.connect(self.update_prop)
         self._widget.timeChanged.connect(self.update_prop)
         self.update_widget(getattr(self._instance, self._prop))
 
     def disconnect(self):
-        remove_callback(self._instance, self._prop, self.update_widget)
+        remove_callback(self._instance, self._prop, self._on_prop_change)
+        self._discard_pending()
         self._widget.dateTimeChanged.disconnect(self.update_prop)
         self._widget.dateChanged.disconnect(self.update_prop)
         self._widget.timeChanged.disconnect(self.update_prop)
@@ -142,3 +142,30 @@ def test_autoconnect_with_empty_qt_item():
     person = Person()
 
     autoconnect_callbacks_to_qt(person, widget)
+
+
+def test_autoconnect_deferred():
+    class CustomWidget(QtWidgets.QWidget):
+        def __init__(self, parent=None):
+            super().__init__(parent=parent)
+            self.text_name = QtWidgets.QLineEdit(objectName="text_name")
+            self.valuetext_age = QtWidgets.QLineEdit(objectName="valuetext_age")
+
+    class Person:
+        name = CallbackProperty("")
+        age = CallbackProperty(0)
+
+    person = Person()
+    widget = CustomWidget()
+
+    handlers = autoconnect_callbacks_to_qt(person, widget, connect_kwargs={"age": {"deferred": False}}, deferred=True)
+    assert handlers["text_name"]._deferred
+    assert not handlers["valuetext_age"]._deferred
+
+    person.name = "Lovelace"
+    person.age = 36
+    assert widget.text_name.text() == ""
+    assert widget.valuetext_age.text() == "36"
+
+    QtWidgets.QApplication.processEvents()
+    assert widget.text_name.text() == "Lovelace"
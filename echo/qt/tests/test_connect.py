@@ -1,19 +1,21 @@
+import threading
 from datetime import datetime
 from unittest.mock import MagicMock
 
 import pytest
 from numpy import datetime64
 
-from echo import CallbackProperty
+from echo import CallbackProperty, add_callback
 from echo.qt.tests.helpers import SKIP_QT_TEST
 
 if SKIP_QT_TEST:
     pytest.skip(allow_module_level=True)
 
 from qtpy import QtWidgets
-from qtpy.QtCore import QDateTime, Qt
+from qtpy.QtCore import QDateTime, Qt, QThread
 
 from echo.qt.connect import (
+    MainThreadExecutor,
     UserDataWrapper,
     connect_button,
     connect_checkable_button,
@@ -242,3 +244,102 @@ def test_connect_datetime():
     dt = datetime(2020, 3, 4, 7, 48, 16)
     e.t = datetime64(dt)
     assert widget.dateTime().toUTC().toPython() == dt
+
+
+def test_connect_deferred():
+    class Example:
+        a = CallbackProperty(0)
+        b = CallbackProperty(0.0)
+
+    e = Example()
+
+    slider = QtWidgets.QSlider()
+    slider.setMaximum(1000)
+    calls = []
+    slider.valueChanged.connect(calls.append)
+    conn = connect_value(e, "a", slider, deferred=True)
+
+    text = QtWidgets.QLineEdit()
+    conn2 = connect_float_text(e, "b", text, deferred=True)  # noqa
+
+    for i in range(1, 1001):
+        e.a = i
+        e.b = i / 10
+
+    # Nothing has happened yet since the event loop has not run
+    assert slider.value() == 0
+    assert text.text() == "0"
+
+    QtWidgets.QApplication.processEvents()
+
+    assert slider.value() == 1000
+    assert calls == [1000]
+    assert text.text() == "100"
+
+    # Changes made in the widget still update the property straight away
+    slider.setValue(200)
+    assert e.a == 200
+
+    # Pending updates are dropped when disconnecting
+    e.a = 300
+    conn.disconnect()
+    QtWidgets.QApplication.processEvents()
+    assert slider.value() == 200
+
+
+def test_connect_from_thread():
+    # Widgets are only updated in the main thread, even if the property is
+    # changed in another thread.
+
+    class Example:
+        a = CallbackProperty(0)
+        b = CallbackProperty(0)
+
+    e = Example()
+
+    slider = QtWidgets.QSlider()
+    slider.setMaximum(1000)
+    threads = []
+    slider.valueChanged.connect(lambda value: threads.append(QThread.currentThread()))
+    conn = connect_value(e, "a", slider)
+
+    values = []
+
+    def callback(value):
+        values.append((value, QThread.currentThread()))
+
+    add_callback(e, "b", callback, executor=MainThreadExecutor(), coalesce=True)
+
+    def produce():
+        for i in range(1, 101):
+            e.a = i
+            e.b = i
+
+    thread = threading.Thread(target=produce)
+    thread.start()
+    thread.join()
+
+    assert slider.value() == 0
+    assert values == []
+
+    QtWidgets.QApplication.processEvents()
+
+    # The widget is updated once with the latest value
+    main_thread = QtWidgets.QApplication.instance().thread()
+    assert slider.value() == 100
+    assert threads == [main_thread]
+    assert values == [(100, main_thread)]
+
+    # Changes in the main thread are applied straight away
+    e.a = 200
+    e.b = 200
+    assert slider.value() == 200
+    assert values[-1] == (200, main_thread)
+
+    # Queued updates are dropped when disconnecting
+    thread = threading.Thread(target=produce)
+    thread.start()
+    thread.join()
+    conn.disconnect()
+    QtWidgets.QApplication.processEvents()
+    assert slider.value() == 200
@@ -10,6 +10,7 @@ if SKIP_QT_TEST:
     pytest.skip(allow_module_level=True)
 
 from qtpy import QtWidgets
+from qtpy.QtCore import Qt
 
 from echo.qt.connect import connect_combo_selection
 
@@ -169,3 +170,92 @@ def test_connect_combo_selection_via_alias():
     # Changing via alias should also update combo
     t.a_alias = 4
     assert combo.currentIndex() == 0
+
+
+def test_connect_combo_selection_incremental():
+    # Make sure that when the choices change, only the items that differ are
+    # updated rather than repopulating the whole combo box
+
+    t = Example()
+
+    a_prop = getattr(type(t), "a")
+    a_prop.set_choices(t, list(range(100)))
+
+    combo = QtWidgets.QComboBox()
+    c1 = connect_combo_selection(t, "a", combo)  # noqa
+
+    t.a = 50
+
+    events = []
+    model = combo.model()
+    model.rowsInserted.connect(lambda parent, first, last: events.append(("insert", first, last)))
+    model.rowsRemoved.connect(lambda parent, first, last: events.append(("remove", first, last)))
+    model.modelReset.connect(lambda: events.append(("reset",)))
+
+    # Changing the display function for one value only changes its label
+    a_prop.set_display_func(t, lambda x: "fifty" if x == 50 else str(x))
+    a_prop.set_choices(t, list(range(100)))
+    assert events == []
+    assert combo.itemText(50) == "fifty"
+    assert combo.itemText(49) == "49"
+    assert combo.currentIndex() == 50
+
+    # Inserting and removing choices only inserts and removes those items
+    a_prop.set_choices(t, [0, 1, 1.5] + list(range(2, 100)))
+    assert events == [("insert", 2, 2)]
+    assert combo.count() == 101
+    assert combo.itemData(2).data == 1.5
+    assert combo.itemText(2) == "1.5"
+    assert combo.currentIndex() == 51
+    assert t.a == 50
+
+    events.clear()
+    a_prop.set_choices(t, list(range(98)))
+    assert events == [("remove", 100, 100), ("remove", 99, 99), ("remove", 2, 2)]
+    assert [combo.itemData(idx).data for idx in range(combo.count())] == list(range(98))
+    assert combo.currentIndex() == 50
+
+    # Setting the same choices again doesn't change anything
+    events.clear()
+    a_prop.set_choices(t, list(range(98)))
+    assert events == []
+
+    # Replacing an item by a separator disables it, and vice versa
+
+    separator = ChoiceSeparator("header")
+    a_prop.set_choices(t, [separator] + list(range(1, 98)))
+    item = model.item(0)
+    assert combo.itemText(0) == "header"
+    assert not item.flags() & Qt.ItemIsEnabled
+
+    a_prop.set_choices(t, list(range(98)))
+    assert combo.itemText(0) == "0"
+    assert item.flags() & Qt.ItemIsEnabled
+    assert events == []
+
+    # Selecting items in the combo box still uses the new data
+    combo.setCurrentIndex(0)
+    assert t.a == 0
+
+
+def test_connect_combo_selection_equal_choices():
+    # Values that are equal to but not the same object as one of the choices
+    # should select the first such choice.
+
+    t = Example()
+
+    choices = [[1], 3, 3.0]
+    a_prop = getattr(type(t), "a")
+    a_prop.set_choices(t, choices)
+
+    combo = QtWidgets.QComboBox()
+    c1 = connect_combo_selection(t, "a", combo)  # noqa
+
+    t.a = choices[0]
+    assert combo.currentIndex() == 0
+
+    t.a = float("3")
+    assert combo.currentIndex() == 1
+
+    t.a = None
+    assert combo.currentIndex() == -1
@@ -0,0 +1,190 @@
+import numpy as np
+import pytest
+
+from echo.alias import CallbackPropertyAlias
+from echo.core import CallbackProperty
+from echo.qt.tests.helpers import SKIP_QT_TEST
+from echo.selection import ChoiceSeparator, SelectionCallbackProperty
+
+if SKIP_QT_TEST:
+    pytest.skip(allow_module_level=True)
+
+from qtpy import QtWidgets
+from qtpy.QtCore import Qt
+
+from echo.qt.connect import connect_list_view_selection
+
+
+class Example:
+    a = SelectionCallbackProperty(default_index=1)
+    a_alias = CallbackPropertyAlias("a")
+    b = CallbackProperty()
+
+
+def _texts(view):
+    model = view.model()
+    return [model.data(model.index(row)) for row in range(model.rowCount())]
+
+
+def _selected_row(view):
+    selected = view.selectionModel().selectedRows()
+    assert len(selected) <= 1
+    return selected[0].row() if selected else -1
+
+
+def _select(view, row):
+    view.setCurrentIndex(view.model().index(row))
+
+
+def test_connect_list_view_selection():
+    t = Example()
+
+    a_prop = getattr(type(t), "a")
+    a_prop.set_choices(t, [4, 3.5])
+    a_prop.set_display_func(t, lambda x: f"value: {x}")
+
+    view = QtWidgets.QListView()
+
+    c1 = connect_list_view_selection(t, "a", view)  # noqa
+
+    model = view.model()
+    assert _texts(view) == ["value: 4", "value: 3.5"]
+    assert model.data(model.index(0), Qt.UserRole).data == 4
+    assert _selected_row(view) == 1
+
+    _select(view, 0)
+    assert t.a == 4
+
+    view.selectionModel().clearSelection()
+    assert t.a is None
+
+    t.a = 3.5
+    assert _selected_row(view) == 1
+
+    t.a = None
+    assert _selected_row(view) == -1
+
+    # Changing choices should change the list view, keeping the selection
+    # if it is still valid
+
+    t.a = 3.5
+    a_prop.set_choices(t, (4, 5, 3.5))
+    assert _texts(view) == ["value: 4", "value: 5", "value: 3.5"]
+    assert t.a == 3.5
+    assert _selected_row(view) == 2
+
+    # and otherwise using the default_index
+
+    a_prop.set_choices(t, (4, 5, 6))
+    assert t.a == 5
+    assert _selected_row(view) == 1
+
+    a_prop.set_choices(t, (9,))
+    assert t.a == 9
+    assert _texts(view) == ["value: 9"]
+    assert _selected_row(view) == 0
+
+    # Separators can't be selected
+
+    separator = ChoiceSeparator("header")
+    a_prop.set_choices(t, (separator, 1, 2))
+    assert _texts(view) == ["header", "value: 1", "value: 2"]
+    assert not model.flags(model.index(0)) & Qt.ItemIsSelectable
+    assert model.flags(model.index(1)) & Qt.ItemIsSelectable
+
+    a_prop.set_choices(t, ())
+    assert model.rowCount() == 0
+    assert _selected_row(view) == -1
+
+    # Try including an array in the choices
+    a_prop.set_choices(t, (4, 5, np.array([1, 2, 3])))
+    assert model.rowCount() == 3
+
+
+def test_connect_list_view_selection_incremental():
+    t = Example()
+
+    a_prop = getattr(type(t), "a")
+    choices = [f"item {i}" for i in range(10000)]
+    a_prop.set_choices(t, choices)
+
+    requested = []
+
+    def display(x):
+        requested.append(x)
+        return x.upper()
+
+    a_prop.set_display_func(t, display)
+
+    view = QtWidgets.QListView()
+    c1 = connect_list_view_selection(t, "a", view)  # noqa
+    model = view.model()
+
+    events = []
+    model.rowsInserted.connect(lambda parent, first, last: events.append(("insert", first, last)))
+    model.rowsRemoved.connect(lambda parent, first, last: events.append(("remove", first, last)))
+    model.dataChanged.connect(lambda first, last: events.append(("changed", first.row(), last.row())))
+    model.modelReset.connect(lambda: events.append(("reset",)))
+
+    # Labels are only computed when requested
+    assert len(requested) < 100
+    assert model.data(model.index(5000)) == "ITEM 5000"
+
+    # Selecting a value doesn't change the rows
+    t.a = choices[7000]
+    assert _selected_row(view) == 7000
+    assert events == []
+
+    # Inserting, removing, and replacing choices only signals those rows
+    choices = choices[:10] + ["new"] + choices[10:]
+    a_prop.set_choices(t, choices)
+    assert events == [("insert", 10, 10)]
+    assert _selected_row(view) == 7001
+    assert model.data(model.index(10)) == "NEW"
+
+    events.clear()
+    choices = choices[:10] + choices[11:]
+    a_prop.set_choices(t, choices)
+    assert events == [("remove", 10, 10)]
+    assert _selected_row(view) == 7000
+
+    events.clear()
+    choices = choices[:20] + ["other"] + choices[21:]
+    a_prop.set_choices(t, choices)
+    assert events == [("changed", 20, 20)]
+    assert model.data(model.index(20)) == "OTHER"
+
+    # Changing the display function updates all the labels
+    events.clear()
+    a_prop.set_display_func(t, str.title)
+    a_prop.set_choices(t, choices)
+    assert events == [("changed", 0, 9999)]
+    assert model.data(model.index(20)) == "Other"
+
+
+def test_connect_list_view_selection_invalid():
+    t = Example()
+
+    view = QtWidgets.QListView()
+
+    with pytest.raises(TypeError) as exc:
+        connect_list_view_selection(t, "b", view)
+    assert exc.value.args[0] == "connect_list_view_selection requires a SelectionCallbackProperty"
+
+
+def test_connect_list_view_selection_via_alias():
+    t = Example()
+
+    a_prop = getattr(type(t), "a")
+    a_prop.set_choices(t, [4, 3.5])
+
+    view = QtWidgets.QListView()
+    c1 = connect_list_view_selection(t, "a_alias", view)  # noqa
+
+    assert _texts(view) == ["4", "3.5"]
+
+    _select(view, 0)
+    assert t.a_alias == 4
+
+    t.a_alias = 3.5
+    assert _selected_row(view) == 1
@@ -1,3 +1,4 @@
+import operator
 import random
 from weakref import WeakKeyDictionary
 
@@ -21,6 +22,90 @@ class ChoiceSeparator:
         return f"{self.__class__.__name__}({self._label!r})"
 
 
+# Whether values of a given type are scalars according to np.isscalar, which
+# only depends on the type of the value.
+_SCALAR_TYPES = {}
+
+
+def _is_scalar(value):
+    try:
+        return _SCALAR_TYPES[type(value)]
+    except KeyError:
+        result = _SCALAR_TYPES[type(value)] = bool(np.isscalar(value))
+        return result
+
+
+class _ChoiceIndex:
+    """
+    An index of the positions of choices, by identity and, for hashable
+    choices, by equality.
+    """
+
+    __slots__ = ("source", "choices", "identity", "equality", "unhashable")
+
+    def __init__(self, choices):
+        self.source = choices
+        self.choices = choices if choices is not None else []
+        n_choices = len(self.choices)
+        # Build the index in reverse so that the first of any duplicate
+        # choices is used.
+        self.identity = dict(zip(map(id, reversed(self.choices)), range(n_choices - 1, -1, -1)))
+        self.equality = None
+        self.unhashable = None
+
+    def _build_equality(self):
+        self.equality = {}
+        self.unhashable = []
+        for pos, choice in enumerate(self.choices):
+            try:
+                self.equality.setdefault(choice, pos)
+            except TypeError:
+                self.unhashable.append(pos)
+
+    def is_current(self, choices):
+        return self.source is choices and len(self.choices) == len(choices or [])
+
+    def find(self, value, equality=False):
+        """
+        Return the position of ``value`` in the choices, or -1 if it is not
+        found. By default only the identity is checked, and if ``equality``
+        is `True` the choices equal to ``value`` are also considered.
+        """
+        pos = self.identity.get(id(value))
+        if pos is not None and self.choices[pos] is value:
+            return pos
+        if not equality:
+            return -1
+        pos = self.find_equal(value)
+        if pos >= 0:
+            return pos
+        try:
+            hash(value)
+        except TypeError:
+            positions = range(len(self.choices))
+        else:
+            positions = self.unhashable
+        for pos in positions:
+            try:
+                if value == self.choices[pos]:
+                    return pos
+            except ValueError:
+                # e.g. Numpy arrays, for which the result is ambiguous
+                pass
+        return -1
+
+    def find_equal(self, value):
+        """
+        Return the position of a hashable choice equal to ``value``, or -1.
+        """
+        if self.equality is None:
+            self._build_equality()
+        try:
+            return self.equality.get(value, -1)
+        except TypeError:
+            return -1
+
+
 class SelectionCallbackProperty(CallbackProperty):
     def __init__(self, default_index=0, choices=None, display_func=None, comparison_type=None, **kwargs):
         if choices is not None and "default" not in kwargs:
@@ -33,21 +118,51 @@ class SelectionCallbackProperty(CallbackProperty):
         self._choices = WeakKeyDictionary()
         self._display = WeakKeyDictionary()
         self._force_next_sync = WeakKeyDictionary()
+        self._choice_index = WeakKeyDictionary()
+        self._labels = WeakKeyDictionary()
+        self._choices_version = WeakKeyDictionary()
 
     def __set__(self, instance, value):
         if value is not None:
-            choices = self.get_choices(instance)
             # For built-in scalar types we use ==, and for other types we use
             # is, otherwise e.g. ComponentID returns something that evaluates
             # to true when using ==.
-            if self.comparison_type == "equality" or (self.comparison_type is None and np.isscalar(value)):
-                if not any(value == x for x in choices):
-                    raise ValueError(f"value {value} is not in valid choices: {choices}")
-            if self.comparison_type == "identity" or (self.comparison_type is None and not np.isscalar(value)):
-                if not any(value is x for x in choices):
-                    raise ValueError(f"value {value} is not in valid choices: {choices}")
+            if self.comparison_type is None:
+                equality = _is_scalar(value)
+            elif self.comparison_type in ("equality", "identity"):
+                equality = self.comparison_type == "equality"
+            else:
+                equality = None
+            if equality is not None and self._find_choice(instance, value, equality) < 0:
+                raise ValueError(f"value {value} is not in valid choices: {self.get_choices(instance)}")
         super().__set__(instance, value)
 
+    def _get_choice_index(self, instance):
+        choices = self.get_choices(instance)
+        index = self._choice_index.get(instance)
+        if index is None or not index.is_current(choices):
+            index = self._choice_index[instance] = _ChoiceIndex(choices)
+        return index
+
+    def _find_choice(self, instance, value, equality):
+        pos = self._get_choice_index(instance).find(value, equality=equality)
+        if pos < 0:
+            # The choices may have been modified in place since the index was
+            # built, so we check again with a new index.
+            self._choice_index.pop(instance, None)
+            pos = self._get_choice_index(instance).find(value, equality=equality)
+        return pos
+
+    def get_choice_index(self, instance, value):
+        """
+        Return the position of ``value`` in the choices, or -1 if it is not
+        one of the choices.
+
+        The choices are compared by identity and, if no choice is the same
+        object as ``value``, by equality.
+        """
+        return self._get_choice_index(instance).find(value, equality=True)
+
     def force_next_sync(self, instance):
         self._force_next_sync[instance] = True
 
@@ -58,13 +173,31 @@ class SelectionCallbackProperty(CallbackProperty):
             finally:
                 self._force_next_sync[instance] = False
         else:
-            return self.__get__(instance), self.get_choices(instance), self.get_choice_labels(instance)
+            return self.__get__(instance), self.get_choices_version(instance)
+
+    def _has_changed(self, old, new):
+        # The full info is cheap to compare, and may differ even if the
+        # version of the selection hasn't changed (for example if the choices
+        # have changed or force_next_sync was called).
+        return old[1] != new[1]
+
+    def get_choices_version(self, instance):
+        """
+        Return a number that changes whenever the choices or their labels
+        change, which can be used to cheaply check whether they have changed.
+        """
+        return self._choices_version.get(instance, 0)
+
+    def _bump_choices_version(self, instance):
+        self._choices_version[instance] = self._choices_version.get(instance, 0) + 1
+        self._labels.pop(instance, None)
 
     def get_display_func(self, instance):
         return self._display.get(instance, self._default_display_func)
 
     def set_display_func(self, instance, display):
         self._display[instance] = display
+        self._bump_choices_version(instance)
         # selection = self.__get__(instance)
         # self.notify(instance, selection, selection)
 
@@ -72,17 +205,51 @@ class SelectionCallbackProperty(CallbackProperty):
         return self._choices.get(instance, self.default_choices)
 
     def get_choice_labels(self, instance):
+        # The labels are cached until the choices or display function are
+        # changed. We also check the length of the choices in case they were
+        # modified in place.
+        choices = self.get_choices(instance)
+        cached = self._labels.get(instance)
+        if cached is not None and cached[0] is choices and cached[1] == len(choices):
+            return list(cached[2])
         display = self._display.get(instance, str)
         labels = []
-        for choice in self.get_choices(instance):
+        for choice in choices or ():
             if isinstance(choice, ChoiceSeparator):
                 labels.append(str(choice))
             else:
                 labels.append(display(choice))
-        return labels
+        self._labels[instance] = choices, len(labels), labels
+        return list(labels)
+
+    def get_choice_label(self, instance, choice):
+        """
+        Return the label for a single choice, which is useful to avoid
+        computing all the labels when only a few are needed.
+        """
+        if isinstance(choice, ChoiceSeparator):
+            return str(choice)
+        else:
+            return self._display.get(instance, str)(choice)
 
     def set_choices(self, instance, choices):
+        old_choices = self.get_choices(instance)
         self._choices[instance] = choices
+        self._choice_index[instance] = _ChoiceIndex(choices)
+        # If the new choices are the same objects as before, the labels can
+        # be kept. We can't tell if the same list was modified in place though.
+        if (
+            old_choices is not choices
+            and old_choices is not None
+            and choices is not None
+            and len(old_choices) == len(choices)
+            and all(map(operator.is_, old_choices, choices))
+        ):
+            labels = self._labels.get(instance)
+            if labels is not None:
+                self._labels[instance] = (choices, *labels[1:])
+        else:
+            self._bump_choices_version(instance)
         self._choices_updated(instance, choices)
         selection = self.__get__(instance)
         self.notify(instance, selection, selection)
@@ -97,10 +264,13 @@ class SelectionCallbackProperty(CallbackProperty):
         # We do the following because 'selection in choice' actually compares
         # equality not identity (and we really just care about identity here)
         # However, for simple Python types, we also need to check ==.
-        for choice in choices:
-            if selection is choice or (
-                np.isscalar(choice) and (np.isreal(choice) or isinstance(choice, str)) and selection == choice
-            ):
+        index = self._get_choice_index(instance)
+        if index.find(selection) >= 0:
+            return
+        pos = index.find_equal(selection)
+        if pos >= 0:
+            choice = choices[pos]
+            if _is_scalar(choice) and (np.isreal(choice) or isinstance(choice, str)):
                 return
 
         choices_without_separators = [choice for choice in choices if not isinstance(choice, ChoiceSeparator)]
@@ -0,0 +1,242 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ..aio import changes, wait_for_change
+from ..core import CallbackProperty, HasCallbackProperties, add_callback
+
+
+class State(HasCallbackProperties):
+    a = CallbackProperty(0)
+
+
+async def wait_for_tasks():
+    # Wait for the tasks started by async callbacks to finish, rather than
+    # waiting for a fixed time.
+    current = asyncio.current_task()
+    while tasks := asyncio.all_tasks() - {current}:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def test_async_callback():
+    state = State()
+    values = []
+
+    async def callback(value):
+        await asyncio.sleep(0)
+        values.append(value)
+
+    async def main():
+        state.add_callback("a", callback)
+        state.a = 1
+        state.a = 2
+        assert values == []
+        await wait_for_tasks()
+        assert values == [1, 2]
+
+    asyncio.run(main())
+
+    # Async callbacks can only be called when a loop is running, but this
+    # doesn't prevent other callbacks from being called
+    state.add_callback("a", values.append, priority=-1)
+    with pytest.warns(RuntimeWarning, match="async callbacks can only be called"):
+        state.a = 3
+    assert values == [1, 2, 3]
+
+    with pytest.raises(ValueError, match="validators cannot be async"):
+        state.add_callback("a", callback, validator=True)
+
+
+def test_async_callback_cancel_previous():
+    state = State()
+    started = []
+    finished = []
+
+    async def main():
+        release = asyncio.Event()
+
+        async def callback(value):
+            started.append(value)
+            await release.wait()
+            finished.append(value)
+
+        state.add_callback("a", callback, cancel_previous=True)
+        for i in range(1, 6):
+            state.a = i
+            await asyncio.sleep(0)
+        release.set()
+        await wait_for_tasks()
+
+    asyncio.run(main())
+
+    assert started == [1, 2, 3, 4, 5]
+    assert finished == [5]
+
+
+def test_async_callback_concurrency():
+    state = State()
+    running = 0
+    max_running = 0
+    finished = []
+
+    async def callback(value):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.001)
+        running -= 1
+        finished.append(value)
+
+    async def main():
+        state.add_callback("a", callback, concurrency=2)
+        for i in range(1, 11):
+            state.a = i
+        await wait_for_tasks()
+
+    asyncio.run(main())
+
+    assert max_running == 2
+    assert sorted(finished) == list(range(1, 11))
+
+
+def test_async_callback_errors():
+    # Exceptions in async callbacks are passed to the loop exception handler
+    # and don't affect other callbacks.
+
+    state = State()
+    values = []
+    errors = []
+
+    async def failing(value):
+        raise ValueError(f"bad value {value}")
+
+    async def callback(value):
+        values.append(value)
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context["exception"]))
+        state.add_callback("a", failing, priority=1)
+        state.add_callback("a", callback)
+        state.a = 1
+        await wait_for_tasks()
+
+    asyncio.run(main())
+
+    assert values == [1]
+    assert len(errors) == 1
+    assert str(errors[0]) == "bad value 1"
+
+
+def test_async_callback_from_thread():
+    # If the loop is given as executor, the property can be changed in other
+    # threads.
+
+    state = State()
+    threads = []
+    called = asyncio.Event()
+
+    async def callback(value):
+        threads.append(threading.current_thread())
+        called.set()
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        state.add_callback("a", callback, executor=loop)
+        await loop.run_in_executor(None, setattr, state, "a", 1)
+        await called.wait()
+
+    asyncio.run(main())
+
+    assert threads == [threading.current_thread()]
+
+    async def other(value):
+        pass
+
+    with pytest.raises(TypeError, match="async callbacks can only use"):
+        state.add_callback("a", other, executor=ThreadPoolExecutor())
+
+
+def test_async_method():
+    class Listener:
+        def __init__(self):
+            self.values = []
+
+        async def callback(self, value):
+            self.values.append(value)
+
+    state = State()
+    listener = Listener()
+
+    async def main():
+        add_callback(state, "a", listener.callback)
+        state.a = 1
+        await wait_for_tasks()
+        state.remove_callback("a", listener.callback)
+        state.a = 2
+        await wait_for_tasks()
+
+    asyncio.run(main())
+
+    assert listener.values == [1]
+
+
+def test_wait_for_change():
+    state = State()
+
+    async def main():
+        loop = asyncio.get_running_loop()
+
+        def produce():
+            for i in range(1, 11):
+                state.a = i
+
+        task = asyncio.ensure_future(wait_for_change(state, "a", predicate=lambda x: x > 5))
+        await asyncio.sleep(0)
+        await loop.run_in_executor(None, produce)
+        assert await task == 6
+
+        with pytest.raises(asyncio.TimeoutError):
+            await wait_for_change(state, "a", timeout=0.01)
+
+    asyncio.run(main())
+
+    # The callbacks are removed afterwards
+    assert len(State.a._callbacks[state]) == 0
+
+
+def test_changes():
+    state = State()
+
+    async def main():
+        values = []
+
+        async def consume():
+            async for value in changes(state, "a"):
+                values.append(value)
+                if value == 3:
+                    break
+
+        task = asyncio.ensure_future(consume())
+        await asyncio.sleep(0)
+        state.a = 1
+        state.a = 2
+        state.a = 3
+        await task
+        assert values == [1, 2, 3]
+
+        # With latest=True, values that are not consumed in time are dropped
+        iterator = changes(state, "a", latest=True)
+        first = asyncio.ensure_future(iterator.__anext__())
+        await asyncio.sleep(0)
+        state.a = 4
+        assert await first == 4
+        state.a = 5
+        state.a = 6
+        assert await iterator.__anext__() == 6
+        await iterator.aclose()
+
+    asyncio.run(main())
+
+    assert len(State.a._callbacks[state]) == 0
@@ -316,6 +316,25 @@ def test_has_callback_properties_global_callback_via_property():
     callback.assert_called_once_with(color="blue", colour="blue")
 
 
+def test_has_callback_properties_global_callback_multiple_aliases():
+    """Test that global callbacks receive all aliases, including inherited ones."""
+
+    class Derived(HasCallbackPropertiesClass):
+        col = CallbackPropertyAlias("color")
+
+    obj = Derived()
+    callback = MagicMock()
+
+    obj.add_global_callback(callback)
+    obj.color = "blue"
+
+    callback.assert_called_once_with(color="blue", col="blue", colour="blue")
+
+    callback.reset_mock()
+    obj.size = 20
+    callback.assert_called_once_with(size=20)
+
+
 # Class attribute access tests
 
 
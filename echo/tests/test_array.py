@@ -0,0 +1,155 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_equal
+
+from echo import (
+    CallbackProperty,
+    CallbackPropertyAlias,
+    CallbackPropertyArray,
+    HasCallbackProperties,
+    ListCallbackProperty,
+    callback_property,
+)
+
+
+class Marker(HasCallbackProperties):
+    alpha = CallbackProperty(1.0)
+    size = CallbackProperty(2)
+    label = CallbackProperty("marker")
+    color = CallbackProperty()
+    opacity = CallbackPropertyAlias("alpha")
+
+
+def test_values():
+    markers = CallbackPropertyArray(Marker, 5, dtypes={"size": float})
+
+    assert len(markers) == 5
+    assert markers.state_class is Marker
+    assert markers.alpha.values.dtype == float
+    assert markers.size.values.dtype == float
+    assert markers.label.values.dtype == object
+    assert_equal(markers.alpha.values, [1.0] * 5)
+    assert_equal(markers.color.values, [None] * 5)
+
+    # The values can't be changed without calling the callbacks
+    with pytest.raises(ValueError, match="read-only"):
+        markers.alpha.values[0] = 2
+    with pytest.raises(ValueError, match="read-only"):
+        markers.alpha[:2][0] = 2
+
+    markers.alpha[1:3] = 0.5
+    markers.label[0] = "a much longer label"
+    markers.size = np.arange(5)
+    markers.opacity[4] = 0.1
+    assert_equal(markers.alpha.values, [1.0, 0.5, 0.5, 1.0, 0.1])
+    assert_equal(markers.size.values, [0, 1, 2, 3, 4])
+    assert markers.label[0] == "a much longer label"
+
+    with pytest.raises(AttributeError, match="no callback property 'missing'"):
+        markers.missing
+
+    with pytest.raises(ValueError, match="Unknown properties in dtypes: missing"):
+        CallbackPropertyArray(Marker, 5, dtypes={"missing": int})
+
+
+def test_rows():
+    markers = CallbackPropertyArray(Marker, 3)
+
+    row = markers[-1]
+    assert row == markers[2]
+    assert row.alpha == 1.0
+    assert type(row.alpha) is float
+    assert row.label == "marker"
+    assert row.opacity == 1.0
+
+    row.alpha = 0.5
+    row.color = "red"
+    assert_equal(markers.alpha.values, [1.0, 1.0, 0.5])
+    assert markers.color[2] == "red"
+    assert [row.alpha for row in markers] == [1.0, 1.0, 0.5]
+
+    with pytest.raises(AttributeError, match="no callback property 'missing'"):
+        row.missing = 1
+    with pytest.raises(IndexError):
+        markers[3]
+
+    # Indexing with anything other than an integer gives a list of rows
+    assert markers[1:] == [markers[1], markers[2]]
+    assert markers[markers.alpha.values < 1] == [markers[2]]
+    assert markers[[2, 0]] == [markers[2], markers[0]]
+    assert markers[np.array([], dtype=int)] == []
+    with pytest.raises(IndexError):
+        markers["alpha"]
+
+
+def test_callbacks():
+    markers = CallbackPropertyArray(Marker, 6)
+    calls = []
+
+    def on_alpha(indices):
+        calls.append(("alpha", indices.tolist()))
+
+    markers.add_callback("alpha", on_alpha)
+    markers.add_callback("size", lambda indices: calls.append(("size", indices.tolist())), priority=1)
+    markers.add_global_callback(lambda **kwargs: calls.append({k: v.tolist() for k, v in kwargs.items()}))
+
+    # Only the rows that actually change are passed to the callbacks
+    markers.alpha[[0, 1]] = 0.5
+    markers.alpha[:4] = 0.5
+    markers.alpha[[5, 5, 3]] = [0.1, 0.2, 0.5]
+    markers[1].alpha = 0.5
+    assert calls == [
+        ("alpha", [0, 1]),
+        {"alpha": [0, 1]},
+        ("alpha", [2, 3]),
+        {"alpha": [2, 3]},
+        ("alpha", [5]),
+        {"alpha": [5]},
+    ]
+
+    # NaN values are not considered as changed
+    calls.clear()
+    markers.alpha[:] = np.nan
+    markers.alpha[:] = np.nan
+    assert len(calls) == 2
+
+    calls.clear()
+    with markers.batch():
+        markers.alpha[:2] = 1
+        with markers.batch():
+            markers.size[4:] = 3
+        markers.alpha[1:3] = 2
+        assert calls == []
+    assert calls == [("size", [4, 5]), ("alpha", [0, 1, 2]), {"alpha": [0, 1, 2], "size": [4, 5]}]
+
+    calls.clear()
+    markers.remove_callback("alpha", on_alpha)
+    markers.alpha[0] = 3
+    assert calls == [{"alpha": [0]}]
+
+    with pytest.raises(ValueError, match="Callback function not found"):
+        markers.remove_callback("alpha", on_alpha)
+
+
+def test_from_instances():
+    instances = [Marker() for _ in range(3)]
+    instances[1].alpha = 0.5
+    instances[2].color = (1, 0, 0)
+
+    markers = CallbackPropertyArray.from_instances(Marker, instances)
+    assert_equal(markers.alpha.values, [1.0, 0.5, 1.0])
+    assert markers[2].color == (1, 0, 0)
+
+
+def test_unsupported_properties():
+    class WithList(HasCallbackProperties):
+        items = ListCallbackProperty()
+
+    class WithGetter(HasCallbackProperties):
+        @callback_property
+        def value(self):
+            return 1
+
+    for cls in (WithList, WithGetter):
+        with pytest.raises(TypeError, match="can't be stored in an array"):
+            CallbackPropertyArray(cls, 3)
@@ -1,3 +1,5 @@
+import gc
+
 import pytest
 
 from ..callback_container import CallbackContainer
@@ -123,3 +125,154 @@ def test_callback_container_remove():
     container.remove(func_b)
 
     assert len(container) == 0
+
+
+def test_callback_container_ordered():
+    # Entries should be sorted by decreasing priority, and entries with the
+    # same priority should stay in the order they were added
+
+    instance = SimpleClass(2)
+
+    container = CallbackContainer()
+    container.append(func_a)
+    container.append(instance.meth, priority=3)
+    container.append(func_b)
+    container.append(instance.meth, priority=-1)
+
+    ordered = container.ordered()
+    assert container.ordered() is ordered
+    assert [entry[-1] for entry in ordered] == [3, 0, 0, -1]
+    assert ordered[1][0] is func_a
+    assert ordered[2][0] is func_b
+
+    # The cached order should be updated when callbacks are added/removed
+    container.remove(func_a)
+    assert [entry[-1] for entry in container.ordered()] == [3, 0, -1]
+    container.append(func_a, priority=5)
+    assert container.ordered()[0][0] is func_a
+
+    # The previous tuple should not have been modified
+    assert len(ordered) == 4
+
+
+def test_callback_container_dispatch():
+    calls = []
+
+    class Recorder:
+        def __init__(self, name):
+            self.name = name
+
+        def meth(self, *args, **kwargs):
+            calls.append((self.name, args, kwargs))
+
+    def func(*args, **kwargs):
+        calls.append(("func", args, kwargs))
+
+    recorder1 = Recorder("r1")
+    recorder2 = Recorder("r2")
+
+    container = CallbackContainer()
+    container.append(recorder1.meth)
+    container.append(func, priority=1)
+    container.append(recorder2.meth)
+
+    container.dispatch(1, b=2)
+    assert calls == [("func", (1,), {"b": 2}), ("r1", (1,), {"b": 2}), ("r2", (1,), {"b": 2})]
+
+    # Callbacks on instances that have been garbage collected are removed
+    del recorder1
+    calls.clear()
+    container.dispatch(3)
+    assert calls == [("func", (3,), {}), ("r2", (3,), {})]
+    assert len(container) == 2
+
+    # Removing callbacks during dispatch should not affect the ongoing dispatch
+    def remove_self(*args):
+        container.remove(remove_self)
+        calls.append(("remove_self", args, {}))
+
+    container.append(remove_self, priority=2)
+    calls.clear()
+    container.dispatch(4)
+    assert calls == [("remove_self", (4,), {}), ("func", (4,), {}), ("r2", (4,), {})]
+    assert remove_self not in container
+
+
+def test_callback_container_auto_remove():
+    instance1 = SimpleClass(1)
+    instance2 = SimpleClass(2)
+
+    container = CallbackContainer()
+    container.append(instance1.meth)
+    container.append(instance1.meth, priority=2)
+    container.append(instance2.meth)
+    container.append(func_a)
+
+    del instance1
+    gc.collect()
+
+    assert len(container) == 2
+    assert [callback() for callback in container] == [2, 1]
+    assert instance2.meth in container
+
+
+def test_callback_container_stale_function():
+    # If the function for a method is garbage collected, the entry can no
+    # longer be called but should not prevent other functions that end up
+    # with the same id from being added.
+
+    instance = SimpleClass(1)
+    container = CallbackContainer()
+
+    def make_method(value):
+        def meth(self):
+            return value
+
+        return meth.__get__(instance)
+
+    for value in range(100):
+        method = make_method(value)
+        container.append(method)
+        assert method in container
+        del method
+
+    assert len(container) <= 100
+    assert list(container) == []
+
+
+class _NoScanDict(dict):
+    """
+    A dictionary that fails if its items are iterated over.
+    """
+
+    def __iter__(self):
+        raise AssertionError("entries should not be scanned")
+
+    keys = values = items = __iter__
+
+
+def test_callback_container_add_remove_no_scan():
+    # Adding, checking and removing callbacks should take constant time, so
+    # should neither look through the other entries nor sort them.
+    instances = [SimpleClass(i) for i in range(100)]
+    methods = [instance.meth for instance in instances]
+
+    container = CallbackContainer()
+    container._entries = _NoScanDict()
+    for method in methods:
+        container.append(method)
+    container.append(func_a)
+    assert len(container) == 101
+    for method in methods:
+        assert method in container
+    for method in methods[::2]:
+        container.remove(method)
+    container.remove(func_a)
+    assert len(container) == 50
+    assert container._ordered is None
+
+    # The same applies when callbacks are removed since their instances have
+    # been garbage collected
+    del instances, methods, method
+    gc.collect()
+    assert len(container) == 0
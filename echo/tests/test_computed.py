@@ -0,0 +1,274 @@
+import gc
+import math
+import weakref
+from unittest.mock import MagicMock
+
+import pytest
+
+from ..containers import CallbackList
+from ..core import (
+    CallbackProperty,
+    ComputedCallbackProperty,
+    HasCallbackProperties,
+    add_callback,
+    computed,
+    delay_callback,
+)
+
+
+class State(HasCallbackProperties):
+    a = CallbackProperty(1)
+    b = CallbackProperty(2)
+    flag = CallbackProperty(True)
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    @computed
+    def total(self):
+        """The sum of a and b"""
+        self.calls.append("total")
+        return self.a + self.b
+
+    @computed
+    def choice(self):
+        self.calls.append("choice")
+        return self.a if self.flag else self.b
+
+    @computed
+    def double(self):
+        self.calls.append("double")
+        return self.total * 2
+
+
+def test_lazy():
+    state = State()
+    assert isinstance(State.total, ComputedCallbackProperty)
+    assert State.total.__doc__ == "The sum of a and b"
+
+    assert state.calls == []
+    assert state.total == 3
+    assert state.total == 3
+    assert state.calls == ["total"]
+
+    # Changing a dependency doesn't recompute the value until it is read
+    state.a = 5
+    state.a = 10
+    assert state.calls == ["total"]
+    assert state.total == 12
+    assert state.calls == ["total", "total"]
+
+    # Computed properties can depend on other computed properties
+    assert state.double == 24
+    state.b = 3
+    assert state.double == 26
+    assert state.calls == ["total", "total", "double", "total", "double"]
+
+    with pytest.raises(AttributeError, match="computed property 'total' cannot be set"):
+        state.total = 1
+
+
+def test_dynamic_dependencies():
+    # Only the properties read during the last evaluation are dependencies
+
+    state = State()
+    assert state.choice == 1
+    state.b = 5
+    assert state.choice == 1
+    assert state.calls == ["choice"]
+
+    state.flag = False
+    assert state.choice == 5
+    state.a = 10
+    assert state.choice == 5
+    assert state.calls == ["choice", "choice"]
+
+
+def test_callbacks():
+    state = State()
+    callback = MagicMock()
+    callback_2arg = MagicMock()
+    add_callback(state, "choice", callback)
+    add_callback(state, "choice", callback_2arg, echo_old=True)
+
+    # The value is computed straight away when a dependency changes
+    state.a = 3
+    callback.assert_called_once_with(3)
+    callback_2arg.assert_called_once_with(1, 3)
+
+    # Callbacks are not called if the value doesn't change
+    callback.reset_mock()
+    state.b = 10
+    assert callback.call_count == 0
+    state.flag = False
+    callback.assert_called_once_with(10)
+
+    callback.reset_mock()
+    with delay_callback(state, "b"):
+        state.b = 11
+        assert state.choice == 11
+        assert callback.call_count == 0
+    callback.assert_called_once_with(11)
+
+    callback.reset_mock()
+    with delay_callback(state, "choice"):
+        state.b = 12
+        state.b = 13
+        assert callback.call_count == 0
+    callback.assert_called_once_with(13)
+
+
+def test_clear_dependency_callbacks():
+    # Clearing the callbacks of a property that a computed property on another
+    # instance depends on shouldn't stop the computed property from updating.
+
+    class Other(HasCallbackProperties):
+        def __init__(self, state):
+            super().__init__()
+            self.state = state
+
+        @computed
+        def total(self):
+            return self.state.total
+
+    state = State()
+    other = Other(state)
+    callback = MagicMock()
+    add_callback(other, "total", callback)
+
+    state.a = 2
+    callback.assert_called_once_with(4)
+
+    state.clear_callbacks()
+    state.calls.clear()
+    state.a = 3
+    state.b = 4
+    assert callback.call_args_list == [((4,),), ((5,),), ((7,),)]
+    assert other.total == 7
+    assert state.calls == ["total", "total"]
+
+
+def test_global_callbacks():
+    state = State()
+    callback = MagicMock()
+    state.add_global_callback(callback)
+    state.calls.clear()
+
+    state.a = 2
+    callback.assert_any_call(a=2)
+    callback.assert_any_call(total=4)
+    callback.assert_any_call(choice=2)
+    callback.assert_any_call(double=8)
+    assert callback.call_count == 4
+    assert sorted(state.calls) == ["choice", "double", "total"]
+
+
+def test_global_callbacks_evaluation_error():
+    # Adding a global callback shouldn't fail if a computed property can't be
+    # evaluated with the default values of the properties it depends on.
+
+    class Stub(HasCallbackProperties):
+        x_min = CallbackProperty()
+
+        @computed
+        def x_log_min(self):
+            return math.log10(self.x_min)
+
+    stub = Stub()
+    callback = MagicMock()
+    stub.add_global_callback(callback)
+
+    with pytest.raises(TypeError):
+        stub.x_log_min
+
+    stub.x_min = 10
+    callback.assert_called_once_with(x_min=10)
+    assert stub.x_log_min == 1
+
+    # Once the value has been computed, changes to it are notified
+    callback.reset_mock()
+    stub.x_min = 100
+    callback.assert_any_call(x_min=100)
+    callback.assert_any_call(x_log_min=2)
+
+    # The same applies to states added to a list
+    items = CallbackList(MagicMock())
+    items.append(Stub())
+
+
+def test_diamond():
+    # When several computed properties depend on the same property, they
+    # should only be computed once per change and never see inconsistent
+    # values.
+
+    class Diamond:
+        a = CallbackProperty(1)
+
+        def __init__(self):
+            self.seen = []
+
+        @computed
+        def b(self):
+            return self.a + 1
+
+        @computed
+        def c(self):
+            return self.a * 2
+
+        @computed
+        def d(self):
+            self.seen.append((self.a, self.b, self.c))
+            return self.b + self.c
+
+    diamond = Diamond()
+    values = []
+    add_callback(diamond, "b", values.append)
+    add_callback(diamond, "d", values.append)
+    assert diamond.seen == [(1, 2, 2)]
+
+    for a in range(2, 5):
+        diamond.a = a
+
+    assert diamond.seen == [(a, a + 1, a * 2) for a in range(1, 5)]
+    assert sorted(values) == sorted([3, 4, 5] + [7, 10, 13])
+
+
+def test_circular():
+    class Circular:
+        @computed
+        def a(self):
+            return self.b
+
+        @computed
+        def b(self):
+            return self.a
+
+    with pytest.raises(RuntimeError, match="depends on itself"):
+        Circular().a
+
+
+def test_instance_storage():
+    class Stub(HasCallbackProperties, instance_storage=True):
+        a = CallbackProperty(1)
+
+        @computed
+        def b(self):
+            return self.a * 10
+
+    stub = Stub()
+    callback = MagicMock()
+    stub.add_callback("b", callback)
+    stub.a = 2
+    callback.assert_called_once_with(20)
+    assert stub.b == 20
+
+
+def test_garbage_collection():
+    state = State()
+    add_callback(state, "double", print)
+    assert state.double == 6
+    ref = weakref.ref(state)
+    del state
+    gc.collect()
+    assert ref() is None
@@ -1,8 +1,20 @@
-from unittest.mock import MagicMock
+import gc
+from unittest.mock import MagicMock, patch
 
+import numpy as np
 import pytest
 
-from echo import CallbackProperty, DictCallbackProperty, HasCallbackProperties, ListCallbackProperty
+from echo import (
+    CallbackDict,
+    CallbackList,
+    CallbackProperty,
+    ContainerChange,
+    DictCallbackProperty,
+    HasCallbackProperties,
+    ListCallbackProperty,
+    delay_callback,
+    transaction,
+)
 
 
 class StubList(HasCallbackProperties):
@@ -273,6 +285,24 @@ def test_list_nested_callbacks():
     assert test1.call_count == 2
 
 
+def test_nested_links_released():
+    # The callbacks that propagate changes from nested states should go away
+    # when the container holding them is replaced.
+
+    stub = StubList()
+    simple = Simple()
+    calls = []
+    stub.add_callback("prop1", lambda value: calls.append(len(value)))
+
+    for _ in range(100):
+        stub.prop1 = [simple]
+    gc.collect()
+
+    assert len(simple._global_callbacks) == 1
+    simple.a = 1
+    assert calls == [1, 1]
+
+
 def test_dict_normal_callback():
     stub = StubDict()
 
@@ -604,3 +634,525 @@ def test_list_multiple():
 
     assert test1.call_count == 2
     assert test2.call_count == 2
+
+
+def test_instance_storage():
+    class Stub(HasCallbackProperties, instance_storage=True):
+        items = ListCallbackProperty()
+        mapping = DictCallbackProperty()
+
+    stub = Stub()
+
+    test1 = MagicMock()
+    stub.add_callback("items", test1)
+    test2 = MagicMock()
+    stub.add_global_callback(test2)
+
+    stub.items.append(1)
+    assert test1.call_count == 1
+    test2.assert_called_once_with(items=[1])
+    assert vars(stub)["items"] == [1]
+
+    stub.mapping["a"] = 1
+    assert stub.mapping == {"a": 1}
+    assert Stub().items == []
+
+
+def test_list_batch():
+    stub = StubList()
+    stub.prop1 = [1, 2]
+
+    test1 = MagicMock()
+    stub.add_callback("prop1", test1)
+    test2 = MagicMock()
+    stub.add_global_callback(test2)
+
+    with stub.prop1.batch():
+        for i in range(100):
+            stub.prop1.append(i)
+        stub.prop1.insert(0, 5)
+        stub.prop1.pop()
+        stub.prop1[1] = 3
+        assert test1.call_count == 0
+        assert test2.call_count == 0
+
+    assert test1.call_count == 1
+    assert test2.call_count == 1
+    assert stub.prop1 == [5, 3, 2] + list(range(99))
+
+    # Nested batches only notify once on exiting the outermost batch
+    with stub.prop1.batch():
+        stub.prop1.append(1)
+        with stub.prop1.batch():
+            stub.prop1.append(2)
+        assert test1.call_count == 1
+    assert test1.call_count == 2
+
+    # If the contents end up unchanged, no notification is emitted
+    with stub.prop1.batch():
+        stub.prop1.append(3)
+        stub.prop1.pop()
+    with stub.prop1.batch():
+        pass
+    assert test1.call_count == 2
+
+    # Callbacks are still called if an exception occurs
+    with pytest.raises(ValueError):
+        with stub.prop1.batch():
+            stub.prop1.clear()
+            raise ValueError()
+    assert test1.call_count == 3
+    assert stub.prop1 == []
+
+
+def test_list_batch_nested():
+    stub = StubList()
+    simple = Simple()
+    stub.prop1 = [[1], {"a": 1}, simple]
+
+    test = MagicMock()
+    stub.add_callback("prop1", test)
+
+    # Changes to nested items are detected even though the items of the
+    # outer list are unchanged
+    with stub.prop1.batch():
+        stub.prop1[0].append(2)
+        stub.prop1[1]["b"] = 2
+        simple.a = 3
+    assert test.call_count == 1
+
+    with stub.prop1.batch():
+        simple.a = 3
+    assert test.call_count == 1
+
+
+def test_dict_batch():
+    stub = StubDict()
+    stub.prop1 = {"a": 1}
+
+    test = MagicMock()
+    stub.add_callback("prop1", test)
+
+    with stub.prop1.batch():
+        for i in range(100):
+            stub.prop1[f"key{i}"] = i
+        stub.prop1.pop("a")
+        stub.prop1.update(b=2)
+        assert test.call_count == 0
+    assert test.call_count == 1
+    assert len(stub.prop1) == 101
+
+    # Changing the order of the keys is not considered a change
+    with stub.prop1.batch():
+        stub.prop1["b"] = stub.prop1.pop("key0")
+        stub.prop1["key0"] = 0
+        stub.prop1["b"] = 2
+    assert test.call_count == 1
+
+
+def test_batch_uncomparable_items():
+    # Items such as Numpy arrays can't be compared with ==, in which case the
+    # contents are considered to have changed unless the items are the same.
+
+    test = MagicMock()
+    array = np.arange(3)
+    items = CallbackList(test, [array])
+    values = CallbackDict(test, {"a": array})
+
+    with items.batch():
+        items[0] = array + 1
+    with values.batch():
+        values["a"] = array + 1
+    assert test.call_count == 2
+
+    with items.batch():
+        items[0] = items[0]
+    with values.batch():
+        values["a"] = values["a"]
+    assert test.call_count == 2
+
+
+def test_batch_delay_callback():
+    stub = StubList()
+
+    test = MagicMock()
+    stub.add_callback("prop1", test)
+
+    with delay_callback(stub, "prop1"):
+        with stub.prop1.batch():
+            stub.prop1.append(1)
+            stub.prop1.append(2)
+        stub.prop1.append(3)
+        assert test.call_count == 0
+    assert test.call_count == 1
+    assert stub.prop1 == [1, 2, 3]
+
+    with stub.prop1.batch():
+        with delay_callback(stub, "prop1"):
+            stub.prop1.append(4)
+        assert test.call_count == 1
+    assert test.call_count == 2
+
+
+def _plain(value):
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    elif isinstance(value, list):
+        return [_plain(v) for v in value]
+    return value
+
+
+def _apply_changes(target, changes):
+    # Apply a list of changes to a plain list/dict to check that the changes
+    # fully describe the modifications to the container.
+    for change in changes:
+        obj = target
+        for position in change.path:
+            obj = obj[position]
+        if change.kind == "insert":
+            obj[change.index : change.index] = _plain(change.new)
+        elif change.kind == "remove":
+            del obj[change.index : change.index + len(change.old)]
+        elif change.kind == "replace":
+            obj[change.index : change.index + len(change.old)] = _plain(change.new)
+        elif change.kind == "set":
+            if isinstance(obj, Simple):
+                assert getattr(obj, change.key) == change.new
+            else:
+                obj[change.key] = _plain(change.new)
+        elif change.kind == "delete":
+            del obj[change.key]
+        elif change.kind == "clear":
+            obj.clear()
+        else:
+            raise ValueError(f"Unexpected change: {change}")
+
+
+def test_list_detailed_changes():
+    items = CallbackList(None, [1, 2, 3])
+
+    changes = []
+    items.add_callback(changes.extend, detailed=True)
+    regular = MagicMock()
+    items.add_callback(regular)
+
+    def check(*expected):
+        assert changes == list(expected)
+        changes.clear()
+
+    items.append(4)
+    check(ContainerChange("insert", index=3, new=[4]))
+    assert regular.call_count == 1
+    regular.assert_called_with()
+
+    items.extend([5, 6])
+    check(ContainerChange("insert", index=4, new=[5, 6]))
+
+    items.insert(-1, 7)
+    check(ContainerChange("insert", index=5, new=[7]))
+
+    items.insert(100, 8)
+    check(ContainerChange("insert", index=7, new=[8]))
+
+    assert items.pop() == 8
+    check(ContainerChange("remove", index=7, old=[8]))
+
+    assert items.pop(-2) == 7
+    check(ContainerChange("remove", index=5, old=[7]))
+
+    items.remove(2)
+    check(ContainerChange("remove", index=1, old=[2]))
+
+    assert items == [1, 3, 4, 5, 6]
+
+    items[-1] = 10
+    check(ContainerChange("replace", index=4, old=[6], new=[10]))
+
+    items[1:3] = [20, 21, 22]
+    check(ContainerChange("replace", index=1, old=[3, 4], new=[20, 21, 22]))
+
+    items[::2] = [0, 0, 0]
+    check(
+        ContainerChange("replace", index=0, old=[1], new=[0]),
+        ContainerChange("replace", index=2, old=[21], new=[0]),
+        ContainerChange("replace", index=4, old=[5], new=[0]),
+    )
+
+    del items[0]
+    check(ContainerChange("remove", index=0, old=[0]))
+
+    del items[1:3]
+    check(ContainerChange("remove", index=1, old=[0, 22]))
+
+    assert items == [20, 0, 10]
+
+    del items[::2]
+    check(
+        ContainerChange("remove", index=2, old=[10]),
+        ContainerChange("remove", index=0, old=[20]),
+    )
+
+    items.extend([3, 1, 2])
+    changes.clear()
+
+    items.sort()
+    check(ContainerChange("reorder"))
+
+    items.reverse()
+    check(ContainerChange("reorder"))
+
+    items.clear()
+    check(ContainerChange("clear", old=[3, 2, 1, 0]))
+
+    items.notify_all()
+    check(ContainerChange("reset"))
+
+
+def test_no_detailed_callbacks():
+    # Changes are only recorded if there are any detailed callbacks
+    items = CallbackList(MagicMock(), [1, 2, 3, 4])
+    mapping = CallbackDict(MagicMock(), a=1, b=2)
+
+    with patch("echo.containers.ContainerChange", side_effect=AssertionError("change recorded")):
+        items.append(5)
+        items[1:3] = [6, 7]
+        items[::2] = [8, 9, 10]
+        del items[1:3]
+        del items[::2]
+        items.pop()
+        items.sort()
+        mapping.update(a=3, c=4)
+        mapping.pop("a")
+        mapping.pop("missing", None)
+        mapping["d"] = 5
+        with items.batch():
+            items.append(11)
+
+    assert items == [11]
+    assert mapping == {"b": 2, "c": 4, "d": 5}
+
+
+def test_dict_detailed_changes():
+    mapping = CallbackDict(None, {"a": 1})
+
+    changes = []
+    mapping.add_callback(changes.extend, detailed=True)
+
+    def check(*expected):
+        assert changes == list(expected)
+        changes.clear()
+
+    mapping["b"] = 2
+    check(ContainerChange("set", key="b", new=2))
+
+    mapping["a"] = 3
+    check(ContainerChange("set", key="a", old=1, new=3))
+
+    mapping.update({"a": 4}, c=5)
+    check(ContainerChange("set", key="a", old=3, new=4), ContainerChange("set", key="c", new=5))
+
+    assert mapping.pop("c") == 5
+    check(ContainerChange("delete", key="c", old=5))
+
+    assert mapping.pop("d", None) is None
+    check()
+
+    del mapping["b"]
+    check(ContainerChange("delete", key="b", old=2))
+
+    mapping["e"] = 6
+    changes.clear()
+    assert mapping.popitem() == ("e", 6)
+    check(ContainerChange("delete", key="e", old=6))
+
+    mapping.clear()
+    check(ContainerChange("clear", old={"a": 4}))
+
+
+def test_detailed_nested():
+    simple = Simple()
+    items = CallbackList(None, [[1, 2], {"a": [3]}, simple])
+
+    changes = []
+    items.add_callback(changes.extend, detailed=True)
+    regular = MagicMock()
+    items.add_callback(regular)
+
+    items[0].append(4)
+    assert changes == [ContainerChange("insert", index=2, new=[4], path=(0,))]
+    changes.clear()
+
+    items[1]["a"][0] = 5
+    assert changes == [ContainerChange("replace", index=0, old=[3], new=[5], path=(1, "a"))]
+    changes.clear()
+
+    simple.a = 6
+    assert changes == [ContainerChange("set", key="a", new=6, path=(2,))]
+    changes.clear()
+
+    # Regular callbacks should still be called as before
+    assert regular.call_count == 3
+    regular.assert_called_with(a=6)
+
+    # Once items are removed, changes to them should no longer be propagated
+    nested = items.pop(0)
+    changes.clear()
+    nested.append(7)
+    items.remove(simple)
+    changes.clear()
+    simple.a = 8
+    assert changes == []
+    assert regular.call_count == 5
+
+
+def test_detailed_batch():
+    items = CallbackList(None, [1, 2, [3]])
+
+    changes = []
+    items.add_callback(changes.append, detailed=True)
+
+    with items.batch():
+        items.append(4)
+        items[2].append(5)
+        items.pop(0)
+        assert changes == []
+
+    assert changes == [
+        [
+            ContainerChange("insert", index=3, new=[4]),
+            ContainerChange("insert", index=1, new=[5], path=(2,)),
+            ContainerChange("remove", index=0, old=[1]),
+        ]
+    ]
+
+
+def test_detailed_replay():
+    # Check that applying the changes to a copy of the container reproduces
+    # the changes to the original container.
+
+    simple = Simple()
+    items = CallbackList(None, [1, [2, 3], {"a": {"b": [4]}}])
+    mirror = _plain(items)
+
+    def apply(changes):
+        _apply_changes(mirror, changes)
+
+    items.add_callback(apply, detailed=True)
+
+    items.append({"c": 5})
+    items[1].insert(0, 6)
+    items[2]["a"]["b"].extend([7, 8])
+    items[2]["a"]["d"] = [9]
+    items[3].pop("c")
+    del items[1][::2]
+    items[2]["a"]["d"][0:1] = [10, 11]
+    with items.batch():
+        items.insert(0, [12])
+        items[0].append(13)
+        del items[2][0]
+        items[3]["a"].pop("b")
+    items.append(simple)
+    items.pop(-1)
+    items[0].clear()
+
+    assert mirror == _plain(items)
+
+
+def test_delay_callback_version():
+    # For list and dict properties, delay_callback relies on the version of
+    # the property to find out if the contents have changed, rather than
+    # making a copy of the contents.
+
+    stub = StubList()
+    stub.prop1.extend(range(1000))
+
+    test = MagicMock()
+    stub.add_callback("prop1", test)
+
+    info = type(stub).prop1._get_full_info(stub)
+    assert info[0] is stub.prop1
+
+    with delay_callback(stub, "prop1"):
+        pass
+    assert test.call_count == 0
+
+    with delay_callback(stub, "prop1"):
+        stub.prop1.append(1000)
+        stub.prop1.append(1001)
+    test.assert_called_once_with(stub.prop1)
+
+    test.reset_mock()
+
+    with delay_callback(stub, "prop1"):
+        stub.prop1.append(1002)
+        stub.prop1.pop()
+    assert test.call_count == 1
+
+
+def test_update_rejected():
+    # If a value is rejected by update, the lists and dictionaries that were
+    # changed are restored as is and no callbacks are called.
+
+    class Stub(HasCallbackProperties):
+        items = ListCallbackProperty()
+        mapping = DictCallbackProperty()
+        b = CallbackProperty(0)
+
+    def positive(value):
+        if value < 0:
+            raise ValueError("value should be positive")
+        return value
+
+    stub = Stub()
+    stub.items = [1]
+    stub.mapping = {"a": 1}
+    items, mapping = stub.items, stub.mapping
+
+    calls = []
+    stub.add_callback("b", positive, validator=True)
+    stub.add_callback("items", lambda value: calls.append(("items", list(value))))
+    stub.add_callback("mapping", lambda value: calls.append(("mapping", dict(value))))
+    stub.add_global_callback(lambda **kwargs: calls.append(sorted(kwargs)))
+
+    with pytest.raises(ValueError, match="should be positive"):
+        stub.update(items=[1, 2], mapping={"b": 2}, b=-1)
+    assert stub.items is items
+    assert stub.mapping is mapping
+    assert stub.items == [1]
+    assert stub.mapping == {"a": 1}
+    assert calls == []
+
+    # The original containers are still the ones linked to the properties
+    items.append(5)
+    mapping["c"] = 3
+    assert calls == [["items"], ("items", [1, 5]), ["mapping"], ("mapping", {"a": 1, "c": 3})]
+
+
+def test_transaction_rollback():
+    # Rolling back a transaction restores the lists and dictionaries that
+    # were replaced as is.
+
+    stub = StubList()
+    stub_dict = StubDict()
+    stub.prop1 = [1]
+    stub_dict.prop1 = {"a": 1}
+    items, mapping = stub.prop1, stub_dict.prop1
+
+    test = MagicMock()
+    stub.add_callback("prop1", test)
+    stub_dict.add_callback("prop1", test)
+
+    with pytest.raises(ValueError):
+        with transaction(rollback=True):
+            stub.prop1 = [1, 2]
+            stub_dict.prop1 = {"b": 2}
+            raise ValueError()
+    assert stub.prop1 is items
+    assert stub_dict.prop1 is mapping
+    assert test.call_count == 0
+
+    items.append(3)
+    mapping["c"] = 3
+    assert stub.prop1 == [1, 3]
+    assert stub_dict.prop1 == {"a": 1, "c": 3}
+    assert test.call_count == 2
@@ -1,9 +1,13 @@
-from unittest.mock import MagicMock, call
+import abc
+import gc
+import weakref
+from unittest.mock import MagicMock, call, patch
 
 import pytest
 
 from echo import (
     CallbackProperty,
+    CallbackPropertyAlias,
     HasCallbackProperties,
     add_callback,
     callback_property,
@@ -11,6 +15,7 @@ from echo import (
     ignore_callback,
     keep_in_sync,
     remove_callback,
+    transaction,
 )
 
 
@@ -254,6 +259,50 @@ def test_delay_only_calls_if_changed():
     assert test.call_count == 0
 
 
+def test_delay_version():
+    # delay_callback uses a version number that is increased when the value
+    # changes to find out whether anything changed, and compares the values
+    # only if so.
+
+    stub = Stub()
+    test = MagicMock()
+
+    version = Stub.prop1._get_version(stub)
+
+    with delay_callback(stub, "prop1"):
+        stub.prop1 = 1
+        assert Stub.prop1._get_version(stub) > version
+        version = Stub.prop1._get_version(stub)
+        stub.prop1 = 1
+        assert Stub.prop1._get_version(stub) == version
+        stub.prop1 = None
+        assert Stub.prop1._get_version(stub) > version
+
+    add_callback(stub, "prop1", test)
+
+    with delay_callback(stub, "prop1"):
+        stub.prop1 = 1
+        stub.prop1 = None
+    assert test.call_count == 0
+
+    # Lists can be modified in-place without the version changing, so the
+    # values are always compared for these.
+    stub.prop1 = [1, 2]
+    test.reset_mock()
+    with delay_callback(stub, "prop1"):
+        stub.prop1.append(3)
+    test.assert_called_once_with((1, 2, 3))
+
+    # Properties with custom getters can change without going through the
+    # property, so the values are also always compared for these.
+    stub = DecoratorStub()
+    add_callback(stub, "prop", test)
+    test.reset_mock()
+    with delay_callback(stub, "prop"):
+        stub._val = 3
+    test.assert_called_once_with(6)
+
+
 def test_decorator_form():
     stub = DecoratorStub()
     test = MagicMock()
@@ -382,6 +431,101 @@ def test_class_is_callback_property():
     assert not state.is_callback_property("d")
 
 
+def test_class_callback_properties_sorted():
+    class Unsorted(HasCallbackProperties):
+        zeta = CallbackProperty()
+        alpha = CallbackProperty()
+
+    class Derived(Unsorted):
+        beta = CallbackProperty()
+
+    assert Unsorted().callback_properties() == ["alpha", "zeta"]
+    assert Derived().callback_properties() == ["alpha", "beta", "zeta"]
+
+
+def test_class_registry_updated_when_class_mutated():
+    class Base(HasCallbackProperties):
+        a = CallbackProperty()
+
+    class Derived(Base):
+        b = CallbackProperty()
+
+    state = Derived()
+    assert state.callback_properties() == ["a", "b"]
+
+    # Adding properties to the class or one of its bases after the class has
+    # been created should be picked up.
+    Derived.c = CallbackProperty()
+    Base.d = CallbackProperty()
+    assert state.callback_properties() == ["a", "b", "c", "d"]
+    assert state.is_callback_property("d")
+
+    del Derived.c
+    assert state.callback_properties() == ["a", "b", "d"]
+    assert not state.is_callback_property("c")
+
+    test = MagicMock()
+    state.add_global_callback(test)
+    state.d = 1
+    test.assert_called_once_with(d=1)
+
+    # Replacing an attribute or deleting and adding one, which doesn't change
+    # the size of the class namespace, should also be picked up.
+    Base.e = 1
+    assert state.callback_properties() == ["a", "b", "d"]
+    Base.e = CallbackProperty(1)
+    assert state.callback_properties() == ["a", "b", "d", "e"]
+    Base.e = 2
+    assert state.callback_properties() == ["a", "b", "d"]
+
+    del Derived.b
+    Derived.f = CallbackProperty()
+    assert state.callback_properties() == ["a", "d", "f"]
+
+    # Shadowing a property of a base class hides it
+    Derived.a = 3
+    assert state.callback_properties() == ["d", "f"]
+
+    del Derived.f
+    Derived.g = 4
+    assert state.callback_properties() == ["d"]
+
+    Derived.g = CallbackPropertyAlias("d")
+    assert state._get_aliases_for("d") == ["g"]
+
+
+def test_class_with_other_metaclass():
+    # HasCallbackProperties should be usable together with classes that have
+    # their own metaclass.
+
+    class Base(HasCallbackProperties, abc.ABC):
+        a = CallbackProperty(1)
+
+        @abc.abstractmethod
+        def method(self):
+            pass
+
+    class Concrete(Base):
+        b = CallbackProperty(2)
+
+        def method(self):
+            pass
+
+    with pytest.raises(TypeError, match="abstract"):
+        Base()
+
+    state = Concrete()
+    assert state.callback_properties() == ["a", "b"]
+
+    Base.c = CallbackProperty(3)
+    assert state.callback_properties() == ["a", "b", "c"]
+
+    test = MagicMock()
+    state.add_global_callback(test)
+    state.c = 4
+    test.assert_called_once_with(c=4)
+
+
 def test_class_add_remove_callback_invalid():
     def callback():
         pass
@@ -442,6 +586,305 @@ def test_keep_in_sync():
     s2.disable_syncing()
 
 
+def test_keep_in_sync_propagation():
+    # Changes that fan out through several linked states should only call each
+    # callback once, after all the linked properties have been updated.
+
+    class Viewer:
+        x_min = CallbackProperty(0)
+        x_max = CallbackProperty(1)
+
+    viewers = [Viewer() for _ in range(3)]
+    links = [
+        keep_in_sync(viewers[0], "x_min", viewers[1], "x_min"),
+        keep_in_sync(viewers[1], "x_min", viewers[2], "x_min"),
+        keep_in_sync(viewers[2], "x_min", viewers[0], "x_min"),
+        keep_in_sync(viewers[0], "x_max", viewers[1], "x_max"),
+        keep_in_sync(viewers[1], "x_max", viewers[2], "x_max"),
+    ]
+
+    calls = []
+
+    def callback(value):
+        calls.append((value, [viewer.x_min for viewer in viewers]))
+
+    for viewer in viewers:
+        add_callback(viewer, "x_min", callback)
+
+    viewers[1].x_min = 5
+    assert sorted(calls) == [(5, [5, 5, 5])] * 3
+
+    calls.clear()
+    with delay_callback(viewers[2], "x_min", "x_max"):
+        viewers[2].x_min = -1
+        viewers[2].x_max = 10
+    assert sorted(calls) == [(-1, [-1, -1, -1])] * 3
+    assert [viewer.x_max for viewer in viewers] == [10, 10, 10]
+
+    for link in links:
+        link.disable_syncing()
+    # Only the callback added above should be left
+    assert all(len(Viewer.x_min._callbacks[viewer]) == 1 for viewer in viewers)
+    viewers[0].x_min = 3
+    assert [viewer.x_min for viewer in viewers] == [3, -1, -1]
+
+
+def test_keep_in_sync_conversion():
+    class Axis:
+        degrees = CallbackProperty(0)
+
+    class Other:
+        radians = CallbackProperty(0)
+
+    axis = Axis()
+    other = Other()
+    sync = keep_in_sync(axis, "degrees", other, "radians", forward=lambda x: x / 180, backward=lambda x: x * 180)
+
+    axis.degrees = 90
+    assert other.radians == 0.5
+    other.radians = 1
+    assert axis.degrees == 180
+    assert sync.enabled
+
+
+def test_keep_in_sync_cycles():
+    class Stub:
+        a = CallbackProperty(1)
+        b = CallbackProperty(1)
+        c = CallbackProperty(1)
+
+    stub = Stub()
+    syncs = [
+        keep_in_sync(stub, "a", stub, "b", forward=lambda x: x * 2, backward=lambda x: x / 2),
+        keep_in_sync(stub, "b", stub, "c"),
+        keep_in_sync(stub, "c", stub, "a"),
+    ]
+
+    # The links don't agree on the value of a, so nothing is changed
+    with pytest.raises(RuntimeError) as exc:
+        stub.a = 3
+    assert exc.value.args[0] == (
+        "Linked properties form a cycle with inconsistent values: "
+        "Stub.a -> Stub.b -> Stub.c gives 6 but Stub.a -> Stub.c gives 3"
+    )
+    assert stub.b == 1
+    assert stub.c == 1
+
+    # Validators that keep changing the values are also detected
+
+    class Counter:
+        a = CallbackProperty(0)
+        b = CallbackProperty(0)
+
+    counter = Counter()
+    add_callback(counter, "a", lambda x: x + 1, validator=True)
+    add_callback(counter, "b", lambda x: x + 1, validator=True)
+    syncs.append(keep_in_sync(counter, "a", counter, "b"))
+    with pytest.raises(RuntimeError, match="keep changing each other"):
+        counter.a = 1
+
+
+def test_keep_in_sync_lifetime():
+    # Syncing stops when the keep_in_sync object is garbage collected
+
+    state1 = State()
+    state2 = State()
+    state3 = State()
+    sync = keep_in_sync(state1, "a", state2, "a")
+    keep = keep_in_sync(state1, "a", state3, "a")
+
+    state1.a = 1
+    assert state2.a == 1
+
+    del sync
+    gc.collect()
+
+    state1.a = 2
+    assert state2.a == 1
+    assert state3.a == 2
+    assert len(State.a._callbacks[state2]) == 0
+    assert keep.enabled
+
+
+def test_transaction():
+    state1 = State()
+    state2 = State()
+    stub = Stub()
+    calls = []
+
+    state1.add_callback("a", lambda value: calls.append(("state1.a", value)))
+    state1.add_callback("b", lambda old, new: calls.append(("state1.b", old, new)), echo_old=True)
+    state2.add_callback("a", lambda value: calls.append(("state2.a", value)), priority=10)
+    add_callback(stub, "prop1", lambda value: calls.append(("stub.prop1", value)))
+    state1.add_global_callback(lambda **kwargs: calls.append(("state1", kwargs)))
+    state2.add_global_callback(lambda **kwargs: calls.append(("state2", kwargs)))
+
+    with transaction():
+        state1.a = 1
+        state1.b = 2
+        state1.a = 3
+        stub.prop1 = 4
+        state2.a = 5
+        # Changes that are undone don't trigger any callbacks
+        state2.b = 6
+        state2.b = None
+        assert calls == []
+        assert state1.a == 3
+
+    # The callbacks are called once per property in order of priority, then
+    # the global callbacks once per instance
+    assert calls == [
+        ("state2.a", 5),
+        ("state1.a", 3),
+        ("state1.b", None, 2),
+        ("stub.prop1", 4),
+        ("state1", {"a": 3, "b": 2}),
+        ("state2", {"a": 5}),
+    ]
+
+    # Nested transactions are part of the outermost one
+    calls.clear()
+    with transaction():
+        with transaction():
+            state1.a = 7
+        assert calls == []
+    assert calls == [("state1.a", 7), ("state1", {"a": 7})]
+
+    # The callbacks are called normally after the transaction
+    calls.clear()
+    state1.a = 8
+    assert calls == [("state1.a", 8), ("state1", {"a": 8})]
+
+
+def test_transaction_delay_callback():
+    # Properties that are delayed when the transaction ends are left to
+    # delay_callback, and delay_callback inside a transaction only notifies
+    # when the transaction ends.
+
+    state = State()
+    test = MagicMock()
+    state.add_callback("a", test)
+    state.add_callback("b", test)
+
+    with delay_callback(state, "a"):
+        with transaction():
+            state.a = 1
+            state.b = 2
+        test.assert_called_once_with(2)
+    assert test.call_args_list == [call(2), call(1)]
+
+    test.reset_mock()
+    with transaction():
+        with delay_callback(state, "a"):
+            state.a = 3
+        assert test.call_count == 0
+    test.assert_called_once_with(3)
+
+    # Ignored changes stay ignored
+    test.reset_mock()
+    with transaction():
+        with ignore_callback(state, "a"):
+            state.a = 4
+    assert test.call_count == 0
+
+
+def test_transaction_exception():
+    state = State()
+    stub = Stub()
+    test = MagicMock()
+    state.add_callback("a", test)
+    state.add_global_callback(test)
+
+    # By default, changes made before the exception are kept and notified
+    with pytest.raises(ValueError):
+        with transaction():
+            state.a = 1
+            raise ValueError()
+    assert test.call_args_list == [call(1), call(a=1)]
+
+    test.reset_mock()
+    with pytest.raises(ValueError):
+        with transaction(rollback=True):
+            state.a = 2
+            state.b = 3
+            stub.prop2 = 4
+            raise ValueError()
+    assert state.a == 1
+    assert state.b is None
+    assert stub.prop2 == 5
+    assert test.call_count == 0
+
+    # Without an exception, the changes are committed
+    with transaction(rollback=True):
+        state.a = 2
+    assert test.call_args_list == [call(2), call(a=2)]
+
+
+def test_update():
+    state = State()
+    calls = []
+    state.add_callback("a", lambda value: calls.append(("a", value)))
+    state.add_callback("b", lambda value: calls.append(("b", value)), priority=1)
+    state.add_global_callback(lambda **kwargs: calls.append(kwargs))
+
+    state.update(a=1, b=2, c=None)
+    assert (state.a, state.b) == (1, 2)
+    assert calls == [("b", 2), ("a", 1), {"a": 1, "b": 2}]
+
+    # If a value is rejected, none of the values are changed
+    def positive(value):
+        if value < 0:
+            raise ValueError("value should be positive")
+        return value
+
+    calls.clear()
+    state.add_callback("b", positive, validator=True)
+    with pytest.raises(ValueError, match="should be positive"):
+        state.update(a=3, b=-1)
+    assert (state.a, state.b) == (1, 2)
+    assert calls == []
+
+    # The same applies inside a transaction
+    with transaction():
+        state.c = 4
+        with pytest.raises(ValueError, match="should be positive"):
+            state.update(a=3, b=-1)
+    assert (state.a, state.b, state.c) == (1, 2, 4)
+    assert calls == [{"c": 4}]
+
+    with pytest.raises(TypeError, match="d is not a CallbackProperty"):
+        state.update(a=5, d=2)
+    assert state.a == 1
+
+
+def test_update_alias():
+    class Aliased(HasCallbackProperties):
+        color = CallbackProperty("red")
+        colour = CallbackPropertyAlias("color")
+
+    state = Aliased()
+    test = MagicMock()
+    state.add_global_callback(test)
+    state.update(colour="blue")
+    assert state.color == "blue"
+    test.assert_called_once_with(color="blue", colour="blue")
+
+
+def test_bulk_set():
+    states = [State() for _ in range(3)]
+    test = MagicMock()
+    for state in states:
+        state.add_callback("a", test)
+        state.add_global_callback(test)
+
+    State.bulk_set(states, "a", [1, 2, None])
+    assert [state.a for state in states] == [1, 2, None]
+    assert test.call_args_list == [call(1), call(2), call(a=1), call(a=2)]
+
+    with pytest.raises(ValueError, match="Got 2 values for 3 instances"):
+        State.bulk_set(states, "a", [1, 2])
+
+
 def test_cleanup_when_objects_destroyed():
     state = State()
 
@@ -723,3 +1166,209 @@ def test_priority_order_twoargs():
     state2.a = 7
     calls = [call(7), call(None, 7)]
     mock.assert_has_calls(calls, any_order=False)
+
+
+def test_priority_order_mixed():
+    # Callbacks should be called in order of decreasing priority, and for equal
+    # priorities, single-argument callbacks are called before two-argument
+    # callbacks, each in the order in which they were added.
+
+    mock = MagicMock()
+
+    def make_callback(name, echo_old):
+        if echo_old:
+            return lambda old, new: mock(name)
+        else:
+            return lambda new: mock(name)
+
+    state = State()
+    for name, echo_old, priority in [
+        ("a", True, 0),
+        ("b", False, 0),
+        ("c", True, 5),
+        ("d", False, -1),
+        ("e", False, 0),
+        ("f", True, 0),
+        ("g", False, 5),
+    ]:
+        state.add_callback("a", make_callback(name, echo_old), echo_old=echo_old, priority=priority)
+
+    state.a = 1
+    assert [c.args[0] for c in mock.call_args_list] == ["g", "c", "b", "e", "a", "f", "d"]
+
+
+def test_set_without_listeners():
+    # When there are no callbacks or validators, setting a property should
+    # skip retrieving the old value. Check that adding and removing callbacks
+    # and validators switches between the two behaviors.
+
+    class Counting(CallbackProperty):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.gets = 0
+
+        def __get__(self, instance, owner=None):
+            if instance is not None:
+                self.gets += 1
+            return super().__get__(instance, owner=owner)
+
+    class Foo:
+        a = Counting(1)
+
+    foo = Foo()
+    prop = Foo.a
+
+    foo.a = 2
+    assert prop.gets == 0
+
+    test = MagicMock()
+    add_callback(foo, "a", test)
+    foo.a = 3
+    assert prop.gets == 2
+    test.assert_called_once_with(3)
+
+    remove_callback(foo, "a", test)
+    prop.gets = 0
+    foo.a = 4
+    assert prop.gets == 0
+    assert foo.a == 4
+
+    def double(value):
+        return value * 2
+
+    add_callback(foo, "a", double, validator=True)
+    foo.a = 5
+    assert foo.a == 10
+
+    # Callbacks on other instances should not matter
+    foo2 = Foo()
+    add_callback(foo2, "a", test)
+    prop.clear_callbacks(foo)
+    prop.gets = 0
+    foo.a = 5
+    assert prop.gets == 0
+    assert foo.a == 5
+    foo2.a = 6
+    test.assert_called_with(6)
+
+
+class InstanceStorageState(HasCallbackProperties, instance_storage=True):
+    a = CallbackProperty(1)
+    b = CallbackProperty()
+
+    @callback_property
+    def c(self):
+        return self._c
+
+    @c.setter
+    def c(self, value):
+        self._c = value
+
+
+class InstanceStorageDerived(InstanceStorageState):
+    d = CallbackProperty(4)
+
+
+def test_instance_storage():
+    state1 = InstanceStorageState()
+    state2 = InstanceStorageState()
+
+    assert state1.a == 1
+    assert state1.b is None
+
+    test = MagicMock()
+    state1.add_callback("a", test)
+    state1.add_callback("b", test, echo_old=True)
+
+    state1.a = 2
+    state1.b = 3
+    test.assert_has_calls([call(2), call(None, 3)])
+    assert state1.a == 2 and state1.b == 3
+    assert state2.a == 1 and state2.b is None
+
+    # The values are stored on the instance, not on the property
+    assert vars(state1)["a"] == 2
+
+    state1.c = 5
+    assert state1.c == 5
+
+    with delay_callback(state1, "a"):
+        state1.a = 10
+        state1.a = 20
+        assert test.call_count == 2
+    test.assert_called_with(20)
+
+    state1.remove_callback("a", test)
+    state1.a = 30
+    assert test.call_count == 3
+
+
+def test_instance_storage_inherited():
+    state = InstanceStorageDerived()
+    assert InstanceStorageDerived._instance_storage
+    state.d = 5
+    assert vars(state)["d"] == 5
+    assert state.callback_properties() == ["a", "b", "c", "d"]
+
+    class Disabled(InstanceStorageState, instance_storage=False):
+        e = CallbackProperty()
+
+    state = Disabled()
+    state.e = 1
+    assert "e" not in vars(state)
+
+
+def test_global_callback_dispatch_independent_of_class_size():
+    # Notifying global callbacks used to scan all attributes of the class to
+    # look for aliases, so the cost grew with the size of the class. Check
+    # that the class is not inspected again when properties are set.
+
+    namespace = {"a": CallbackProperty(0), "b": CallbackPropertyAlias("a")}
+    namespace.update({f"prop{i}": CallbackProperty(i) for i in range(200)})
+    namespace.update({f"attr{i}": i for i in range(500)})
+    Large = type("Large", (HasCallbackProperties,), namespace)
+
+    state = Large()
+    calls = []
+    state.add_global_callback(lambda **kwargs: calls.append(kwargs))
+
+    with (
+        patch("echo.core._CallbackPropertyRegistry", side_effect=AssertionError("registry rebuilt")),
+        patch("builtins.dir", side_effect=AssertionError("dir called")),
+    ):
+        state.a = 1
+        state.prop5 = 2
+
+    assert calls == [{"a": 1, "b": 1}, {"prop5": 2}]
+
+
+def test_delay_callback_bookkeeping():
+    # The state of delay_callback is stored per instance, so instances are not
+    # kept alive by it, and with instance storage, the instances don't need
+    # to be hashed.
+
+    class Unhashable(HasCallbackProperties, instance_storage=True):
+        a = CallbackProperty(1)
+
+        def __hash__(self):
+            raise TypeError("unhashable")
+
+    state = Unhashable()
+    test = MagicMock()
+    state.add_callback("a", test)
+
+    with delay_callback(state, "a"):
+        with delay_callback(state, "a"):
+            state.a = 2
+        assert test.call_count == 0
+        assert vars(state)["a:delays"][0] == 1
+    test.assert_called_once_with(2)
+    assert "a:delays" not in vars(state)
+
+    stub = Stub()
+    ref = weakref.ref(stub)
+    with delay_callback(stub, "prop1"):
+        stub.prop1 = 3
+    del stub
+    gc.collect()
+    assert ref() is None
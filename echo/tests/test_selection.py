@@ -1,5 +1,6 @@
 from unittest.mock import MagicMock
 
+import numpy as np
 import pytest
 
 from ..core import HasCallbackProperties, delay_callback
@@ -131,3 +132,136 @@ class TestSelectionCallbackProperty:
             assert func.call_count == 0
         func.assert_called_once_with(4)
         func.reset_mock()
+
+
+def test_instance_storage():
+    class Stub(HasCallbackProperties, instance_storage=True):
+        a = SelectionCallbackProperty()
+
+    stub1 = Stub()
+    stub2 = Stub()
+    Stub.a.set_choices(stub1, [1, 2, 3])
+    stub1.a = 2
+    assert stub1.a == 2
+    assert Stub.a.get_choices(stub1) == [1, 2, 3]
+    assert Stub.a.get_choices(stub2) == []
+    assert stub2.a is None
+
+
+class CustomChoice:
+    # Mimics e.g. glue's ComponentID, for which == returns an object that
+    # evaluates to True
+    def __eq__(self, other):
+        return MagicMock()
+
+    __hash__ = object.__hash__
+
+
+def test_choice_lookup():
+    class Stub(HasCallbackProperties):
+        a = SelectionCallbackProperty()
+        b = SelectionCallbackProperty(comparison_type="identity")
+        c = SelectionCallbackProperty(comparison_type="equality")
+
+    stub = Stub()
+
+    objects = [CustomChoice() for _ in range(1000)]
+    Stub.a.set_choices(stub, objects)
+    assert stub.a is objects[0]
+    stub.a = objects[500]
+    assert stub.a is objects[500]
+    with pytest.raises(ValueError):
+        stub.a = CustomChoice()
+
+    # Strings and numbers are compared by equality
+    labels = [f"label {i}" for i in range(1000)] + [np.array([1, 2])]
+    Stub.a.set_choices(stub, labels)
+    stub.a = "".join(["label ", "999"])
+    assert stub.a == "label 999"
+    assert Stub.a.get_choice_index(stub, "label 999") == 999
+    assert Stub.a.get_choice_index(stub, "label 1000") == -1
+    assert Stub.a.get_choice_index(stub, labels[-1]) == 1000
+
+    # The selection is kept if equal to one of the new choices
+    Stub.a.set_choices(stub, ["".join(["label ", "999"]), "other"])
+    assert stub.a == "label 999"
+
+    # If the choices are modified in place, they are still validated correctly
+    choices = Stub.a.get_choices(stub)
+    choices.append("added")
+    stub.a = "added"
+
+    Stub.b.set_choices(stub, [1000, 2000])
+    stub.b = Stub.b.get_choices(stub)[1]
+    with pytest.raises(ValueError):
+        stub.b = int("2000")
+
+    Stub.c.set_choices(stub, [(1, 2), (3, 4)])
+    stub.c = (3, 4)
+    with pytest.raises(ValueError):
+        stub.c = (5, 6)
+
+
+def test_choice_labels_cached():
+    class Stub(HasCallbackProperties):
+        a = SelectionCallbackProperty()
+
+    stub = Stub()
+
+    calls = []
+
+    def display(x):
+        calls.append(x)
+        return f"value {x}"
+
+    Stub.a.set_display_func(stub, display)
+    Stub.a.set_choices(stub, [1, 2, 3])
+    version = Stub.a.get_choices_version(stub)
+
+    assert Stub.a.get_choice_labels(stub) == ["value 1", "value 2", "value 3"]
+    assert Stub.a.get_choice_labels(stub) == ["value 1", "value 2", "value 3"]
+    assert calls == [1, 2, 3]
+
+    # Changing the selection doesn't change the version or labels
+    stub.a = 2
+    assert Stub.a.get_choices_version(stub) == version
+    Stub.a.get_choice_labels(stub)
+    assert calls == [1, 2, 3]
+
+    # Setting the same choices again keeps the cached labels
+    Stub.a.set_choices(stub, [1, 2, 3])
+    assert Stub.a.get_choices_version(stub) == version
+    Stub.a.get_choice_labels(stub)
+    assert calls == [1, 2, 3]
+
+    # but setting different choices or a different display function doesn't
+    Stub.a.set_choices(stub, [1, 2, 4])
+    assert Stub.a.get_choices_version(stub) > version
+    assert Stub.a.get_choice_labels(stub) == ["value 1", "value 2", "value 4"]
+
+    version = Stub.a.get_choices_version(stub)
+    Stub.a.set_display_func(stub, str)
+    assert Stub.a.get_choices_version(stub) > version
+    assert Stub.a.get_choice_labels(stub) == ["1", "2", "4"]
+
+    # Modifying the labels that are returned doesn't affect the cache
+    Stub.a.get_choice_labels(stub).append("5")
+    assert Stub.a.get_choice_labels(stub) == ["1", "2", "4"]
+
+
+def test_delay_display_func():
+    state = Example()
+    func = MagicMock()
+    state.add_callback("a", func)
+    Example.a.set_choices(state, [1, 2])
+    func.reset_mock()
+
+    # Setting the same choices again inside a delay block doesn't trigger the
+    # callback, but changing the labels does.
+    with delay_callback(state, "a"):
+        Example.a.set_choices(state, [1, 2])
+    assert func.call_count == 0
+
+    with delay_callback(state, "a"):
+        Example.a.set_display_func(state, lambda x: f"value {x}")
+    func.assert_called_once_with(1)
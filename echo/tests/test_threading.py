@@ -0,0 +1,398 @@
+import asyncio
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ..callback_container import CallbackContainer
+from ..core import CallbackProperty, HasCallbackProperties, add_callback, delay_callback, keep_in_sync, transaction
+
+N_THREADS = 8
+N_ITERATIONS = 500
+
+# Maximum time to wait for threads to finish, after which we consider that
+# there is a deadlock.
+TIMEOUT = 30
+
+
+class State(HasCallbackProperties, thread_safe=True):
+    a = CallbackProperty(0)
+    b = CallbackProperty(0)
+
+
+@pytest.fixture(autouse=True)
+def switch_often():
+    # Switch between threads as often as possible to make race conditions
+    # more likely to show up.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def run_threads(target, n_threads=N_THREADS):
+    """
+    Run ``target(index)`` in several threads at the same time, and check that
+    all threads finish without any errors.
+    """
+
+    barrier = threading.Barrier(n_threads)
+    errors = []
+
+    def run(index):
+        try:
+            barrier.wait()
+            target(index)
+        except Exception as exc:  # pragma: no cover
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run, args=(index,), daemon=True) for index in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(TIMEOUT)
+
+    assert not any(thread.is_alive() for thread in threads), "threads did not finish (deadlock?)"
+    if errors:  # pragma: no cover
+        raise errors[0]
+
+
+class Counter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        with self.lock:
+            self.count += 1
+
+
+def test_thread_safe_option():
+    assert isinstance(State.a._lock, type(threading.RLock()))
+
+    class Unsafe(HasCallbackProperties):
+        a = CallbackProperty()
+
+    class Subclass(State):
+        c = CallbackProperty()
+
+    assert not isinstance(Unsafe.a._lock, type(threading.RLock()))
+    assert isinstance(Subclass.c._lock, type(threading.RLock()))
+
+
+def test_container_append_remove():
+    # Add and remove callbacks from several threads while dispatching
+
+    container = CallbackContainer(thread_safe=True)
+    counter = Counter()
+    container.append(counter)
+
+    def target(index):
+        functions = [lambda *args: None for _ in range(5)]
+        for _ in range(N_ITERATIONS // 5):
+            for priority, func in enumerate(functions):
+                container.append(func, priority=priority)
+            container.dispatch()
+            for func in functions:
+                container.remove(func)
+
+    run_threads(target)
+
+    # Only the counter should be left, and it should have been called once for
+    # each call to dispatch.
+    assert len(container) == 1
+    assert sum(len(priorities) for priorities in container._index.values()) == 1
+    assert counter.count == N_THREADS * (N_ITERATIONS // 5)
+
+
+def test_no_lost_notifications():
+    # Each thread sets the property to values that no other thread uses, so
+    # every change should result in exactly one notification, even while
+    # other callbacks are added and removed.
+
+    state = State()
+    counter = Counter()
+    global_counter = Counter()
+    state.add_callback("a", counter)
+    state.add_global_callback(global_counter)
+
+    def target(index):
+        def other(*args):
+            pass
+
+        for i in range(N_ITERATIONS):
+            state.a = (index, i)
+            if i % 2 == 0:
+                add_callback(state, "a", other, echo_old=i % 4 == 0)
+            else:
+                state.remove_callback("a", other)
+
+    run_threads(target)
+
+    assert counter.count == N_THREADS * N_ITERATIONS
+    assert global_counter.count == N_THREADS * N_ITERATIONS
+
+
+def test_delay_callback():
+    # Delay the same property from several threads at the same time - the
+    # callbacks should all be enabled again at the end and every delay should
+    # result in at most one notification.
+
+    state = State()
+    counter = Counter()
+    global_counter = Counter()
+    state.add_callback("a", counter)
+    state.add_global_callback(global_counter)
+
+    def target(index):
+        for i in range(N_ITERATIONS):
+            with delay_callback(state, "a", "b"):
+                state.a = (index, i)
+                with delay_callback(state, "a"):
+                    state.b = (index, i)
+
+    run_threads(target)
+
+    assert 0 < counter.count <= N_THREADS * N_ITERATIONS
+    assert State.a.enabled(state)
+    assert State.b.enabled(state)
+    assert state not in State.a._delays
+    assert state not in State.b._delays
+    assert not state._delayed_properties
+
+    # Check that the callbacks still work normally
+    counter.count = 0
+    global_counter.count = 0
+    state.a = 1
+    assert counter.count == 1
+    assert global_counter.count == 1
+
+
+def test_delay_no_lost_changes():
+    # A change made in one thread while another thread delays the callbacks
+    # should not be lost - the callback should be called once the delay
+    # ends, with the latest value.
+
+    state = State()
+    values = []
+    lock = threading.Lock()
+
+    def callback(value):
+        with lock:
+            values.append(value)
+
+    state.add_callback("a", callback)
+
+    def target(index):
+        for i in range(N_ITERATIONS):
+            if index % 2 == 0:
+                with delay_callback(state, "a"):
+                    pass
+            else:
+                state.a = (index, i)
+
+    run_threads(target)
+
+    assert values[-1] == state.a
+
+
+def test_keep_in_sync():
+    # Syncing properties from several threads at the same time shouldn't
+    # cause errors or prevent later syncing.
+
+    state1 = State()
+    state2 = State()
+    sync = keep_in_sync(state1, "a", state2, "a")
+
+    def target(index):
+        for i in range(N_ITERATIONS):
+            if index % 2 == 0:
+                state1.a = (index, i)
+            else:
+                state2.a = (index, i)
+
+    run_threads(target)
+
+    state1.a = 1
+    assert state2.a == 1
+    state2.a = 2
+    assert state1.a == 2
+    assert sync.enabled
+
+
+def test_transaction():
+    # Transactions only defer the changes made in the thread that started
+    # them, even for the same instance.
+
+    state = State()
+    values = []
+    state.add_callback("a", values.append)
+    state.add_callback("b", values.append)
+
+    with transaction():
+        state.a = 1
+        thread = threading.Thread(target=setattr, args=(state, "b", 2))
+        thread.start()
+        thread.join(TIMEOUT)
+        assert values == [2]
+    assert values == [2, 1]
+
+    # Each thread can have its own transaction
+    counter = Counter()
+    state.add_global_callback(counter)
+
+    def target(index):
+        for i in range(N_ITERATIONS):
+            with transaction():
+                state.a = (index, i)
+                state.b = (index, i)
+
+    run_threads(target)
+
+    assert counter.count == N_THREADS * N_ITERATIONS
+
+
+class QueueExecutor:
+    # Executor that keeps submitted functions until run() is called
+
+    def __init__(self):
+        self.queue = []
+
+    def submit(self, func):
+        self.queue.append(func)
+
+    def run(self):
+        queue, self.queue = self.queue, []
+        for func in queue:
+            func()
+
+
+def test_executor():
+    state = State()
+    executor = QueueExecutor()
+    values = []
+    global_values = []
+
+    def callback(value):
+        values.append(value)
+
+    state.add_callback("a", callback, executor=executor)
+    state.add_callback("b", lambda old, new: values.append((old, new)), echo_old=True, executor=executor)
+    state.add_global_callback(lambda **kwargs: global_values.append(kwargs), executor=executor)
+
+    state.a = 1
+    state.b = 2
+    state.a = 3
+    assert values == []
+    assert global_values == []
+    assert len(executor.queue) == 6
+
+    executor.run()
+    assert values == [1, (0, 2), 3]
+    assert global_values == [{"a": 1}, {"b": 2}, {"a": 3}]
+
+    # Callbacks can be removed as usual
+    state.remove_callback("a", callback)
+    state.a = 4
+    executor.run()
+    assert values == [1, (0, 2), 3]
+
+    with pytest.raises(ValueError, match="validators cannot be called by an executor"):
+        state.add_callback("a", abs, validator=True, executor=executor)
+
+    with pytest.raises(TypeError, match="executor should be"):
+        state.add_callback("a", abs, executor=object())
+
+
+def test_executor_coalesce():
+    state = State()
+    executor = QueueExecutor()
+    values = []
+    state.add_callback("a", values.append, executor=executor, coalesce=True)
+
+    for i in range(1, 101):
+        state.a = i
+    assert len(executor.queue) == 1
+    executor.run()
+    assert values == [100]
+
+    # Once the call has run, the next change schedules a new one
+    state.a = 101
+    executor.run()
+    assert values == [100, 101]
+
+
+def test_executor_method():
+    # Methods are still only referenced weakly
+
+    class Listener:
+        def __init__(self):
+            self.values = []
+
+        def callback(self, value):
+            self.values.append(value)
+
+    state = State()
+    executor = QueueExecutor()
+    listener = Listener()
+    state.add_callback("a", listener.callback, executor=executor)
+    state.a = 1
+    executor.run()
+    assert listener.values == [1]
+
+    state.a = 2
+    del listener
+    executor.run()
+    assert len(State.a._callbacks[state]) == 0
+
+
+def test_thread_pool_executor():
+    state = State()
+    counter = Counter()
+    threads = set()
+
+    def callback(value):
+        threads.add(threading.current_thread())
+        counter()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        state.add_callback("a", callback, executor=executor)
+        for i in range(1, 101):
+            state.a = i
+
+    assert counter.count == 100
+    assert threading.current_thread() not in threads
+
+
+def test_asyncio_executor():
+    # Callbacks are called in the thread running the event loop, both when the
+    # property is changed in another thread and in the loop itself.
+
+    state = State()
+    threads = []
+    values = []
+
+    def callback(value):
+        threads.append(threading.current_thread())
+        values.append(value)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        state.add_callback("a", callback, executor=loop, coalesce=True)
+
+        def produce():
+            for i in range(1, 101):
+                state.a = i
+
+        await loop.run_in_executor(None, produce)
+        await asyncio.sleep(0)
+        assert values[-1] == 100
+        assert len(values) <= 100
+
+        state.a = 101
+        assert values[-1] == 101
+
+    asyncio.run(main())
+
+    assert set(threads) == {threading.current_thread()}
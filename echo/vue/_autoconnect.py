@@ -5,6 +5,7 @@ from html.parser import HTMLParser
 from ..containers import DictCallbackProperty, ListCallbackProperty
 from ..selection import SelectionCallbackProperty
 from ._connect import (
+    _Coalescer,
     connect_any,
     connect_bool,
     connect_choice,
@@ -181,7 +182,16 @@ def _parse_extras(extras):
 
 
 def autoconnect_callbacks_to_vue(
-    instance, widget, template=None, extras=None, only=None, skip=None, infer_properties_from="vue", prefix=""
+    instance,
+    widget,
+    template=None,
+    extras=None,
+    only=None,
+    skip=None,
+    infer_properties_from="vue",
+    prefix="",
+    patch=False,
+    coalesce=False,
 ):
     """
     Connect callback properties on ``instance`` to traitlets on
@@ -235,6 +245,18 @@ def autoconnect_callbacks_to_vue(
         sync to a widget traitlet named ``state_x_min``. When using
         ``infer_properties_from='vue'``, the template should reference
         the prefixed names (e.g. ``state_x_min``).
+    patch : bool, optional
+        If `True`, changes to list and dict properties are sent to the
+        frontend as JSON patches in custom messages rather than by syncing
+        the full value, and patches received from the frontend are applied
+        in place. This requires the frontend to handle these messages (see
+        :ref:`vue-patch-sync`).
+    coalesce : bool or float, optional
+        If `True`, changes to properties are not synced to the widget
+        straight away, but all changes are synced together, in a single comm
+        message, on the next iteration of the asyncio event loop. If a
+        number, changes are instead synced after that many seconds. If there
+        is no running event loop, changes are synced straight away.
 
     Returns
     -------
@@ -301,6 +323,11 @@ def autoconnect_callbacks_to_vue(
 
     connections = {}
 
+    if coalesce:
+        coalescer = _Coalescer(widget, latency=None if coalesce is True else coalesce)
+    else:
+        coalescer = None
+
     # Create connections with initial_sync=False so traits are added
     # without the sync tag, avoiding per-trait comm messages.
     for wtype, prop_names in refs.items():
@@ -325,6 +352,7 @@ def autoconnect_callbacks_to_vue(
                     widget_prop = prefix + prop_name
             else:
                 widget_prop = None
+            kwargs = {"patch": True} if patch and wtype in ("list", "dict") else {}
             handler = handler_cls(
                 instance,
                 prop_name,
@@ -333,7 +361,9 @@ def autoconnect_callbacks_to_vue(
                 to_widget=to_w,
                 from_widget=from_w,
                 initial_sync=False,
+                **kwargs,
             )
+            handler._coalescer = coalescer
             connections[prop_name] = handler
 
     # Set the initial values, enable sync, and send all state in one
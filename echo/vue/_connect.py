@@ -4,6 +4,10 @@
 # state, avoiding stale-overwrite issues that arise from syncing the entire
 # state dict at once.
 
+import asyncio
+from bisect import bisect_left
+from contextlib import nullcontext
+
 import traitlets
 
 from ..containers import CallbackDict, CallbackList
@@ -69,8 +73,21 @@ class BaseConnection:
         self._to_widget_transform = to_widget
         self._from_widget_transform = from_widget
         self._updating = False
+        self._coalescer = None
         self.connect(initial_sync=initial_sync)
 
+    def _on_prop_change(self, *args):
+        # Called when the callback property changes. If updates are being
+        # coalesced, the widget is updated later by the coalescer, except for
+        # changes that come from the widget itself, which shouldn't be sent
+        # back to it.
+        if self._updating:
+            return
+        if self._coalescer is None:
+            self._from_state(*args)
+        else:
+            self._coalescer.schedule(self, args)
+
     def _from_state(self, *args):
         if self._updating:
             return
@@ -96,7 +113,7 @@ class BaseConnection:
         setattr(self._instance, self._prop, value)
 
     def connect(self, initial_sync=True):
-        add_callback(self._instance, self._prop, self._from_state)
+        add_callback(self._instance, self._prop, self._on_prop_change)
         self._widget.observe(self._from_widget, names=[self._widget_prop])
         if initial_sync:
             self._from_state()
@@ -114,8 +131,57 @@ class BaseConnection:
         return [self._widget_prop]
 
     def disconnect(self):
-        remove_callback(self._instance, self._prop, self._from_state)
+        remove_callback(self._instance, self._prop, self._on_prop_change)
         self._widget.unobserve(self._from_widget, names=[self._widget_prop])
+        if self._coalescer is not None:
+            self._coalescer.discard(self)
+
+
+class _Coalescer:
+    """
+    Collect the connections to a widget for which properties have changed,
+    and update the widget for all of them at once, inside a single
+    ``hold_sync`` block so that only one comm message is sent.
+
+    The update happens on the next iteration of the running asyncio event
+    loop, or after ``latency`` seconds if specified. If there is no running
+    event loop, the widget is updated straight away.
+    """
+
+    def __init__(self, widget, latency=None):
+        self._widget = widget
+        self._latency = latency
+        self._pending = {}
+        self._handle = None
+
+    def schedule(self, connection, args):
+        self._pending[connection] = args
+        if self._handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        if self._latency:
+            self._handle = loop.call_later(self._latency, self.flush)
+        else:
+            self._handle = loop.call_soon(self.flush)
+
+    def discard(self, connection):
+        self._pending.pop(connection, None)
+
+    def flush(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        hold_sync = getattr(self._widget, "hold_sync", None)
+        with nullcontext() if hold_sync is None else hold_sync():
+            for connection, args in pending.items():
+                connection._from_state(*args)
 
 
 class connect_bool(BaseConnection):
@@ -194,6 +260,7 @@ class connect_choice(BaseConnection):
         if traits:
             widget.add_traits(**traits)
         self._items_prop = items_prop
+        self._separators = []
         super().__init__(instance, prop, widget, widget_prop, initial_sync=initial_sync, **kwargs)
 
     def _get_choices(self):
@@ -201,8 +268,11 @@ class connect_choice(BaseConnection):
         display_func = prop_descriptor.get_display_func(self._instance) or str
         choices = []
         labels = []
-        for choice in prop_descriptor.get_choices(self._instance):
-            if not isinstance(choice, ChoiceSeparator):
+        self._separators = []
+        for pos, choice in enumerate(prop_descriptor.get_choices(self._instance)):
+            if isinstance(choice, ChoiceSeparator):
+                self._separators.append(pos)
+            else:
                 choices.append(choice)
                 labels.append(display_func(choice))
         return choices, labels
@@ -216,8 +286,13 @@ class connect_choice(BaseConnection):
             items = [{"text": label, "value": i} for i, label in enumerate(labels)]
             setattr(self._widget, self._items_prop, items)
             current = getattr(self._instance, self._prop)
-            if current in choices:
-                setattr(self._widget, self._widget_prop, choices.index(current))
+            prop_descriptor = getattr(type(self._instance), self._prop)
+            pos = prop_descriptor.get_choice_index(self._instance, current)
+            # The items don't include separators, so we need to account for
+            # the ones before the selected choice.
+            index = pos - bisect_left(self._separators, pos)
+            if pos >= 0 and index < len(choices) and choices[index] is prop_descriptor.get_choices(self._instance)[pos]:
+                setattr(self._widget, self._widget_prop, index)
             else:
                 setattr(self._widget, self._widget_prop, None)
         finally:
@@ -280,10 +355,230 @@ def _update_dict_in_place(callback_dict, new_values):
         callback_dict.pop(key)
 
 
-class connect_list(BaseConnection):
+def _escape(token):
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token):
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _pointer(path):
+    """Convert a sequence of indices/keys to a JSON pointer (RFC 6901)."""
+    return "".join("/" + _escape(token) for token in path)
+
+
+def _changes_to_patch(changes):
+    """
+    Convert a list of `~echo.ContainerChange` to a list of JSON patch
+    (RFC 6902) operations, or return `None` if the changes cannot be
+    represented as a patch, in which case a full sync is needed.
+    """
+
+    # Changes recorded in a batch refer to the items as they are at the end of
+    # the batch, so if a container was added and then modified in the same
+    # batch, the modification would be applied twice.
+    if len(changes) > 1 and any(change.path for change in changes):
+        for change in changes:
+            new = change.new if change.kind in ("insert", "replace") else [change.new]
+            if new and any(isinstance(value, list | dict) for value in new):
+                return None
+
+    patch = []
+    for change in changes:
+        if change.kind == "insert":
+            for offset, value in enumerate(change.new):
+                path = _pointer(change.path + (change.index + offset,))
+                patch.append({"op": "add", "path": path, "value": _to_plain(value)})
+        elif change.kind == "remove":
+            path = _pointer(change.path + (change.index,))
+            patch.extend({"op": "remove", "path": path} for _ in change.old)
+        elif change.kind == "replace":
+            if len(change.old) == len(change.new):
+                for offset, value in enumerate(change.new):
+                    path = _pointer(change.path + (change.index + offset,))
+                    patch.append({"op": "replace", "path": path, "value": _to_plain(value)})
+            else:
+                path = _pointer(change.path + (change.index,))
+                patch.extend({"op": "remove", "path": path} for _ in change.old)
+                for offset, value in enumerate(change.new):
+                    path = _pointer(change.path + (change.index + offset,))
+                    patch.append({"op": "add", "path": path, "value": _to_plain(value)})
+        elif change.kind == "set":
+            path = _pointer(change.path + (change.key,))
+            patch.append({"op": "add", "path": path, "value": _to_plain(change.new)})
+        elif change.kind == "delete":
+            patch.append({"op": "remove", "path": _pointer(change.path + (change.key,))})
+        elif change.kind == "clear":
+            value = [] if isinstance(change.old, list) else {}
+            patch.append({"op": "replace", "path": _pointer(change.path), "value": value})
+        else:
+            return None
+    return patch
+
+
+def _apply_patch(document, patch):
+    """
+    Apply a list of JSON patch (RFC 6902) operations in-place to a list or
+    dict, which can be a `CallbackList` or `CallbackDict`. Only the
+    ``add``, ``remove`` and ``replace`` operations are supported.
+    """
+    for operation in patch:
+        op = operation["op"]
+        if op not in ("add", "remove", "replace"):
+            raise ValueError(f"Unsupported patch operation: {op}")
+
+        tokens = [_unescape(token) for token in operation["path"].split("/")[1:]]
+
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token) if isinstance(parent, list) else token]
+
+        if not tokens:
+            key, existing = None, document
+        elif isinstance(parent, list):
+            key = len(parent) if tokens[-1] == "-" else int(tokens[-1])
+            if not 0 <= key < len(parent) + (op == "add"):
+                raise IndexError(f"Invalid index in patch path: {operation['path']}")
+            existing = parent[key] if key < len(parent) else None
+        elif isinstance(parent, dict):
+            key = tokens[-1]
+            if op != "add" and key not in parent:
+                raise KeyError(f"Invalid key in patch path: {operation['path']}")
+            existing = parent.get(key)
+        else:
+            raise TypeError(f"Cannot apply patch to {type(parent).__name__}")
+
+        if op == "replace" and isinstance(existing, list) and isinstance(operation["value"], list):
+            _update_list_in_place(existing, operation["value"])
+        elif op == "replace" and isinstance(existing, dict) and isinstance(operation["value"], dict):
+            _update_dict_in_place(existing, operation["value"])
+        elif not tokens:
+            raise ValueError("Only replace operations with a matching type are supported for the root")
+        elif op == "remove":
+            del parent[key]
+        elif op == "add" and isinstance(parent, list):
+            parent.insert(key, operation["value"])
+        else:
+            parent[key] = operation["value"]
+
+
+class _ContainerConnection(BaseConnection):
+    """
+    Base class for connections of list and dict properties, which can
+    optionally sync changes as JSON patches rather than the full value.
+
+    If ``patch=True``, the widget is an ipywidgets widget, no transforms are
+    specified, and the property value is a `CallbackList` or `CallbackDict`,
+    changes to the value are sent to the frontend as a custom message of the
+    form ``{"method": "echo_patch", "name": widget_prop, "patch": [...]}``
+    where ``patch`` is a list of JSON patch (RFC 6902) operations. Messages
+    of the same form received from the frontend are applied to the value in
+    place. Changes which cannot be expressed as a patch (for example sorting
+    a list), and patches which cannot be applied, result in a full sync.
+    """
+
+    # The container class (CallbackList or CallbackDict) for which patches
+    # can be used.
+    _container_class = None
+
+    def __init__(self, instance, prop, widget, widget_prop=None, patch=False, **kwargs):
+        self._patch = patch and hasattr(widget, "send") and hasattr(widget, "on_msg")
+        self._container = None
+        super().__init__(instance, prop, widget, widget_prop=widget_prop, **kwargs)
+
+    def _watch(self, value):
+        # Start listening for detailed changes to the container (if patches
+        # can be used for it), and stop listening to any previous container.
+        if self._container is not None:
+            self._container.remove_callback(self._from_changes)
+            self._container = None
+        if (
+            self._patch
+            and self._to_widget_transform is None
+            and self._from_widget_transform is None
+            and isinstance(value, self._container_class)
+        ):
+            self._container = value
+            value.add_callback(self._from_changes, detailed=True)
+
+    def _from_state(self, *args):
+        if self._patch:
+            value = getattr(self._instance, self._prop)
+            # If called as a callback because the contents of the container
+            # changed, the changes have already been sent by _from_changes.
+            if args and value is self._container:
+                return
+            self._watch(value)
+        super()._from_state(*args)
+
+    def _from_changes(self, changes):
+        # If the property has been set to a different container, the widget
+        # will be updated by _from_state.
+        if self._updating or getattr(self._instance, self._prop) is not self._container:
+            return
+        patch = _changes_to_patch(changes)
+        if patch is None:
+            self._resync()
+            return
+        # Apply the patch to the trait value too, without triggering a sync
+        try:
+            _apply_patch(getattr(self._widget, self._widget_prop), patch)
+        except (ValueError, KeyError, IndexError, TypeError):
+            self._resync()
+        else:
+            self._widget.send({"method": "echo_patch", "name": self._widget_prop, "patch": patch})
+
+    def _on_msg(self, widget, content, buffers):
+        if not isinstance(content, dict) or content.get("method") != "echo_patch":
+            return
+        if content.get("name") != self._widget_prop or self._container is None:
+            return
+        self._updating = True
+        try:
+            with self._container.batch():
+                _apply_patch(self._container, content["patch"])
+            _apply_patch(getattr(self._widget, self._widget_prop), content["patch"])
+        except (ValueError, KeyError, IndexError, TypeError):
+            failed = True
+        else:
+            failed = False
+        finally:
+            self._updating = False
+        if failed:
+            self._resync()
+
+    def _resync(self):
+        # Send the full value to the frontend. Since patches are applied to the
+        # trait value, this may already be equal to the new value in which
+        # case setting it would not send anything.
+        self._updating = True
+        try:
+            value = _to_plain(self._container)
+            if getattr(self._widget, self._widget_prop) == value:
+                self._widget.send_state(key=self._widget_prop)
+            else:
+                setattr(self._widget, self._widget_prop, value)
+        finally:
+            self._updating = False
+
+    def connect(self, initial_sync=True):
+        if self._patch:
+            self._widget.on_msg(self._on_msg)
+        super().connect(initial_sync=initial_sync)
+
+    def disconnect(self):
+        super().disconnect()
+        if self._patch:
+            self._widget.on_msg(self._on_msg, remove=True)
+            self._watch(None)
+
+
+class connect_list(_ContainerConnection):
     """Connect a ListCallbackProperty or list-valued CallbackProperty to a List traitlet."""
 
     _default_trait = staticmethod(lambda: traitlets.List().tag(sync=True))
+    _container_class = CallbackList
 
     def update_widget(self, value):
         if self._to_widget_transform is not None:
@@ -299,15 +594,17 @@ class connect_list(BaseConnection):
         else:
             container = getattr(self._instance, self._prop)
             if isinstance(container, CallbackList):
-                _update_list_in_place(container, value)
+                with container.batch():
+                    _update_list_in_place(container, value)
             else:
                 setattr(self._instance, self._prop, list(value))
 
 
-class connect_dict(BaseConnection):
+class connect_dict(_ContainerConnection):
     """Connect a DictCallbackProperty or dict-valued CallbackProperty to a Dict traitlet."""
 
     _default_trait = staticmethod(lambda: traitlets.Dict().tag(sync=True))
+    _container_class = CallbackDict
 
     def update_widget(self, value):
         if self._to_widget_transform is not None:
@@ -323,7 +620,8 @@ class connect_dict(BaseConnection):
         else:
             container = getattr(self._instance, self._prop)
             if isinstance(container, CallbackDict):
-                _update_dict_in_place(container, value)
+                with container.batch():
+                    _update_dict_in_place(container, value)
             else:
                 setattr(self._instance, self._prop, dict(value))
 
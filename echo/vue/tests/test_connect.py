@@ -1,3 +1,6 @@
+import asyncio
+from unittest.mock import MagicMock
+
 import pytest
 
 traitlets = pytest.importorskip("traitlets")
@@ -429,3 +432,227 @@ def test_delay_callback_batches_comms():
 
     # Should be one batched comm message, not four individual ones
     assert len(widget.sends) == 1
+
+
+class PatchWidget(ipywidgets.Widget):
+    """Widget that records custom messages and state updates sent to the frontend."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.sent = []
+        self.states = []
+
+    def send(self, content, buffers=None):
+        self.sent.append(content)
+
+    def send_state(self, key=None):
+        self.states.append(key)
+
+    def receive(self, content):
+        self._handle_custom_msg(content, [])
+
+
+class TestPatchSync:
+    def setup_method(self):
+        self.state = ContainerState()
+        self.widget = PatchWidget()
+        self.list_conn = connect_list(self.state, "items", self.widget, patch=True)
+        self.dict_conn = connect_dict(self.state, "config", self.widget, patch=True)
+        self.widget.states.clear()
+
+    def patches(self):
+        patches = [(msg["name"], msg["patch"]) for msg in self.widget.sent]
+        self.widget.sent.clear()
+        return patches
+
+    def test_initial_sync(self):
+        assert self.widget.items == [{"name": "a"}, {"name": "b"}]
+        assert self.widget.config == {"x": 1, "nested": {"y": 2}}
+        assert self.widget.sent == []
+
+    def test_list_to_widget(self):
+        self.state.items.append({"name": "c"})
+        assert self.patches() == [("items", [{"op": "add", "path": "/2", "value": {"name": "c"}}])]
+
+        self.state.items[0]["name"] = "z"
+        assert self.patches() == [("items", [{"op": "add", "path": "/0/name", "value": "z"}])]
+
+        del self.state.items[1]
+        assert self.patches() == [("items", [{"op": "remove", "path": "/1"}])]
+
+        self.state.items[0:1] = [1, 2]
+        assert self.patches() == [
+            (
+                "items",
+                [
+                    {"op": "remove", "path": "/0"},
+                    {"op": "add", "path": "/0", "value": 1},
+                    {"op": "add", "path": "/1", "value": 2},
+                ],
+            )
+        ]
+
+        assert self.widget.items == [1, 2, {"name": "c"}]
+
+    def test_dict_to_widget(self):
+        self.state.config["nested"]["y/z"] = 3
+        assert self.patches() == [("config", [{"op": "add", "path": "/nested/y~1z", "value": 3}])]
+
+        self.state.config.pop("x")
+        assert self.patches() == [("config", [{"op": "remove", "path": "/x"}])]
+
+        assert self.widget.config == {"nested": {"y": 2, "y/z": 3}}
+
+    def test_batch(self):
+        with self.state.items.batch():
+            self.state.items.append(3)
+            self.state.items.pop(0)
+        assert self.patches() == [("items", [{"op": "add", "path": "/2", "value": 3}, {"op": "remove", "path": "/0"}])]
+        assert self.widget.items == [{"name": "b"}, 3]
+
+    def test_full_sync_fallback(self):
+        self.state.items.append({"name": "c"})
+        self.widget.sent.clear()
+
+        self.state.items.sort(key=lambda item: item["name"], reverse=True)
+        assert self.widget.sent == []
+        assert self.widget.items == [{"name": "c"}, {"name": "b"}, {"name": "a"}]
+
+        # Adding a container and modifying it in the same batch can't be
+        # represented as a patch
+        with self.state.items.batch():
+            self.state.items.append([])
+            self.state.items[-1].append(1)
+        assert self.widget.sent == []
+        assert self.widget.items[-1] == [1]
+
+    def test_replace_value(self):
+        # Setting the property to a new value does a full sync, and patches
+        # are then sent for the new value.
+        self.state.items = [5]
+        assert self.widget.items == [5]
+        assert self.widget.sent == []
+        self.state.items.append(6)
+        assert self.patches() == [("items", [{"op": "add", "path": "/1", "value": 6}])]
+
+    def test_widget_to_state(self):
+        original = self.state.items
+        callback = MagicMock()
+        self.state.add_callback("items", callback)
+
+        self.widget.receive(
+            {
+                "method": "echo_patch",
+                "name": "items",
+                "patch": [
+                    {"op": "add", "path": "/-", "value": {"name": "c"}},
+                    {"op": "replace", "path": "/0/name", "value": "x"},
+                    {"op": "remove", "path": "/1"},
+                ],
+            }
+        )
+        assert self.state.items is original
+        assert self.state.items == [{"name": "x"}, {"name": "c"}]
+        assert self.widget.items == [{"name": "x"}, {"name": "c"}]
+        assert callback.call_count == 1
+        assert self.widget.sent == []
+
+        self.widget.receive(
+            {"method": "echo_patch", "name": "config", "patch": [{"op": "replace", "path": "", "value": {"x": 2}}]}
+        )
+        assert self.state.config == {"x": 2}
+        assert self.widget.config == {"x": 2}
+
+    def test_widget_to_state_invalid(self):
+        self.widget.receive({"method": "echo_patch", "name": "items", "patch": [{"op": "remove", "path": "/5"}]})
+        assert self.state.items == [{"name": "a"}, {"name": "b"}]
+        assert self.widget.states == ["items"]
+
+        self.widget.receive(
+            {"method": "echo_patch", "name": "items", "patch": [{"op": "move", "from": "/0", "path": "/1"}]}
+        )
+        assert self.widget.states == ["items", "items"]
+
+    def test_disconnect(self):
+        self.list_conn.disconnect()
+        self.state.items.append(1)
+        self.widget.receive({"method": "echo_patch", "name": "items", "patch": [{"op": "remove", "path": "/0"}]})
+        assert self.widget.sent == []
+        assert len(self.state.items) == 3
+
+    def test_no_patch_support(self):
+        # Widgets that can't send custom messages use full syncs
+        state = ContainerState()
+        widget = SimpleWidget()
+        connect_list(state, "items", widget, patch=True)
+        state.items.append(1)
+        assert widget.items[-1] == 1
+
+    def test_autoconnect(self):
+        state = ContainerState()
+        widget = PatchWidget()
+        autoconnect_callbacks_to_vue(state, widget, only={"items", "tags"}, patch=True)
+        state.tags.append("blue")
+        assert [msg["name"] for msg in widget.sent] == ["tags"]
+        assert widget.tags == ["red", "green", "blue"]
+
+
+def test_coalesce():
+    state = FourPropState()
+    widget = CommTrackingWidget()
+    connections = autoconnect_callbacks_to_vue(state, widget, template=FOUR_SLIDER_TEMPLATE, coalesce=True)
+    widget.sends.clear()
+
+    async def main():
+        for i in range(10):
+            state.a = i
+            state.b = 2 * i
+            state.c = 3 * i
+        # Nothing is sent until the event loop gets to run
+        assert widget.sends == []
+        assert widget.a == 0
+        await asyncio.sleep(0)
+        assert len(widget.sends) == 1
+        assert widget.sends[0]["state"] == {"a": 9, "b": 18, "c": 27}
+        assert widget.d == 0
+
+        # Changes from the widget are applied straight away
+        widget.d = 5
+        assert state.d == 5
+
+        # and are not sent back to the widget
+        update_widget = connections["d"].update_widget = MagicMock()
+        widget.set_state({"d": 6})
+        assert state.d == 6
+        await asyncio.sleep(0)
+        update_widget.assert_not_called()
+
+    asyncio.run(main())
+
+    # Without a running event loop, changes are synced straight away
+    state.a = 1
+    assert widget.a == 1
+
+
+def test_coalesce_latency():
+    state = FourPropState()
+    widget = CommTrackingWidget()
+    connections = autoconnect_callbacks_to_vue(state, widget, template=FOUR_SLIDER_TEMPLATE, coalesce=0.05)
+    widget.sends.clear()
+
+    async def main():
+        state.a = 1
+        await asyncio.sleep(0)
+        state.b = 2
+        assert widget.sends == []
+        await asyncio.sleep(0.1)
+        assert len(widget.sends) == 1
+        assert widget.sends[0]["state"] == {"a": 1, "b": 2}
+
+        # Pending updates are dropped on disconnect
+        state.c = 3
+        connections["c"].disconnect()
+        await asyncio.sleep(0.1)
+        assert widget.c == 0
+
+    asyncio.run(main())